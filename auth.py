@@ -1,24 +1,25 @@
 ﻿import json
 import os
 from pathlib import Path
-from coinbase.rest import RESTClient
+from exchange import get_exchange
 
 # 1. Point to the JSON file
 KEY_PATH = Path(__file__).parent / "cdp_api_key.json"
 
-# 2. Extract the keys
+# 2. Extract the keys (None without the file: importing never exits, API calls fail instead)
+API_KEY = API_SECRET = None
 if not KEY_PATH.exists():
-    print(f"❌ Error: {KEY_PATH} not found!")
-    exit()
+    print(f"❌ Error: {KEY_PATH} not found! Authenticated API calls will fail.")
+else:
+    with open(KEY_PATH, 'r') as f:
+        data = json.load(f)
+        # Using .get() prevents crashing if keys are missing
+        API_KEY = data.get("name")
+        API_SECRET = data.get("privateKey")
 
-with open(KEY_PATH, 'r') as f:
-    data = json.load(f)
-    # Using .get() prevents crashing if keys are missing
-    API_KEY = data.get("name")
-    API_SECRET = data.get("privateKey")
-
-# 3. Initialize the actual Client object
+# 3. The shared, retrying client (exchange.py), created on the first API call
 # This is what 'from auth import client' looks for!
-client = RESTClient(api_key=API_KEY, api_secret=API_SECRET)
+client = get_exchange(KEY_PATH)
 
-print("Coinbase Client Initialized Successfully")
\ No newline at end of file
+if API_KEY:
+    print("Coinbase Client Initialized Successfully")
\ No newline at end of file
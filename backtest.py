@@ -1,87 +1,210 @@
 ﻿import csv
 from datetime import datetime
-from strategy import generate_trade_signal
+import numpy as np
+from signal_engine import SignalEngine
+from strategy import WINDOW_SIZE, MIN_CONFIRMATIONS, apply_htf_filter
+from resample import MultiTimeframe
 from risk import calculate_position_size, calculate_take_profit
-from journal import log_trade 
+from journal import JournalWriter
+from candles import as_series
 
-def simulate_trade_outcome(signal, entry_price, sl, tp2, candles, start_index):
+# First chunk size for the exit search; it doubles each time nothing is hit
+SEARCH_CHUNK = 64
+
+def _first_touch(lows, highs, start, below, above):
+    """
+    Finds the first bar j >= start where low <= below or high >= above.
+    Searches in growing chunks, so a short trade only compares a few bars.
+    Returns (j, low_touched, high_touched), or None if no bar touches.
+    """
+    n = len(lows)
+    pos, size = start, SEARCH_CHUNK
+    while pos < n:
+        end = min(pos + size, n)
+        low_hit = lows[pos:end] <= below
+        high_hit = highs[pos:end] >= above
+        hits = low_hit | high_hit
+        if hits.any():
+            k = int(hits.argmax())
+            return pos + k, bool(low_hit[k]), bool(high_hit[k])
+        pos, size = end, size * 2
+    return None
+
+def simulate_trade_outcome(signal, entry_price, sl, tp2, candles, start_index, intrabar=None):
+    """
+    Walks the trade forward from start_index and returns (pnl per unit, bars held).
+    Phase 1: SL or TP1 (SL wins if both are touched on the same bar).
+    Phase 2 (after TP1, from the next bar): TP2 or breakeven (TP2 wins on the same bar).
+    intrabar: an intrabar.IntrabarResolver. A bar that touches both levels is then
+    replayed on the lower timeframe, and only falls back to these rules if that can't tell.
+    """
+    candles = as_series(candles)
+    lows = candles.low
+    highs = candles.high
     risk_amount = abs(entry_price - sl)
     tp1 = entry_price + (risk_amount if signal == 'BUY' else -risk_amount)
+    is_buy = signal == 'BUY'
     
-    current_sl = sl
-    tp1_hit = False
     pnl_accumulated = 0
 
-    # Start looking at candles from the NEXT index forward
-    for j in range(start_index, len(candles)):
-        low_p = float(candles[j]['low'])
-        high_p = float(candles[j]['high'])
-        
-        # Current duration in bars
-        bars_held = j - (start_index - 1)
-
-        if not tp1_hit:
-            # Check Stop Loss
-            if (signal == 'BUY' and low_p <= current_sl) or (signal == 'SELL' and high_p >= current_sl):
-                return (current_sl - entry_price if signal == 'BUY' else entry_price - current_sl), bars_held
-
-            # Check TP1 (Bank 50%, move SL to Breakeven)
-            if (signal == 'BUY' and high_p >= tp1) or (signal == 'SELL' and low_p <= tp1):
-                tp1_hit = True
-                pnl_accumulated += 0.5 * (tp1 - entry_price if signal == 'BUY' else entry_price - tp1)
-                current_sl = entry_price 
-        else:
-            # Check TP2 (Exit remaining 50%)
-            if (signal == 'BUY' and high_p >= tp2) or (signal == 'SELL' and low_p <= tp2):
-                pnl_accumulated += 0.5 * (tp2 - entry_price if signal == 'BUY' else entry_price - tp2)
-                return pnl_accumulated, bars_held
-
-            # Check Breakeven Stop
-            if (signal == 'BUY' and low_p <= current_sl) or (signal == 'SELL' and high_p >= current_sl):
-                return pnl_accumulated, bars_held
-                
-    return pnl_accumulated, (len(candles) - start_index)
-
-def run_backtest(candles, product_id, initial_balance=1000, risk_percent=1.0):
+    # --- Phase 1: Stop Loss or TP1 (start looking at candles from the NEXT index forward) ---
+    if is_buy:
+        touch = _first_touch(lows, highs, start_index, below=sl, above=tp1)
+    else:
+        touch = _first_touch(lows, highs, start_index, below=tp1, above=sl)
+    if touch is None:
+        return pnl_accumulated, (len(candles) - start_index)
+
+    j, low_touched, high_touched = touch
+    sl_hit = low_touched if is_buy else high_touched
+    first = None
+    if intrabar is not None and low_touched and high_touched:
+        first, tp1_ts = intrabar.order(int(candles.start[j]), *((sl, tp1) if is_buy else (tp1, sl)))
+        if first is not None:
+            sl_hit = (first == 'below') == is_buy
+    if sl_hit:
+        return (sl - entry_price if is_buy else entry_price - sl), j - (start_index - 1)
+
+    # TP1: Bank 50%, move SL to Breakeven
+    pnl_accumulated += 0.5 * (tp1 - entry_price if is_buy else entry_price - tp1)
+
+    # --- Phase 2: TP2 or Breakeven Stop ---
+    below, above = (entry_price, tp2) if is_buy else (tp2, entry_price)
+    touch = None
+    if first is not None:
+        # TP1 was resolved inside bar j: the rest of that bar can already reach TP2 or breakeven
+        rest = intrabar.first_touch(tp1_ts + 1, int(candles.start[j]) + intrabar.base, below, above)
+        if rest is not None:
+            touch = (j, rest[1], rest[2])
+    if touch is None:
+        touch = _first_touch(lows, highs, j + 1, below=below, above=above)
+    if touch is None:
+        return pnl_accumulated, (len(candles) - start_index)
+
+    k, low_touched, high_touched = touch
+    tp2_hit = high_touched if is_buy else low_touched
+    if intrabar is not None and low_touched and high_touched and k > j:
+        second, _ = intrabar.order(int(candles.start[k]), below, above)
+        if second is not None:
+            tp2_hit = (second == 'above') == is_buy
+    if tp2_hit:
+        # Exit remaining 50% at TP2
+        pnl_accumulated += 0.5 * (tp2 - entry_price if is_buy else entry_price - tp2)
+    return pnl_accumulated, k - (start_index - 1)
+
+def run_backtest(candles, product_id, initial_balance=1000, risk_percent=1.0,
+                 window_size=WINDOW_SIZE, min_confirmations=MIN_CONFIRMATIONS,
+                 rr_ratio=2.0, sl_buffer=0.0001, warmup=50, write_journal=True,
+                 journal_format='csv', journal=None, db=None, data_file=None,
+                 htf_timeframes=None, base=300, intrabar=None, signals=None):
+    """
+    Runs the SMC strategy over the candles and returns (trades, report_filename).
+    write_journal=False skips the journal (used by sweeps); report_filename is then None.
+    journal_format: 'csv' or 'npz'. journal: a JournalWriter to log into instead
+    (e.g. fmt='memory'); the caller closes it.
+    db: a trade_db.TradeDB to also record the run (parameters, data_file hash) and its trades in.
+    htf_timeframes: higher timeframes (seconds) resampled on the fly from the
+    base-second candles; signals against their trend are skipped (strategy.apply_htf_filter).
+    intrabar: an intrabar.IntrabarResolver for bars that touch both SL and TP (see simulate_trade_outcome).
+    signals: precomputed signal_cache.SignalArrays for these candles. Nothing is detected
+    then (window_size, min_confirmations and htf_timeframes are already in the arrays)
+    and the loop jumps from one tradable bar to the next.
+    """
     balance = initial_balance
     trades = []
+
+    # Work on the columnar arrays directly (no per-candle dict lookups)
+    candles = as_series(candles)
+    starts = candles.start
+    closes = candles.close
+
+    # Signals are built incrementally: every candle is fed once, even the ones
+    # skipped while a trade is open, so the engine state always matches the window.
+    if signals is None:
+        engine = SignalEngine(window_size, min_confirmations)
+        mtf = MultiTimeframe(htf_timeframes, base) if htf_timeframes else None
+        ohlc = list(zip(candles.open.tolist(), candles.high.tolist(), candles.low.tolist(), closes.tolist()))
+        next_to_feed = 0
+    else:
+        if len(signals) != len(candles):
+            raise ValueError(f"signals cover {len(signals)} bars, candles {len(candles)}")
+        tradable = signals.tradable()
     
     # Extract the base asset (e.g., "SOL" from "SOL-USD")
     asset_name = product_id.split('-')[0] 
 
     # --- Generate Universal Filename ---
     timestamp = datetime.now().strftime("%Y_%m_%d_%H_%M")
-    report_filename = f"trade_journal_{asset_name}_{timestamp}.csv"
+    run_id = None
+    if db is not None:
+        params = {
+            'initial_balance': initial_balance, 'risk_percent': risk_percent, 'window_size': window_size,
+            'min_confirmations': min_confirmations, 'rr_ratio': rr_ratio, 'sl_buffer': sl_buffer, 'warmup': warmup,
+            'htf_timeframes': list(htf_timeframes) if htf_timeframes else None
+        }
+        run_id = db.start_run('backtest', product_id, params, data_file)
+
+    report_filename = None
+    writer = journal
+    if writer is None and write_journal:
+        report_filename = f"trade_journal_{asset_name}_{timestamp}.{journal_format}"
+        writer = JournalWriter(report_filename, fmt=journal_format, db=db, run_id=run_id)
+    elif writer is None and db is not None:
+        writer = JournalWriter(fmt='memory', db=db, run_id=run_id)
+    # A caller's writer doesn't know the run: its trades go into the database after the loop
+    db_trades = [] if db is not None and journal is not None and getattr(journal, 'db', None) is not db else None
 
-    i = 50 
+    i = warmup 
     while i < len(candles) - 1:
-        signal, structural_price, _ = generate_trade_signal(candles, i)
-        entry_price = float(candles[i]['close'])
+        if signals is not None:
+            # Skip straight to the next bar with a BUY/SELL and a structural price
+            k = int(np.searchsorted(tradable, i))
+            if k == len(tradable) or tradable[k] >= len(candles) - 1:
+                break
+            i = int(tradable[k])
+            signal, structural_price, _ = signals.at(i)
+        else:
+            while next_to_feed <= i:
+                signal, structural_price, counts = engine.update_ohlc(*ohlc[next_to_feed])
+                if mtf is not None:
+                    trends = mtf.update_ohlc(int(starts[next_to_feed]), *ohlc[next_to_feed])
+                next_to_feed += 1
+            if mtf is not None:
+                signal, structural_price, _ = apply_htf_filter(signal, structural_price, counts, trends)
+        entry_price = float(closes[i])
 
         if signal in ['BUY', 'SELL'] and structural_price:
-            pos_size, sl_price = calculate_position_size(balance, risk_percent, entry_price, structural_price)
-            tp2_price = calculate_take_profit(entry_price, sl_price, 2.0)
+            pos_size, sl_price = calculate_position_size(balance, risk_percent, entry_price, structural_price, sl_buffer)
+            tp2_price = calculate_take_profit(entry_price, sl_price, rr_ratio)
 
             # (Assume simulate_trade_outcome is defined below)
-            res_pnl_unit, duration = simulate_trade_outcome(signal, entry_price, sl_price, tp2_price, candles, i + 1)
+            res_pnl_unit, duration = simulate_trade_outcome(signal, entry_price, sl_price, tp2_price, candles, i + 1, intrabar)
         
             actual_pnl = pos_size * res_pnl_unit
             balance += actual_pnl
             exit_idx = min(i + max(1, duration), len(candles) - 1)
         
-            log_trade({
-                'entry_unix': candles[i]['start'],
-                'exit_unix': candles[exit_idx]['start'],
+            trade_data = {
+                'entry_unix': int(starts[i]),
+                'exit_unix': int(starts[exit_idx]),
                 'pair': product_id,
                 'side': signal,
                 'entry_price': entry_price,
-                'exit_price': float(candles[exit_idx]['close']),
+                'exit_price': float(closes[exit_idx]),
                 'pnl': round(actual_pnl, 2)
-            }, filename=report_filename)
+            }
+            if writer is not None:
+                writer.log(trade_data)
+            if db_trades is not None:
+                db_trades.append(trade_data)
             
             trades.append({'Signal': signal, 'PnL': actual_pnl, 'Balance': balance})
             i += (duration + 1)
         else:
             i += 1
 
+    if writer is not None and journal is None:
+        writer.close()
+    if db_trades:
+        db.add_trades(run_id, db_trades)
     return trades, report_filename
\ No newline at end of file
@@ -0,0 +1,194 @@
+import argparse
+import json
+import os
+import platform
+import time
+import tracemalloc
+from datetime import datetime
+import numpy as np
+from candles import CandleSeries
+from structure import detect_swings
+from ob_fvg import detect_order_blocks, detect_fvg
+from strategy import generate_trade_signal
+from signal_engine import SignalEngine
+from backtest import run_backtest
+
+BASELINE_FILE = "benchmark_baseline.json"
+DEFAULT_SIZES = [10_000, 100_000]
+
+# generate_trade_signal recomputes a window per bar, so only the first
+# PER_BAR_LIMIT bars are timed on larger series
+PER_BAR_LIMIT = 20_000
+
+# A stage counts as a regression when it gets slower than this vs the baseline
+TOLERANCE = 0.20
+
+# --- 1. SYNTHETIC DATA ---
+# (drift, volatility) per 5m bar: up/down/flat trends in calm and wild markets
+REGIMES = [
+    (0.0002, 0.0015), (-0.0002, 0.0015), (0.0, 0.001),
+    (0.0004, 0.004), (-0.0004, 0.004), (0.0, 0.003)
+]
+
+def synthetic_candles(n, seed=42, start_price=2000.0, start_ts=1_700_000_000, granularity=300):
+    """
+    Seeded random-walk candles with trend and volatility regimes (each lasting
+    200-2000 bars). Fully vectorized, so 10M candles take a few seconds.
+    """
+    rng = np.random.default_rng(seed)
+
+    # Regime of every bar: random-length blocks with a random (drift, vol) pair
+    lengths = rng.integers(200, 2000, size=n // 200 + 1)
+    regime_ids = np.repeat(rng.integers(0, len(REGIMES), size=len(lengths)), lengths)[:n]
+    drift = np.array([r[0] for r in REGIMES])[regime_ids]
+    vol = np.array([r[1] for r in REGIMES])[regime_ids]
+
+    close = start_price * np.exp(np.cumsum(drift + vol * rng.standard_normal(n)))
+    open_ = np.r_[start_price, close[:-1]]
+    body_high = np.maximum(open_, close)
+    body_low = np.minimum(open_, close)
+    high = body_high * (1 + np.abs(rng.standard_normal(n)) * vol / 2)
+    low = body_low * (1 - np.abs(rng.standard_normal(n)) * vol / 2)
+    volume = rng.lognormal(3.0, 1.0, size=n)
+    start = start_ts + np.arange(n, dtype=np.int64) * granularity
+    return CandleSeries(start, open_, high, low, close, volume)
+
+# --- 2. STAGES ---
+def _whole_series(detector):
+    # Detector called once on the full series
+    def stage(candles):
+        detector(candles)
+        return len(candles)
+    return stage
+
+def _signal_per_bar(candles):
+    bars = min(len(candles), PER_BAR_LIMIT)
+    for i in range(bars):
+        generate_trade_signal(candles, i)
+    return bars
+
+def _signal_engine(candles):
+    engine = SignalEngine()
+    for bar in zip(candles.open.tolist(), candles.high.tolist(), candles.low.tolist(), candles.close.tolist()):
+        engine.update_ohlc(*bar)
+    return len(candles)
+
+def _run_backtest(candles):
+    run_backtest(candles, "SYN-USD", write_journal=False)
+    return len(candles)
+
+# name -> function(candles) returning the number of candles it processed
+STAGES = {
+    'detect_swings': _whole_series(detect_swings),
+    'detect_order_blocks': _whole_series(detect_order_blocks),
+    'detect_fvg': _whole_series(detect_fvg),
+    'generate_trade_signal': _signal_per_bar,
+    'signal_engine': _signal_engine,
+    'run_backtest': _run_backtest
+}
+
+def measure(func, candles, track_memory=True):
+    """
+    Times one stage, then (separately, since tracemalloc slows Python code
+    down) runs it again to record its peak traced memory.
+    """
+    t0 = time.perf_counter()
+    processed = func(candles)
+    elapsed = time.perf_counter() - t0
+
+    peak_mb = None
+    if track_memory:
+        tracemalloc.start()
+        func(candles)
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+
+    return {
+        'candles': processed,
+        'seconds': round(elapsed, 4),
+        'candles_per_sec': round(processed / elapsed, 1) if elapsed else float('inf'),
+        'peak_mb': round(peak_mb, 2) if peak_mb is not None else None
+    }
+
+def run_benchmarks(sizes, stages, seed=42, track_memory=True):
+    """Returns {size: {stage: result}}; sizes are keyed as strings for JSON."""
+    results = {}
+    for n in sizes:
+        t0 = time.perf_counter()
+        candles = synthetic_candles(n, seed)
+        print(f"📂 {n:,} synthetic candles generated in {time.perf_counter() - t0:.2f}s")
+        results[str(n)] = {}
+        for name in stages:
+            res = measure(STAGES[name], candles, track_memory)
+            results[str(n)][name] = res
+            mem = f"{res['peak_mb']:>9.2f} MB" if res['peak_mb'] is not None else "        -"
+            print(f"   ├─ {name:<22} {res['candles_per_sec']:>14,.0f} candles/s | {res['seconds']:>8.3f}s | peak {mem}")
+    return results
+
+# --- 3. BASELINES ---
+def save_baseline(results, filename, seed):
+    with open(filename, 'w') as f:
+        json.dump({
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'seed': seed,
+            'results': results
+        }, f, indent=2)
+
+def compare_to_baseline(results, filename, tolerance=TOLERANCE):
+    """Prints the speed change of every stage vs the baseline. Returns the regressed stages."""
+    with open(filename, 'r') as f:
+        baseline = json.load(f)['results']
+
+    regressions = []
+    print(f"\n📊 Compared to {filename} (slower than -{tolerance:.0%} = regression)")
+    for size, stages in results.items():
+        for name, res in stages.items():
+            base = baseline.get(size, {}).get(name)
+            if not base:
+                continue
+            change = res['candles_per_sec'] / base['candles_per_sec'] - 1
+            flag = "❌" if change < -tolerance else "✅"
+            if change < -tolerance:
+                regressions.append(f"{name}@{size}")
+            print(f"   {flag} {name:<22} {int(size):>11,} candles: {change:>+7.1%} speed")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline speed/memory benchmark of the detectors and the backtest")
+    parser.add_argument(
+        "--sizes", type=str, default=",".join(map(str, DEFAULT_SIZES)),
+        help="Comma-separated candle counts (e.g. 10000,100000,1000000,10000000)"
+    )
+    parser.add_argument("--stages", type=str, default=",".join(STAGES), help=f"Stages to run: {', '.join(STAGES)}")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed of the synthetic data")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass (about half the run time)")
+    parser.add_argument("--baseline", type=str, default=BASELINE_FILE, help=f"Baseline JSON (default: {BASELINE_FILE})")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="Allowed slowdown before a stage fails (default: 0.20)")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    stages = [s.strip() for s in args.stages.split(',') if s.strip()]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        parser.error(f"Unknown stage(s): {', '.join(unknown)}")
+
+    print(f"🚀 Benchmarking {len(stages)} stages on {', '.join(f'{n:,}' for n in sizes)} candles (seed {args.seed})...")
+    results = run_benchmarks(sizes, stages, args.seed, not args.no_memory)
+
+    if args.save_baseline:
+        save_baseline(results, args.baseline, args.seed)
+        print(f"✅ Baseline saved to: {args.baseline}")
+    elif os.path.exists(args.baseline):
+        regressions = compare_to_baseline(results, args.baseline, args.tolerance)
+        if regressions:
+            print(f"❌ Slower than baseline: {', '.join(regressions)}")
+            raise SystemExit(1)
+        print("✅ No regressions.")
+    else:
+        print(f"💡 No baseline yet. Run with --save-baseline to create {args.baseline}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import numpy as np
+from candles import CandleSeries, candle_field, FIELDS
+from candle_store import CHUNK_CANDLES, fetch_chunk, sync_candles
+
+class CandleBuffer:
+    """
+    Fixed-capacity ring buffer of the newest closed candles of one pair.
+    warm() fills it once (local store first, the API only for what the store
+    lacks); after that update() asks the API only for candles after the newest
+    one held, which is normally one candle per 5 minutes instead of 300.
+    Candles may arrive newest-first, twice, or still open: open candles are
+    skipped, a repeated start replaces the held candle, and older ones are ignored.
+    on_append(start, open, high, low, close, volume) is called for every new
+    candle, e.g. resample.MultiTimeframe.update_ohlc to keep higher timeframes current.
+    """
+
+    def __init__(self, product_id, capacity=300, granularity=300, on_append=None):
+        self.product_id = product_id
+        self.capacity = capacity
+        self.granularity = granularity
+        self.on_append = on_append
+        self.columns = {f: np.zeros(capacity, dtype=np.int64 if f == 'start' else np.float64) for f in FIELDS}
+        self.head = 0   # Slot the next candle goes into
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def last_start(self):
+        return int(self.columns['start'][(self.head - 1) % self.capacity]) if self.count else None
+
+    def append(self, start, open_p, high_p, low_p, close_p, volume=0.0):
+        """Adds one closed candle. Returns False if it is older than the newest one held."""
+        start = int(start)
+        last = self.last_start
+        if last is not None and start < last:
+            return False
+        new = last is None or start > last
+        if not new:
+            slot = (self.head - 1) % self.capacity  # Same candle again: keep the newer values
+        else:
+            slot = self.head
+            self.head = (self.head + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+        for f, value in zip(FIELDS, (start, open_p, high_p, low_p, close_p, volume)):
+            self.columns[f][slot] = value
+        if new and self.on_append is not None:
+            self.on_append(start, open_p, high_p, low_p, close_p, volume)
+        return True
+
+    def extend(self, candles, now):
+        """Adds API/store candles in any order; those still open at `now` are skipped. Returns how many were new."""
+        rows = sorted(
+            (tuple(candle_field(c, f) for f in FIELDS) for c in candles),
+            key=lambda row: int(row[0])
+        )
+        before = self.last_start
+        added = 0
+        for row in rows:
+            if int(row[0]) + self.granularity > now:
+                break
+            if self.append(*row) and (before is None or int(row[0]) > before):
+                added += 1
+                before = int(row[0])
+        return added
+
+    def series(self):
+        """The held candles, oldest first, as a CandleSeries (a copy, safe to keep)."""
+        idx = (self.head - self.count + np.arange(self.count)) % self.capacity
+        return CandleSeries(*(self.columns[f][idx] for f in FIELDS))
+
+    # --- Fetching ---
+    def warm(self, client, store, now, history=None):
+        """
+        One-off fill: syncs the local store for the window (API only for its gaps) and loads it.
+        history: load this many candles instead; the older ones only pass through on_append.
+        """
+        end_ts = int(now)
+        start_ts = end_ts - end_ts % self.granularity - max(history or 0, self.capacity) * self.granularity
+        sync_candles(client, store, start_ts, end_ts, pause=0, retries=1, verbose=False)
+        return self.extend(store.load(start_ts, end_ts).to_records(), now)
+
+    def update(self, client, now, store=None):
+        """
+        Fetches the candles closed since the newest one held (in API-sized chunks after
+        a long pause) and, if given, saves them to the store. Returns how many were new.
+        """
+        g = self.granularity
+        end_ts = int(now) - int(now) % g
+        since = end_ts - self.capacity * g if self.last_start is None else self.last_start + g
+        since = max(since, end_ts - self.capacity * g)
+
+        added = 0
+        while since < end_ts:
+            chunk_end = min(since + CHUNK_CANDLES * g, end_ts)
+            candles = fetch_chunk(client, self.product_id, since, chunk_end, g)
+            if store is not None:
+                store.append(candles, since, chunk_end)
+            added += self.extend(candles, now)
+            since = chunk_end
+        return added
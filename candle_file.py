@@ -0,0 +1,146 @@
+import argparse
+import os
+import struct
+import numpy as np
+from candles import CandleSeries
+
+# --- Binary layout ---
+# 64-byte header, then one contiguous int64 block of candle starts and one
+# float64 block per column (open, high, low, close, volume), `count` values each.
+# Exchange gaps (no trades, no candle) are kept as gaps, so a .bin file holds
+# exactly the candles of the CSV it came from.
+MAGIC = b'SMCCNDL2'
+MAGIC_V1 = b'SMCCNDL1'  # Older files: dense grid, 'start' not stored
+HEADER = struct.Struct('<8s16sqqqq')  # magic, pair, granularity, first_ts, last_ts, count
+HEADER_SIZE = 64
+COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+EXTENSION = '.bin'
+
+class CandleFile:
+    """
+    Read-only, memory-mapped view of a binary candle file.
+    Opening is O(1) whatever the file size; pages are only read when touched.
+    Files without gaps find a timestamp by arithmetic, the others by binary search.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            magic, pair, granularity, first_ts, last_ts, count = HEADER.unpack(f.read(HEADER.size))
+        if magic not in (MAGIC, MAGIC_V1):
+            raise ValueError(f"{path} is not a candle file")
+
+        self.pair = pair.rstrip(b'\0').decode('ascii')
+        self.granularity = granularity
+        self.first_ts = first_ts
+        self.last_ts = last_ts
+        self.count = count
+        # Every candle on the grid: candle k starts at first_ts + k * granularity
+        self.dense = count == 0 or (last_ts - first_ts) // granularity + 1 == count
+
+        offset = HEADER_SIZE
+        self.start = None
+        if magic == MAGIC and count:
+            self.start = np.memmap(path, dtype=np.int64, mode='r', offset=offset, shape=(count,))
+            offset += count * 8
+        self.columns = {
+            name: np.memmap(path, dtype=np.float64, mode='r', offset=offset + i * count * 8, shape=(count,))
+            for i, name in enumerate(COLUMNS)
+        } if count else {name: np.empty(0) for name in COLUMNS}
+
+    def __len__(self):
+        return self.count
+
+    def index_of(self, ts):
+        """Index of the first candle starting at or after ts (clamped to the file)."""
+        if self.dense:
+            idx = -((self.first_ts - int(ts)) // self.granularity)  # Ceiling division
+            return min(max(idx, 0), self.count)
+        return int(np.searchsorted(self.start, int(ts)))
+
+    def series(self, start_ts=None, end_ts=None):
+        """Candles in [start_ts, end_ts) as a zero-copy CandleSeries over the mapped file."""
+        lo = 0 if start_ts is None else self.index_of(start_ts)
+        hi = self.count if end_ts is None else self.index_of(end_ts)
+        hi = max(lo, hi)
+        if self.start is not None:
+            start = self.start[lo:hi]
+        else:
+            start = self.first_ts + np.arange(lo, hi, dtype=np.int64) * self.granularity
+        return CandleSeries(start, *(self.columns[name][lo:hi] for name in COLUMNS))
+
+def write_candle_file(path, candles, pair, granularity=None, fill_gaps=False):
+    """
+    Writes candles to the binary format. Duplicate timestamps keep the last row.
+    fill_gaps: fill missing candles on the grid (the exchange skips bars with no
+    trades) with a flat, zero-volume candle at the previous close. The detectors
+    then see different bars, so backtests no longer match the CSV.
+    Returns (candles written, gap candles filled).
+    """
+    start = np.asarray(candles.start, dtype=np.int64)
+    order = np.argsort(start, kind='stable')
+    start = start[order]
+    keep = np.r_[start[1:] != start[:-1], True] if len(start) else np.zeros(0, dtype=bool)
+    start = start[keep]
+    cols = {name: np.asarray(getattr(candles, name), dtype=np.float64)[order][keep] for name in COLUMNS}
+
+    if granularity is None:
+        granularity = int(np.median(np.diff(start))) if len(start) > 1 else 300
+
+    first_ts = int(start[0]) if len(start) else 0
+    if fill_gaps and len(start):
+        count = int((start[-1] - first_ts) // granularity) + 1
+        slots = (start - first_ts) // granularity
+
+        # Forward-fill the grid: every slot points at the last real candle at or before it
+        source = np.zeros(count, dtype=np.int64)
+        source[slots] = np.arange(len(start))
+        filled = np.zeros(count, dtype=bool)
+        filled[slots] = True
+        source = np.maximum.accumulate(np.where(filled, source, 0))
+
+        prev_close = cols['close'][source]
+        for name in ('open', 'high', 'low', 'close'):
+            cols[name] = np.where(filled, cols[name][source], prev_close)
+        cols['volume'] = np.where(filled, cols['volume'][source], 0.0)
+        start = first_ts + np.arange(count, dtype=np.int64) * granularity
+    count = len(start)
+
+    last_ts = int(start[-1]) if count else 0
+    header = HEADER.pack(MAGIC, pair.encode('ascii')[:16], granularity, first_ts, last_ts, count)
+    with open(path, 'wb') as f:
+        f.write(header.ljust(HEADER_SIZE, b'\0'))
+        f.write(np.ascontiguousarray(start, dtype=np.int64).tobytes())
+        for name in COLUMNS:
+            f.write(np.ascontiguousarray(cols[name]).tobytes())
+    return count, count - int(keep.sum())
+
+def convert_csv(csv_path, out_path=None, granularity=None, fill_gaps=False):
+    """One-shot conversion of a *_candles.csv file. Returns the output path."""
+    pair = os.path.basename(csv_path).replace(".csv", "").split('_')[0].upper()
+    out_path = out_path or os.path.splitext(csv_path)[0] + EXTENSION
+    count, filled = write_candle_file(out_path, CandleSeries.from_csv(csv_path), pair, granularity, fill_gaps)
+    if filled:
+        print(f"⚠️ {filled} gap candles filled: backtests on {out_path} will differ from the CSV")
+    print(f"✅ {csv_path} -> {out_path} ({count} candles)")
+    return out_path
+
+def load_candles(path):
+    """Opens a .bin candle file (memory-mapped) or parses a candle CSV."""
+    if path.endswith(EXTENSION):
+        return CandleFile(path).series()
+    return CandleSeries.from_csv(path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert *_candles.csv files to the memory-mapped binary format")
+    parser.add_argument("files", nargs="+", help="CSV files to convert")
+    parser.add_argument("--granularity", type=int, default=None, help="Candle size in seconds (default: detected)")
+    parser.add_argument("--fill-gaps", action="store_true",
+                        help="Fill missing candles with flat zero-volume ones (changes backtest results)")
+    args = parser.parse_args()
+
+    for csv_file in args.files:
+        if not os.path.exists(csv_file):
+            print(f"❌ Error: Could not find file '{csv_file}'")
+            continue
+        convert_csv(csv_file, granularity=args.granularity, fill_gaps=args.fill_gaps)
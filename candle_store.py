@@ -0,0 +1,222 @@
+import csv
+import json
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+from candles import CandleSeries, candle_field, FIELDS
+
+# Local candle history lives next to the scripts
+STORE_DIR = Path(__file__).resolve().parent / "candle_data"
+
+# Coinbase returns at most 300 candles per request (350 hard limit)
+CHUNK_CANDLES = 300
+
+# Granularity (seconds) -> Coinbase API enum
+GRANULARITY_NAMES = {
+    60: "ONE_MINUTE", 300: "FIVE_MINUTE", 900: "FIFTEEN_MINUTE", 1800: "THIRTY_MINUTE",
+    3600: "ONE_HOUR", 7200: "TWO_HOUR", 21600: "SIX_HOUR", 86400: "ONE_DAY"
+}
+
+class CandleStore:
+    """
+    Persistent candle history for one pair and granularity.
+    Candles are appended to <pair>_<granularity>.csv as they are fetched and the
+    time ranges already downloaded are kept in a small .ranges.json manifest,
+    so an interrupted download resumes where it stopped and re-runs only fetch the gaps.
+    """
+
+    def __init__(self, product_id, granularity=300, root=STORE_DIR):
+        self.product_id = product_id
+        self.granularity = granularity
+        self.root = Path(root)
+        self.csv_path = self.root / f"{product_id}_{granularity}.csv"
+        self.ranges_path = self.root / f"{product_id}_{granularity}.ranges.json"
+        self.ranges = self._load_ranges()
+        self._index = None  # (starts, byte offsets, bytes indexed) for load_window, built on first use
+
+    # --- Manifest of downloaded [start, end) ranges ---
+    def _load_ranges(self):
+        if not self.ranges_path.exists():
+            return []
+        with open(self.ranges_path, 'r') as f:
+            return [tuple(r) for r in json.load(f)]
+
+    def _save_ranges(self):
+        # Write then rename so a crash never leaves a half-written manifest
+        tmp_path = self.ranges_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump([list(r) for r in self.ranges], f)
+        os.replace(tmp_path, self.ranges_path)
+
+    def mark_covered(self, start_ts, end_ts):
+        """Adds [start_ts, end_ts) to the manifest, merging overlapping ranges."""
+        if end_ts <= start_ts:
+            return
+        merged = []
+        for r_start, r_end in sorted(self.ranges + [(start_ts, end_ts)]):
+            if merged and r_start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], r_end))
+            else:
+                merged.append((r_start, r_end))
+        self.ranges = merged
+        self._save_ranges()
+
+    def missing_chunks(self, start_ts, end_ts):
+        """Splits the parts of [start_ts, end_ts) not downloaded yet into API-sized chunks."""
+        g = self.granularity
+        start_ts = start_ts - start_ts % g
+        end_ts = end_ts - end_ts % g
+
+        gaps = []
+        cursor = start_ts
+        for r_start, r_end in self.ranges:
+            if r_end <= cursor or r_start >= end_ts:
+                continue
+            if r_start > cursor:
+                gaps.append((cursor, r_start))
+            cursor = max(cursor, r_end)
+        if cursor < end_ts:
+            gaps.append((cursor, end_ts))
+
+        chunks = []
+        for gap_start, gap_end in gaps:
+            while gap_start < gap_end:
+                chunk_end = min(gap_start + CHUNK_CANDLES * g, gap_end)
+                chunks.append((gap_start, chunk_end))
+                gap_start = chunk_end
+        return chunks
+
+    # --- Candle data ---
+    def append(self, candles, chunk_start, chunk_end):
+        """
+        Appends one fetched chunk and marks it as downloaded.
+        Only candles inside [chunk_start, chunk_end) are kept. For a chunk that
+        reaches the present, coverage stops after the newest candle received, so
+        candles the exchange has not published yet are fetched next time.
+        """
+        rows = []
+        for c in candles:
+            row = {f: candle_field(c, f) for f in FIELDS}
+            row['start'] = int(row['start'])
+            if chunk_start <= row['start'] < chunk_end:
+                rows.append(row)
+        rows.sort(key=lambda r: r['start'])
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        file_exists = self.csv_path.exists()
+        with open(self.csv_path, mode='a', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(FIELDS))
+            if not file_exists:
+                writer.writeheader()
+            writer.writerows(rows)
+
+        if chunk_end > time.time() - 2 * self.granularity:
+            chunk_end = rows[-1]['start'] + self.granularity if rows else chunk_start
+        self.mark_covered(chunk_start, chunk_end)
+        return len(rows)
+
+    def load(self, start_ts=None, end_ts=None):
+        """Returns the stored candles in [start_ts, end_ts) as a CandleSeries, oldest first, without duplicates."""
+        if not self.csv_path.exists():
+            return CandleSeries([], [], [], [], [], [])
+        import pandas as pd
+
+        df = pd.read_csv(self.csv_path)
+        if start_ts is not None:
+            df = df[df['start'] >= start_ts]
+        if end_ts is not None:
+            df = df[df['start'] < end_ts]
+        df = df.drop_duplicates(subset='start', keep='last').sort_values(by='start')
+        return CandleSeries.from_dataframe(df)
+
+    def _update_index(self):
+        # Start and byte offset of every row; only the bytes appended since the last call are read
+        starts, offsets, indexed = self._index or (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), 0)
+        if self.csv_path.stat().st_size == indexed:
+            return self._index
+        new_starts, new_offsets = [], []
+        with open(self.csv_path, 'rb') as f:
+            f.seek(indexed)
+            if indexed == 0:
+                f.readline()  # Header
+            while True:
+                offset = f.tell()
+                line = f.readline()
+                if not line.endswith(b'\n'):
+                    break  # End of file (or a row still being written)
+                new_starts.append(int(line.split(b',', 1)[0]))
+                new_offsets.append(offset)
+                indexed = f.tell()
+        starts = np.concatenate([starts, np.array(new_starts, dtype=np.int64)])
+        offsets = np.concatenate([offsets, np.array(new_offsets, dtype=np.int64)])
+        # Sorted by start, the later row of a duplicated start last
+        order = np.lexsort((offsets, starts))
+        self._index = starts[order], offsets[order], indexed
+        return self._index
+
+    def load_window(self, start_ts, end_ts):
+        """
+        Same as load(start_ts, end_ts), but only the rows in the window are read
+        (through an index of row offsets built once), for many small lookups.
+        """
+        if not self.csv_path.exists():
+            return CandleSeries([], [], [], [], [], [])
+        starts, offsets, _ = self._update_index()
+        lo = int(np.searchsorted(starts, start_ts))
+        hi = int(np.searchsorted(starts, end_ts))
+        keep = np.append(starts[lo + 1:hi] != starts[lo:hi - 1], True) if hi > lo else []
+        rows = []
+        with open(self.csv_path, 'rb') as f:
+            for offset in offsets[lo:hi][keep].tolist():
+                f.seek(offset)
+                rows.append(f.readline().decode().strip().split(','))
+        columns = list(zip(*rows)) or [[] for _ in FIELDS]
+        return CandleSeries(*(np.array(col, dtype=np.float64) for col in columns))
+
+    def export_csv(self, filename, start_ts=None, end_ts=None):
+        """Writes a range as a classic *_candles.csv (the format run_backtest.py reads)."""
+        series = self.load(start_ts, end_ts)
+        with open(filename, mode='w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['start', 'low', 'high', 'open', 'close', 'volume'])
+            writer.writerows(zip(series.start.tolist(), series.low.tolist(), series.high.tolist(),
+                                 series.open.tolist(), series.close.tolist(), series.volume.tolist()))
+        return len(series)
+
+def fetch_chunk(client, product_id, start_ts, end_ts, granularity=300):
+    """One get_candles call; returns the raw candle list."""
+    response = client.get_candles(
+        product_id=product_id,
+        start=str(start_ts),
+        end=str(end_ts),
+        granularity=GRANULARITY_NAMES[granularity]
+    )
+    # The SDK returns an object; candles are inside the 'candles' key/attribute
+    return response.get('candles', []) if isinstance(response, dict) else response.candles
+
+def sync_candles(client, store, start_ts, end_ts, pause=0.4, retries=3, verbose=True):
+    """
+    Downloads whatever part of [start_ts, end_ts) the store is missing, saving
+    after every chunk. Raises the last API error if a chunk keeps failing;
+    everything fetched before that is already on disk.
+    """
+    fetched = 0
+    for chunk_start, chunk_end in store.missing_chunks(start_ts, end_ts):
+        for attempt in range(1, retries + 1):
+            try:
+                candles = fetch_chunk(client, store.product_id, chunk_start, chunk_end, store.granularity)
+                break
+            except Exception as e:
+                if attempt == retries:
+                    raise
+                print(f"⚠️ API Error (attempt {attempt}/{retries}): {e}")
+                time.sleep(2 ** attempt)
+
+        fetched += store.append(candles, chunk_start, chunk_end)
+        if verbose:
+            print(f"✅ Fetched: {datetime.fromtimestamp(chunk_start)} -> {datetime.fromtimestamp(chunk_end)} ({len(candles)} candles)")
+        if pause:
+            time.sleep(pause) # Avoid Rate Limiting
+    return fetched
@@ -0,0 +1,118 @@
+import numpy as np
+
+# Column order used everywhere in the backtest path
+FIELDS = ('start', 'open', 'high', 'low', 'close', 'volume')
+
+# Maps the different CSV/API column names onto our standard names
+COLUMN_MAPPING = {
+    'timestamp': 'start', 'time': 'start',
+    'price_low': 'low', 'price_high': 'high',
+    'price_open': 'open', 'price_close': 'close',
+    'base_volume': 'volume'
+}
+
+class CandleSeries:
+    """
+    Columnar candle store backed by contiguous NumPy arrays.
+    'start' is int64 (unix seconds), prices and volume are float64.
+    Slicing returns a CandleSeries of views, so no candle data is copied.
+    """
+    __slots__ = FIELDS
+
+    def __init__(self, start, open, high, low, close, volume=None):
+        self.start = np.ascontiguousarray(start, dtype=np.int64)
+        self.open = np.ascontiguousarray(open, dtype=np.float64)
+        self.high = np.ascontiguousarray(high, dtype=np.float64)
+        self.low = np.ascontiguousarray(low, dtype=np.float64)
+        self.close = np.ascontiguousarray(close, dtype=np.float64)
+        if volume is None:
+            volume = np.zeros(len(self.start))
+        self.volume = np.ascontiguousarray(volume, dtype=np.float64)
+
+        n = len(self.start)
+        if any(len(getattr(self, f)) != n for f in FIELDS):
+            raise ValueError("All candle columns must have the same length")
+
+    # --- Constructors ---
+    @classmethod
+    def from_records(cls, records):
+        """Builds a series from a list of candle dicts or Coinbase SDK candle objects (order is kept)."""
+        cols = {f: [] for f in FIELDS}
+        for c in records:
+            for f in FIELDS:
+                cols[f].append(candle_field(c, f))
+        return cls(
+            np.array(cols['start'], dtype=np.float64).astype(np.int64),
+            np.array(cols['open'], dtype=np.float64),
+            np.array(cols['high'], dtype=np.float64),
+            np.array(cols['low'], dtype=np.float64),
+            np.array(cols['close'], dtype=np.float64),
+            np.array(cols['volume'], dtype=np.float64)
+        )
+
+    @classmethod
+    def from_dataframe(cls, df):
+        """Builds a series from a DataFrame that uses our standard (or mappable) column names."""
+        df = df.rename(columns=COLUMN_MAPPING)
+        missing = [col for col in ('start', 'low', 'high', 'open', 'close') if col not in df.columns]
+        if missing:
+            raise ValueError(f"Candle data is missing columns: {missing}")
+        volume = df['volume'].to_numpy() if 'volume' in df.columns else None
+        return cls(
+            df['start'].to_numpy(), df['open'].to_numpy(), df['high'].to_numpy(),
+            df['low'].to_numpy(), df['close'].to_numpy(), volume
+        )
+
+    @classmethod
+    def from_csv(cls, path):
+        """Loads a *_candles.csv file and returns it sorted oldest to newest."""
+        import pandas as pd
+
+        df = pd.read_csv(path).rename(columns=COLUMN_MAPPING)
+        if 'start' in df.columns:
+            df['start'] = pd.to_numeric(df['start'])
+            df = df.sort_values(by='start', ascending=True).reset_index(drop=True)
+        return cls.from_dataframe(df)
+
+    # --- Sequence protocol (compatibility with the old list-of-dicts code) ---
+    def __len__(self):
+        return len(self.start)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return CandleSeries(*(getattr(self, f)[key] for f in FIELDS))
+        return {
+            'start': int(self.start[key]),
+            'open': float(self.open[key]),
+            'high': float(self.high[key]),
+            'low': float(self.low[key]),
+            'close': float(self.close[key]),
+            'volume': float(self.volume[key])
+        }
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __repr__(self):
+        if len(self) == 0:
+            return "CandleSeries(0 candles)"
+        return f"CandleSeries({len(self)} candles, {self.start[0]} -> {self.start[-1]})"
+
+    def to_records(self):
+        """Returns the candles as a list of dicts (the old backtest format)."""
+        return list(self)
+
+def candle_field(candle, name):
+    """Reads one field from a dict or SDK candle object and converts it to a float."""
+    try:
+        value = candle[name]
+    except (KeyError, TypeError, AttributeError):
+        value = getattr(candle, name, 0)
+    return float(value) if value not in (None, '') else 0.0
+
+def as_series(candles):
+    """Returns candles as a CandleSeries, converting a list of candle dicts if needed."""
+    if isinstance(candles, CandleSeries):
+        return candles
+    return CandleSeries.from_records(candles)
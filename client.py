@@ -1,9 +1,7 @@
-from coinbase.rest import RESTClient 
-from auth import API_KEY, API_SECRET
+from auth import client
 
 # The Advanced Trade SDK handles both authenticated and public data via one client
-# It automatically handles JWT generation using the Key and Secret.
-client = RESTClient(api_key=API_KEY, api_secret=API_SECRET)
+# (auth.client: the process-wide exchange.ExchangeClient with retries and rate limits).
 
 # To mimic the old structure, you can still reference them:
 public_client = client 
@@ -1,8 +1,9 @@
 import argparse
 import os
-import time
-import pandas as pd
 from datetime import datetime
+from candle_store import CandleStore, GRANULARITY_NAMES
+from downloader import ChunkDownloader
+from rate_limit import PRIVATE_RATE
 
 # 1. IMPORT THE CLIENT (Ensure auth.py exists in the same folder)
 try:
@@ -11,73 +12,58 @@ except ImportError:
     print("❌ Error: Could not find 'auth.py'. Make sure it's in the same folder.")
     exit()
 
-def download_data(product_id, start_date, end_date, granularity=300):
+def download_data(product_id, start_date, end_date, granularity=300, workers=8, rate=PRIVATE_RATE):
+    """Downloads one pair. See download_pairs()."""
+    download_pairs([product_id], start_date, end_date, granularity, workers, rate)
+
+def download_pairs(product_ids, start_date, end_date, granularity=300, workers=8, rate=PRIVATE_RATE):
     """
-    Downloads historical data in chunks and saves to a CSV.
+    Downloads historical data for several pairs into the local candle store
+    (only the missing chunks, several requests in flight) and exports each
+    requested range to <PAIR>_candles.csv.
     """
     # Setup File Path
     script_dir = os.path.dirname(os.path.abspath(__file__))
-    filename = os.path.join(script_dir, f"{product_id}_candles.csv")
 
-    # Convert Dates to Unix Timestamps (Strings for Coinbase API)
-    start_ts = str(int(datetime.strptime(start_date, "%Y-%m-%d").timestamp()))
-    end_ts = str(int(datetime.strptime(end_date, "%Y-%m-%d").timestamp()))
-    
-    all_candles = []
-    current_start = int(start_ts)
-    final_end = int(end_ts)
+    # Convert Dates to Unix Timestamps
+    start_ts = int(datetime.strptime(start_date, "%Y-%m-%d").timestamp())
+    end_ts = int(datetime.strptime(end_date, "%Y-%m-%d").timestamp())
+
+    stores = [CandleStore(pid, granularity) for pid in product_ids]
+    missing = sum(len(store.missing_chunks(start_ts, end_ts)) for store in stores)
 
-    print(f"🚀 Starting download for {product_id}...")
+    print(f"🚀 Starting download for {', '.join(product_ids)}...")
     print(f"Range: {start_date} to {end_date}")
+    if not missing:
+        print("✅ Range already in the local store, nothing to download.")
+    else:
+        print(f"📦 {missing} chunk(s) missing | {workers} workers | {rate:g} req/s")
 
-    while current_start < final_end:
-        # Calculate chunk end (300 candles max)
-        chunk_end = min(current_start + (300 * granularity), final_end)
-        
-        try:
-            # 2. UPDATED API CALL (Using str for timestamps as required by SDK)
-            response = client.get_candles(
-                product_id=product_id, 
-                start=str(current_start), 
-                end=str(chunk_end), 
-                granularity="FIVE_MINUTE" # Standardizes the 300 (5min) granularity
-            )
-            
-            # 3. EXTRACT DATA FROM RESPONSE OBJECT
-            # The SDK returns an object; candles are inside the 'candles' key/attribute
-            candles = response.get('candles', []) if isinstance(response, dict) else response.candles
-            
-            if candles:
-                all_candles.extend(candles)
-                print(f"✅ Fetched: {datetime.fromtimestamp(current_start)} -> {datetime.fromtimestamp(chunk_end)}")
-            else:
-                print(f"⚠️ Empty response for chunk starting {datetime.fromtimestamp(current_start)}")
-                
-        except Exception as e:
-            print(f"❌ API Error: {e}")
-            break
-            
-        current_start = chunk_end
-        time.sleep(0.4) # Avoid Rate Limiting
+    # 2. FETCH ONLY THE GAPS (each chunk is saved in order as soon as it can be)
+    # The downloader rate-limits and retries across its workers itself, so it gets the plain SDK client
+    results = ChunkDownloader(client.raw, workers=workers, rate=rate).download(stores, start_ts, end_ts)
+    if any(failed for _, failed in results.values()):
+        print("💾 Some chunks failed. Progress so far is saved. Run the same command again to resume.")
 
-   # 4. Save to CSV
-    if all_candles:
-        candle_data = [c.__dict__ if hasattr(c, '__dict__') else c for c in all_candles]
-        df = pd.DataFrame(candle_data)
-        
-        # --- ADD THIS: Ensure data is saved oldest-to-newest ---
-        if 'start' in df.columns:
-            df['start'] = pd.to_numeric(df['start'])
-            df = df.sort_values(by='start', ascending=True)
-        
-        df.to_csv(filename, index=False, header=True)
-        print(f"\n📂 SUCCESS! Saved {len(df)} candles chronologically.")
+    # 3. Export to CSV (oldest to newest) for run_backtest.py
+    for store in stores:
+        filename = os.path.join(script_dir, f"{store.product_id}_candles.csv")
+        saved = store.export_csv(filename, start_ts, end_ts)
+        if saved:
+            print(f"📂 SUCCESS! Saved {saved} {store.product_id} candles chronologically.")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Coinbase Data Downloader")
     parser.add_argument("--start", type=str, required=True, help="Start date (YYYY-MM-DD)")
     parser.add_argument("--end", type=str, required=True, help="End date (YYYY-MM-DD)")
-    parser.add_argument("--pair", type=str, default="ETH-USD", help="Trading pair (default: ETH-USD)")
+    parser.add_argument("--pair", type=str, default="ETH-USD", help="Trading pair(s), comma separated (default: ETH-USD)")
+    parser.add_argument(
+        "--granularity", type=int, default=300, choices=sorted(GRANULARITY_NAMES),
+        help="Candle size in seconds (default: 300)"
+    )
+    parser.add_argument("--workers", type=int, default=8, help="Requests in flight (default: 8)")
+    parser.add_argument("--rate", type=float, default=PRIVATE_RATE, help=f"Max requests per second (default: {PRIVATE_RATE})")
     
     args = parser.parse_args()
-    download_data(args.pair, args.start, args.end)
\ No newline at end of file
+    pairs = [p.strip().upper() for p in args.pair.split(',') if p.strip()]
+    download_pairs(pairs, args.start, args.end, args.granularity, args.workers, args.rate)
\ No newline at end of file
@@ -0,0 +1,78 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from candle_store import fetch_chunk
+from rate_limit import TokenBucket, PRIVATE_RATE
+
+class ChunkDownloader:
+    """
+    Fetches candle chunks for many pairs and date ranges concurrently.
+    All workers share one token bucket so the combined request rate stays under
+    the exchange limit (get_candles is an authenticated endpoint). Failed chunks
+    are retried with jittered exponential backoff. Results are appended to each
+    CandleStore in chunk order, so every store file stays chronological.
+    """
+
+    def __init__(self, client, workers=8, rate=PRIVATE_RATE, retries=5, backoff=0.5):
+        self.client = client
+        self.workers = workers
+        self.bucket = TokenBucket(rate)
+        self.retries = retries
+        self.backoff = backoff
+
+    def _fetch(self, store, chunk_start, chunk_end):
+        for attempt in range(1, self.retries + 1):
+            self.bucket.acquire()
+            try:
+                return fetch_chunk(self.client, store.product_id, chunk_start, chunk_end, store.granularity)
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+                print(f"⚠️ [{store.product_id}] API Error (attempt {attempt}/{self.retries}), retrying in {delay:.1f}s: {e}")
+                time.sleep(delay)
+
+    def download(self, stores, start_ts, end_ts, verbose=True):
+        """
+        Fills [start_ts, end_ts) in every store. Returns {product_id: (candles_saved, chunks_failed)}.
+        Failed chunks stay missing from the store manifest, so the next run retries only those.
+        """
+        plans = [store.missing_chunks(start_ts, end_ts) for store in stores]
+        total = sum(len(chunks) for chunks in plans)
+        results = {store.product_id: [0, 0] for store in stores}
+        if not total:
+            return {pid: tuple(r) for pid, r in results.items()}
+
+        # Completed chunks wait here until every earlier chunk of the same store is done
+        finished = [{} for _ in stores]
+        next_chunk = [0] * len(stores)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {}
+            for s_idx, (store, chunks) in enumerate(zip(stores, plans)):
+                for c_idx, (chunk_start, chunk_end) in enumerate(chunks):
+                    futures[pool.submit(self._fetch, store, chunk_start, chunk_end)] = (s_idx, c_idx)
+
+            for done, future in enumerate(as_completed(futures), start=1):
+                s_idx, c_idx = futures[future]
+                store = stores[s_idx]
+                try:
+                    finished[s_idx][c_idx] = future.result()
+                except Exception as e:
+                    finished[s_idx][c_idx] = None
+                    results[store.product_id][1] += 1
+                    print(f"❌ [{store.product_id}] Chunk failed after {self.retries} attempts: {e}")
+
+                # --- Merge in order ---
+                while next_chunk[s_idx] in finished[s_idx]:
+                    k = next_chunk[s_idx]
+                    candles = finished[s_idx].pop(k)
+                    if candles is not None:
+                        results[store.product_id][0] += store.append(candles, *plans[s_idx][k])
+                    next_chunk[s_idx] += 1
+
+                if verbose:
+                    print(f"   [{done}/{total}] chunks done", end="\r")
+        if verbose:
+            print()
+        return {pid: tuple(r) for pid, r in results.items()}
@@ -0,0 +1,152 @@
+import random
+import threading
+import time
+import uuid
+from pathlib import Path
+import requests
+from rate_limit import TokenBucket, PUBLIC_RATE, PRIVATE_RATE
+
+# CDP key file shared by the bot, the downloader and auth.py
+KEY_FILE = Path(__file__).resolve().parent / "cdp_api_key.json"
+
+# Requests per second per endpoint; the rest get PUBLIC_RATE (get_public_*) or PRIVATE_RATE
+ENDPOINT_RATES = {
+    'get_accounts': 5,   # Polled for the balance, no need to go faster
+}
+
+# Idempotent reads answered from a short-lived cache (seconds)
+CACHE_TTL = {
+    'get_public_product': 2.0,
+    'get_product': 2.0,
+    'get_accounts': 5.0,
+}
+
+# Order endpoints: a client_order_id is added if missing, so a retry after a
+# timeout can't open a second position (Coinbase dedupes on that id)
+ORDER_ENDPOINTS = (
+    'market_order_buy', 'market_order_sell', 'limit_order_gtc_buy', 'limit_order_gtc_sell',
+    'stop_limit_order_gtc_buy', 'stop_limit_order_gtc_sell', 'create_order'
+)
+
+# Calls that change balances; the cached get_accounts answer is dropped after them
+WRITE_ENDPOINTS = ORDER_ENDPOINTS + ('cancel_orders', 'close_position')
+
+def is_transient(error):
+    """
+    Whether a failed call is worth retrying: connection errors, timeouts, 429 and 5xx.
+    Other HTTP errors (bad request, rejected order, auth) and validation errors are final.
+    """
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(error, (ConnectionError, TimeoutError,
+                              requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+class ExchangeClient:
+    """
+    The one Coinbase client of the process. Wraps the SDK RESTClient (created
+    on first use, so importing never fails without a key file) and gives every
+    call per-endpoint rate limiting, retries with jittered exponential backoff,
+    and a short cache for idempotent reads (get_public_product, get_accounts).
+    Only transient failures are retried (see is_transient); the rest are raised at once.
+    Any other SDK method is passed through with the same retry and rate limit.
+    client: use this SDK-like object instead (e.g. mock_exchange.MockExchange).
+    """
+
+    def __init__(self, client=None, key_file=KEY_FILE, retries=3, backoff=0.5, metrics=None,
+                 rates=None, cache_ttl=None):
+        self._client = client
+        self.key_file = key_file
+        self.retries = retries
+        self.backoff = backoff
+        self.metrics = metrics
+        self.rates = {**ENDPOINT_RATES, **(rates or {})}
+        self.cache_ttl = CACHE_TTL if cache_ttl is None else cache_ttl
+        self._buckets = {}
+        self._cache = {}  # (endpoint, args, kwargs) -> (expires, response)
+        self._lock = threading.Lock()
+
+    @property
+    def raw(self):
+        """The underlying SDK client (times every call if metrics are enabled)."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from coinbase.rest import RESTClient
+                    client = RESTClient(key_file=str(self.key_file))
+                    self._client = self.metrics.wrap(client) if self.metrics else client
+        return self._client
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        attr = getattr(self.raw, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            return self.call(name, *args, **kwargs)
+        call.__name__ = name
+        return call
+
+    def _bucket(self, name):
+        bucket = self._buckets.get(name)
+        if bucket is None:
+            with self._lock:
+                default = PUBLIC_RATE if name.startswith('get_public') else PRIVATE_RATE
+                bucket = self._buckets.setdefault(name, TokenBucket(self.rates.get(name, default)))
+        return bucket
+
+    def call(self, name, *args, **kwargs):
+        """Calls one SDK endpoint through the cache, the rate limit and the retries."""
+        ttl = self.cache_ttl.get(name)
+        if ttl:
+            key = (name, args, tuple(sorted(kwargs.items())))
+            with self._lock:
+                hit = self._cache.get(key)
+            if hit and hit[0] > time.monotonic():
+                return hit[1]
+
+        if name in ORDER_ENDPOINTS and not kwargs.get('client_order_id') and not args:
+            kwargs['client_order_id'] = str(uuid.uuid4())
+
+        func = getattr(self.raw, name)
+        for attempt in range(1, self.retries + 1):
+            self._bucket(name).acquire()
+            try:
+                response = func(*args, **kwargs)
+                break
+            except Exception as e:
+                if attempt == self.retries or not is_transient(e):
+                    raise
+                delay = self.backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+                print(f"⚠️ {name} failed (attempt {attempt}/{self.retries}), retrying in {delay:.1f}s: {e}")
+                time.sleep(delay)
+
+        if ttl:
+            with self._lock:
+                self._cache[key] = (time.monotonic() + ttl, response)
+        if name in WRITE_ENDPOINTS:
+            self.invalidate('get_accounts')
+        return response
+
+    def invalidate(self, name=None):
+        """Drops cached responses (of one endpoint, or all)."""
+        with self._lock:
+            for key in [k for k in self._cache if name is None or k[0] == name]:
+                del self._cache[key]
+
+_exchanges = {}
+_exchanges_lock = threading.Lock()
+
+def get_exchange(key_file=KEY_FILE, metrics=None, client=None):
+    """
+    Shared ExchangeClient per key file, so the whole process uses one SDK client
+    (and one connection pool). client: a stand-in such as mock_exchange.MockExchange.
+    """
+    key = 'mock' if client is not None else str(key_file)
+    with _exchanges_lock:
+        exchange = _exchanges.get(key)
+        if exchange is None:
+            exchange = _exchanges[key] = ExchangeClient(client, key_file, metrics=metrics)
+    return exchange
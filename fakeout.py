@@ -1,13 +1,18 @@
+from candles import as_series
+
 def detect_fakeout(candles, swings):
     if len(swings) < 2:
         return None
+    closes = as_series(candles).close
     last = swings[-1]
-    prev = swings[-2]
-    
+    return classify_fakeout(last, swings[-2], closes[last['index']])
+
+def classify_fakeout(last, prev, last_close):
+    """Checks the last two swings; last_close is the close of the candle that made the last swing."""
     # Bullish fakeout: sweep prev low, then current candle closes above the swept level
-    if last['type'] == 'low' and last['price'] < prev['price'] and candles[last['index']]['close'] > prev['price']:
+    if last['type'] == 'low' and last['price'] < prev['price'] and last_close > prev['price']:
         return 'BULL_FAKEOUT'
     # Bearish fakeout: sweep prev high, then current candle closes below the swept level
-    elif last['type'] == 'high' and last['price'] > prev['price'] and candles[last['index']]['close'] < prev['price']:
+    elif last['type'] == 'high' and last['price'] > prev['price'] and last_close < prev['price']:
         return 'BEAR_FAKEOUT'
     return None
\ No newline at end of file
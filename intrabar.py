@@ -0,0 +1,72 @@
+import numpy as np
+from candle_file import CandleFile, load_candles, EXTENSION
+from candle_store import CandleStore
+from candles import as_series
+
+# Lower-timeframe candles read from a CandleStore at a time (one day) around an ambiguous bar
+STORE_WINDOW = 86400
+
+class IntrabarResolver:
+    """
+    Decides which level a backtest candle hit first when it touches both
+    (SL and TP1, or breakeven and TP2), from lower-timeframe candles of the
+    same pair. Nothing is read until the first ambiguous bar. From a CandleStore
+    only the day around each ambiguous bar is read (and kept for the next ones);
+    a .bin file stays memory-mapped, so only the pages around ambiguous bars are
+    read from disk; a CSV is read once.
+    """
+
+    def __init__(self, source, base=300):
+        # source: a CandleStore (e.g. CandleStore(pair, 60)), a .bin/CSV path or candles
+        self.source = source
+        self.base = base
+        self._candles = None
+        self._window = None  # (start, end) of the store candles in _candles
+        self.ambiguous = 0   # Bars that touched both levels
+        self.resolved = 0    # ...of which the lower timeframe decided the order
+
+    def _load(self, start_ts, end_ts):
+        if isinstance(self.source, CandleStore):
+            if self._window is None or not (self._window[0] <= start_ts and end_ts <= self._window[1]):
+                window_start = start_ts - start_ts % STORE_WINDOW
+                self._window = (window_start, max(window_start + STORE_WINDOW, end_ts))
+                self._candles = self.source.load_window(*self._window)
+        elif self._candles is None:
+            if isinstance(self.source, str):
+                self._candles = CandleFile(self.source).series() if self.source.endswith(EXTENSION) \
+                    else load_candles(self.source)
+            else:
+                self._candles = as_series(self.source)
+        return self._candles
+
+    def first_touch(self, start_ts, end_ts, below, above):
+        """
+        First lower-timeframe candle in [start_ts, end_ts) with low <= below or high >= above.
+        Returns (its start, low_touched, high_touched), or None if there is no data or no touch.
+        """
+        candles = self._load(start_ts, end_ts)
+        lo = int(np.searchsorted(candles.start, start_ts))
+        hi = int(np.searchsorted(candles.start, end_ts))
+        low_hit = candles.low[lo:hi] <= below
+        high_hit = candles.high[lo:hi] >= above
+        hits = low_hit | high_hit
+        if not hits.any():
+            return None
+        k = int(hits.argmax())
+        return int(candles.start[lo + k]), bool(low_hit[k]), bool(high_hit[k])
+
+    def order(self, bar_start, below, above):
+        """
+        Which level the bar starting at bar_start touched first: 'below', 'above', or None
+        when the lower timeframe can't tell (no data, or one lower candle touches both).
+        Also returns the start of the deciding lower candle.
+        """
+        self.ambiguous += 1
+        touch = self.first_touch(bar_start, bar_start + self.base, below, above)
+        if touch is None or (touch[1] and touch[2]):
+            return None, None
+        self.resolved += 1
+        return ('below' if touch[1] else 'above'), touch[0]
+
+    def summary(self):
+        return f"{self.resolved}/{self.ambiguous} ambiguous bars resolved on the lower timeframe"
@@ -1,53 +1,205 @@
 import csv
+import io
 import os
+import threading
 from datetime import datetime
+from functools import lru_cache
+import numpy as np
 
 # Default file for the Live/Paper bot
 DEFAULT_JOURNAL = "trade_journal.csv"
 
-def log_trade(trade_data, filename=DEFAULT_JOURNAL):
-    """
-    Logs trade details with human-readable dates.
-    filename: defaults to trade_journal.csv unless specified by backtest.
-    """
-    file_exists = os.path.isfile(filename)
-    
-    # Handle Date Formatting
+FIELDNAMES = [
+    'Entry_Date', 'Exit_Date', 'Holding_Mins', 'Pair', 'Side',
+    'Entry_Price', 'Exit_Price', 'P/L_USD'
+]
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# csv: same file as log_trade | npz: one NumPy array per column | memory: nothing written
+JOURNAL_FORMATS = ('csv', 'npz', 'memory')
+
+# Raw trade columns kept by the npz and memory formats (Unix times, no date strings)
+COLUMNS = ('entry_unix', 'exit_unix', 'pair', 'side', 'entry_price', 'exit_price', 'pnl')
+
+# Serializes writers that touch the same journal from several threads (multi_runner)
+_file_lock = threading.Lock()
+
+@lru_cache(maxsize=4096)
+def _format_time(ts):
+    return datetime.fromtimestamp(ts).strftime(TIME_FORMAT)
+
+def journal_row(trade_data):
+    """Turns one trade dict into a journal CSV row with human-readable dates."""
     # If it's a backtest, we have Unix. If it's Live, we might have a string or now()
     if 'entry_unix' in trade_data:
-        entry_time = datetime.fromtimestamp(trade_data['entry_unix']).strftime('%Y-%m-%d %H:%M:%S')
+        entry_time = _format_time(trade_data['entry_unix'])
     else:
-        entry_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        entry_time = datetime.now().strftime(TIME_FORMAT)
 
     # Calculate Holding Time (Only if exit_unix exists, like in backtests)
     holding_mins = 0
     exit_time = "OPEN"
     if 'exit_unix' in trade_data:
-        exit_time = datetime.fromtimestamp(trade_data['exit_unix']).strftime('%Y-%m-%d %H:%M:%S')
+        exit_time = _format_time(trade_data['exit_unix'])
         holding_mins = round((trade_data['exit_unix'] - trade_data['entry_unix']) / 60, 2)
 
-    fieldnames = [
-        'Entry_Date', 'Exit_Date', 'Holding_Mins', 'Pair', 'Side', 
-        'Entry_Price', 'Exit_Price', 'P/L_USD'
-    ]
-
-    with open(filename, mode='a', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        if not file_exists:
-            writer.writeheader()
-
-        writer.writerow({
-            'Entry_Date': entry_time,
-            'Exit_Date': exit_time,
-            'Holding_Mins': holding_mins,
-            'Pair': trade_data.get('pair', trade_data.get('product', 'ETH-USD')),
-            'Side': trade_data['side'],
-            'Entry_Price': trade_data['entry_price'],
-            'Exit_Price': trade_data.get('exit_price', 0),
-            'P/L_USD': trade_data.get('pnl', 0)
-        })
-
-def update_journal_exit(exit_price, pnl, filename=DEFAULT_JOURNAL):
-    """Used by main.py to update the last trade with final exit data."""
+    return {
+        'Entry_Date': entry_time,
+        'Exit_Date': exit_time,
+        'Holding_Mins': holding_mins,
+        'Pair': trade_data.get('pair', trade_data.get('product', 'ETH-USD')),
+        'Side': trade_data['side'],
+        'Entry_Price': trade_data['entry_price'],
+        'Exit_Price': trade_data.get('exit_price', 0),
+        'P/L_USD': trade_data.get('pnl', 0)
+    }
+
+class JournalWriter:
+    """
+    Buffered trade journal: trades are kept in memory and written in batches
+    instead of opening the file once per trade. Use as a context manager or call close().
+    fmt='csv'    appends to the CSV every batch_size trades and on close
+    fmt='npz'    writes one NumPy array per column on close (Unix times, no date strings)
+    fmt='memory' writes nothing; read trades / columns() directly (sweeps)
+    db/run_id: also insert every batch into a trade_db.TradeDB run.
+    """
+
+    def __init__(self, filename=None, fmt='csv', batch_size=500, db=None, run_id=None):
+        if fmt not in JOURNAL_FORMATS:
+            raise ValueError(f"Unknown journal format '{fmt}'. Choose from: {', '.join(JOURNAL_FORMATS)}")
+        if fmt != 'memory' and not filename:
+            raise ValueError(f"A filename is needed for the '{fmt}' journal format")
+        self.filename = filename
+        self.fmt = fmt
+        self.batch_size = batch_size
+        self.db = db
+        self.run_id = run_id
+        self.trades = []  # Trades not written yet (every trade for npz/memory)
+        self._db_pending = []  # Trades not inserted into the database yet
+
+    def log(self, trade_data):
+        self.trades.append(trade_data)
+        if self.db is not None:
+            self._db_pending.append(trade_data)
+            if len(self._db_pending) >= self.batch_size:
+                self._flush_db()
+        if self.fmt == 'csv' and len(self.trades) >= self.batch_size:
+            self.flush()
+
+    def columns(self):
+        """The buffered trades as a dict of NumPy arrays (missing times/prices are NaN / 0)."""
+        return {
+            'entry_unix': np.array([t.get('entry_unix', np.nan) for t in self.trades], dtype=np.float64),
+            'exit_unix': np.array([t.get('exit_unix', np.nan) for t in self.trades], dtype=np.float64),
+            'pair': np.array([t.get('pair', t.get('product', 'ETH-USD')) for t in self.trades], dtype=str),
+            'side': np.array([t['side'] for t in self.trades], dtype=str),
+            'entry_price': np.array([t['entry_price'] for t in self.trades], dtype=np.float64),
+            'exit_price': np.array([t.get('exit_price', 0) for t in self.trades], dtype=np.float64),
+            'pnl': np.array([t.get('pnl', 0) for t in self.trades], dtype=np.float64)
+        }
+
+    def _flush_db(self):
+        if self._db_pending:
+            self.db.add_trades(self.run_id, self._db_pending)
+            self._db_pending = []
+
+    def flush(self):
+        self._flush_db()
+        if self.fmt == 'npz':
+            np.savez(self.filename, **self.columns())
+        elif self.fmt == 'csv' and self.trades:
+            with _file_lock:
+                file_exists = os.path.isfile(self.filename)
+                with open(self.filename, mode='a', newline='') as f:
+                    writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+                    if not file_exists:
+                        writer.writeheader()
+                    writer.writerows(journal_row(t) for t in self.trades)
+            self.trades = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def load_journal_npz(filename):
+    """Reads an npz journal back as a dict of column arrays."""
+    with np.load(filename) as data:
+        return {name: data[name] for name in COLUMNS}
+
+def log_trade(trade_data, filename=DEFAULT_JOURNAL):
+    """
+    Logs trade details with human-readable dates.
+    filename: defaults to trade_journal.csv unless specified by backtest.
+    For many trades in a row use a JournalWriter instead.
+    """
+    with JournalWriter(filename) as writer:
+        writer.log(trade_data)
+
+def _find_open_row(f, pair=None, block_size=8192):
+    """
+    Byte offset and raw line of the newest OPEN row (optionally for one pair).
+    The file is scanned backwards in growing blocks, so only the tail is read
+    when the trade was opened recently.
+    """
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    read = 0
+    while read < size:
+        read = min(size, read + block_size)
+        block_size *= 2
+        f.seek(size - read)
+        lines = f.read(read).splitlines(keepends=True)
+
+        offset = size - read
+        if offset > 0 and lines:
+            # The first line of the block may be cut off; it is re-read with the next block
+            offset += len(lines[0])
+            lines = lines[1:]
+
+        rows = []
+        for line in lines:
+            rows.append((offset, line))
+            offset += len(line)
+
+        for offset, line in reversed(rows):
+            row = next(csv.reader([line.decode()]), [])
+            if len(row) == len(FIELDNAMES) and row[1] == 'OPEN' and (pair is None or row[3] == pair):
+                return offset, line
+    return None, None
+
+def update_journal_exit(exit_price, pnl, filename=DEFAULT_JOURNAL, pair=None, exit_unix=None):
+    """
+    Used by main.py to update the last open trade with final exit data.
+    Only the rows from that trade onwards are rewritten, not the whole file.
+    Returns False if there is no open trade to close.
+    """
     # Note: This updates the DEFAULT file for live sessions
-    pass
\ No newline at end of file
+    if not os.path.isfile(filename):
+        return False
+    exit_unix = exit_unix or datetime.now().timestamp()
+
+    with _file_lock, open(filename, mode='r+b') as f:
+        offset, line = _find_open_row(f, pair)
+        if offset is None:
+            return False
+        f.seek(offset + len(line))
+        tail = f.read()
+
+        row = dict(zip(FIELDNAMES, next(csv.reader([line.decode()]))))
+        entry_unix = datetime.strptime(row['Entry_Date'], TIME_FORMAT).timestamp()
+        row['Exit_Date'] = _format_time(exit_unix)
+        row['Holding_Mins'] = round((exit_unix - entry_unix) / 60, 2)
+        row['Exit_Price'] = exit_price
+        row['P/L_USD'] = pnl
+
+        out = io.StringIO()
+        csv.DictWriter(out, fieldnames=FIELDNAMES).writerow(row)
+        f.seek(offset)
+        f.write(out.getvalue().encode() + tail)
+        f.truncate()
+    return True
\ No newline at end of file
@@ -1,14 +1,22 @@
 ﻿import os
 import time
-import requests
+from contextlib import closing
 from pathlib import Path
 from datetime import datetime
 from dotenv import load_dotenv
-from coinbase.rest import RESTClient
-from strategy import generate_trade_signal
+from strategy import generate_trade_signal, apply_htf_filter
+from resample import HTF_WINDOW, MultiTimeframe, timeframe_label
 from risk import calculate_position_size, calculate_take_profit
 import trader
 import journal 
+from price_feed import WebSocketPriceFeed
+from candle_store import CandleStore, STORE_DIR
+from candle_buffer import CandleBuffer
+from trade_db import TradeDB
+from metrics import Metrics
+from exchange import get_exchange
+from mock_exchange import MockExchange, MockTickerFeed
+from notifications import get_notification_service, HIGH, NORMAL
 
 # --- 1. SETUP & ENV ---
 base_dir = Path(__file__).resolve().parent
@@ -20,22 +28,84 @@ CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "").strip()
 # --- 2. CONFIGURATION ---
 PAPER_MODE = True  # Set to False for real trading
 PRODUCT_ID = "ETH-USD"
+PRODUCT_IDS = ["ETH-USD", "BTC-USD", "SOL-USD"]  # Pairs watched by multi_runner.py
 BALANCE = 1000.0 if PAPER_MODE else 0.0 
 RISK_PCT = 1.0  
 LOOKBACK_WINDOW = 100 
+HTF_TIMEFRAMES = None  # e.g. (900, 3600, 14400): skip signals against the 15m/1h/4h trend
+JOURNAL_FILE = journal.DEFAULT_JOURNAL  # Trade journal of live/paper sessions
+TRADE_DB = None  # e.g. "trades.db" to also record every session and trade in SQLite (trade_db.py)
+METRICS_PORT = None  # e.g. 9108 to serve Prometheus metrics at http://127.0.0.1:9108/metrics
+METRICS_LOG_INTERVAL = None  # e.g. 300 to print a stage-timing summary line every 5 minutes
+MOCK_EXCHANGE = False  # True: run offline against mock_exchange.MockExchange (load tests, no real orders)
+CANDLE_STORE_DIR = STORE_DIR  # Local candle history the live loop warms up from (candle_store.py)
+TRADE_RETRY_SECONDS = 5  # Pause before resubscribing after a price feed error while a trade is open
 
-# Initialize Coinbase Client (CDP API)
+# Stage timers and API latency histograms (no-ops unless one of the above is set)
+metrics = Metrics(enabled=METRICS_PORT is not None or METRICS_LOG_INTERVAL is not None)
+_metrics_started = False
+
+# Telegram messages are sent from a background thread; trading code only queues them.
+# One service per process, shared with anything else that notifies (flushed at exit).
+notifier = get_notification_service(TELEGRAM_TOKEN, CHAT_ID, metrics=metrics)
+
+# Initialize Coinbase Client (CDP API): one pooled client with retries, rate limits and cached reads
 KEY_FILE_PATH = base_dir / "cdp_api_key.json"
-client = RESTClient(key_file=str(KEY_FILE_PATH))
+if MOCK_EXCHANGE:
+    client = get_exchange(client=metrics.wrap(MockExchange()), metrics=metrics)
+else:
+    client = get_exchange(KEY_FILE_PATH, metrics=metrics)
+
+# Ticker stream used to manage open trades (opened on first use)
+_price_feed = None
+
+def rest_price(product_id):
+    """Ticker price over REST; the price feed's fallback while the WebSocket is stalled."""
+    return float(client.get_public_product(product_id=product_id)['price'])
+
+def get_price_feed():
+    global _price_feed
+    if _price_feed is None:
+        if MOCK_EXCHANGE:
+            _price_feed = MockTickerFeed(client.raw)
+        else:
+            _price_feed = WebSocketPriceFeed(key_file=KEY_FILE_PATH, fallback=rest_price)
+    return _price_feed
+
+# (TradeDB, run_id) of this session when TRADE_DB is set
+_trade_run = None
+
+def start_trade_run(product_ids):
+    """Registers this bot session as a run in the trade database (if enabled)."""
+    global _trade_run
+    if TRADE_DB and _trade_run is None:
+        db = TradeDB(TRADE_DB)
+        params = {'risk_pct': RISK_PCT, 'balance': BALANCE, 'lookback_window': LOOKBACK_WINDOW}
+        _trade_run = (db, db.start_run('paper' if PAPER_MODE else 'live', product_ids, params))
+
+def record_trade(trade_data):
+    """Logs a new trade to the journal and, if enabled, the trade database."""
+    journal.log_trade(trade_data, JOURNAL_FILE)
+    if _trade_run:
+        db, run_id = _trade_run
+        db.add_trades(run_id, [trade_data])
+
+def start_metrics():
+    """Starts the metrics endpoint / log line once, if configured."""
+    global _metrics_started
+    if _metrics_started:
+        return
+    _metrics_started = True
+    if METRICS_PORT is not None:
+        metrics.serve(METRICS_PORT)
+        print(f"📈 Metrics at http://127.0.0.1:{METRICS_PORT}/metrics")
+    if METRICS_LOG_INTERVAL:
+        metrics.log_every(METRICS_LOG_INTERVAL)
 
-def send_telegram(message):
+def send_telegram(message, priority=NORMAL, key=None):
+    """Queues a Telegram message and returns straight away (see notifications.NotificationService)."""
     prefix = "[PAPER] " if PAPER_MODE else "[LIVE] "
-    if not TELEGRAM_TOKEN or not CHAT_ID: return
-    url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-    try:
-        requests.post(url, json={"chat_id": CHAT_ID, "text": prefix + message}, timeout=10)
-    except Exception as e:
-        print(f"Telegram Error: {e}")
+    notifier.notify(prefix + message, priority, key)
 
 def get_coinbase_balance(client):
     if PAPER_MODE: return BALANCE
@@ -49,6 +119,104 @@ def get_coinbase_balance(client):
         print(f"Balance Fetch Error: {e}")
         return 0.0
 
+# Closed-candle window per pair (candle_buffer.CandleBuffer), warmed on the first fetch
+_candle_buffers = {}
+# Higher-timeframe bars per pair (resample.MultiTimeframe), fed every new candle of the buffer
+_htf_views = {}
+
+@metrics.timed('fetch_candles')
+def fetch_candles(product_id):
+    """
+    Returns the last 300 closed five-minute candles for one pair (oldest first).
+    The first call fills the pair's ring buffer from the local candle store (the
+    API only for what it lacks); later calls only request the candles closed since
+    the newest one held, normally a single candle.
+    """
+    now = time.time()
+    buffer = _candle_buffers.get(product_id)
+    store = CandleStore(product_id, 300, root=CANDLE_STORE_DIR)
+    if buffer is None:
+        history = None
+        on_append = None
+        if HTF_TIMEFRAMES:
+            # Warm-up only: enough 5m history to build HTF_WINDOW bars of the largest timeframe
+            # (from the local store after the first run); later candles arrive one by one
+            history = (HTF_WINDOW + 2) * max(HTF_TIMEFRAMES) // 300
+            _htf_views[product_id] = MultiTimeframe(HTF_TIMEFRAMES, 300)
+            on_append = _htf_views[product_id].update_ohlc
+        buffer = CandleBuffer(product_id, 300, 300, on_append)
+        buffer.warm(client, store, now, history)
+        _candle_buffers[product_id] = buffer
+    else:
+        buffer.update(client, now, store)  # The client retries
+    return buffer.series()
+
+def pair_signal(product_id, candles):
+    """
+    (signal, structural_price, counts) for the newest candle of a pair. With HTF_TIMEFRAMES
+    the pair's incrementally built higher-timeframe trends veto signals against them.
+    """
+    result = generate_trade_signal(candles, len(candles) - 1)
+    view = _htf_views.get(product_id) if HTF_TIMEFRAMES else None
+    if view is not None:
+        result = apply_htf_filter(*result, view.trends())
+    return result
+
+def format_htf(trends):
+    return " | ".join(f"{timeframe_label(tf)} {trend}" for tf, trend in trends.items())
+
+def plan_trade(entry_price, structural_price, balance):
+    """
+    Returns (pos_size_usd, sl_price, tp1, tp2) for a new entry.
+    The notional is capped at the balance: a tight stop can size a 1% risk at
+    10x the account or more, and the spot account has no leverage.
+    """
+    # FIX: Explicitly convert structural_price to float to avoid math errors
+    sl_target = float(structural_price)
+    
+    # Position sizing and targets (calculate_position_size returns base units, not USD)
+    pos_size, sl_price = calculate_position_size(balance, RISK_PCT, entry_price, sl_target)
+    pos_size_usd = min(pos_size * entry_price, balance)
+    tp2 = calculate_take_profit(entry_price, sl_price, 2.0)
+    # TP1 = 1R in the trade's direction (below the entry for a SELL)
+    risk = abs(entry_price - sl_price)
+    tp1 = entry_price + risk if entry_price < tp2 else entry_price - risk
+    return pos_size_usd, sl_price, tp1, tp2
+
+@metrics.timed('open_position')
+def open_position(product_id, signal, entry_price, pos_size_usd, sl_price):
+    """Places the (paper or real) entry and logs it. Returns the filled quantity, or None."""
+    if PAPER_MODE:
+        qty = pos_size_usd / entry_price
+        send_telegram(f"📝 PAPER ORDER: {signal} {qty:.4f} {product_id.split('-')[0]} at {entry_price}", HIGH)
+        record_trade({
+            'side': signal, 'pair': product_id, 'entry_price': entry_price, 
+            'exit_price': 0, 'pnl': 0, 'entry_unix': time.time()
+        })
+        return qty
+
+    if signal != 'BUY':
+        # trader.py only has the long path (market buy + stop-limit sell)
+        print(f"⚠️ Skipping live {signal} entry on {product_id}: short selling is not supported")
+        return None
+
+    order = trader.place_market_order_buy(client, product_id, pos_size_usd)
+    if not order:
+        return None
+    if not order['success']:
+        print(f"❌ [{product_id}] Order rejected: {order['error_response']}")
+        return None
+    # The create-order reply only confirms the order; the filled size comes from the order itself
+    qty = trader.get_filled_size(client, order['success_response']['order_id'])
+    if not qty:
+        return None
+    record_trade({
+        'side': signal, 'pair': product_id, 'entry_price': entry_price, 
+        'entry_unix': time.time()
+    })
+    trader.place_initial_stop_loss(client, product_id, qty, sl_price)
+    return qty
+
 def run_bot():
     global BALANCE
     mode_text = "VIRTUAL (Paper)" if PAPER_MODE else "REAL MONEY"
@@ -57,6 +225,8 @@ def run_bot():
     if not PAPER_MODE:
         BALANCE = get_coinbase_balance(client)
     
+    start_trade_run([PRODUCT_ID])
+    start_metrics()
     status_init = f"✅ Bot Online!\n💵 Balance: ${BALANCE:.2f}\n📍 Pair: {PRODUCT_ID}"
     print("-" * 30 + "\n" + status_init + "\n" + "-" * 30)
     send_telegram(status_init)
@@ -73,16 +243,9 @@ def run_bot():
                 time.sleep(wait_time)
 
             # --- 2. FETCH DATA ---
-            end_ts = int(time.time())
-            start_ts = end_ts - (300 * 300)
-            
-            candles_response = client.get_public_candles(
-                product_id=PRODUCT_ID, 
-                granularity="FIVE_MINUTE", 
-                start=str(start_ts), 
-                end=str(end_ts)
-            )
-            candles = candles_response['candles']
+            candle_close = int(time.time()) // 300 * 300
+            metrics.observe('heartbeat_delay_seconds', time.time() - candle_close)
+            candles = fetch_candles(PRODUCT_ID)
 
             if len(candles) < LOOKBACK_WINDOW:
                 print(f"⚠️ Data warm-up: {len(candles)}/{LOOKBACK_WINDOW}")
@@ -90,11 +253,14 @@ def run_bot():
                 continue
 
             # --- 3. GENERATE SIGNAL & HEARTBEAT ---
-            signal, structural_price, counts = generate_trade_signal(candles, len(candles) - 1)
+            with metrics.timer('stage_seconds', stage='generate_signal'):
+                signal, structural_price, counts = pair_signal(PRODUCT_ID, candles)
             
             ts = datetime.now().strftime('%H:%M:%S')
             print(f"[{ts}] 🛰️ HEARTBEAT")
             print(f"   ├─ Trend: {counts['trend']} | Fakeout: {counts['fake']}")
+            if 'htf' in counts:
+                print(f"   ├─ HTF: {format_htf(counts['htf'])}")
             print(f"   ├─ Bullish: {counts['bull']}/3")
             print(f"   └─ Bearish: {counts['bear']}/3")
 
@@ -102,87 +268,125 @@ def run_bot():
             if signal in ['BUY', 'SELL'] and structural_price:
                 ticker = client.get_public_product(product_id=PRODUCT_ID)
                 entry_price = float(ticker['price'])
-                
-                # FIX: Explicitly convert structural_price to float to avoid math errors
-                sl_target = float(structural_price)
-                
-                # Position sizing and targets
-                pos_size_usd, sl_price = calculate_position_size(BALANCE, RISK_PCT, entry_price, sl_target)
-                tp2 = calculate_take_profit(entry_price, sl_price, 2.0)
-                tp1 = entry_price + abs(entry_price - sl_price)
+                pos_size_usd, sl_price, tp1, tp2 = plan_trade(entry_price, structural_price, BALANCE)
 
                 print(f"🎯 {signal} Signal Found! Entry: {entry_price} | SL: {sl_price} | TP2: {tp2}")
                 
-                if PAPER_MODE:
-                    qty = pos_size_usd / entry_price
-                    send_telegram(f"📝 PAPER ORDER: {signal} {qty:.4f} ETH at {entry_price}")
-                    journal.log_trade({
-                        'side': signal, 'pair': PRODUCT_ID, 'entry_price': entry_price, 
-                        'exit_price': 0, 'pnl': 0, 'entry_unix': time.time()
-                    })
-                    manage_trade(entry_price, tp1, tp2, sl_price, qty)
-                else:
-                    order = trader.place_market_order_buy(client, PRODUCT_ID, pos_size_usd)
-                    if order:
-                        qty = float(order['base_size'])
-                        journal.log_trade({
-                            'side': signal, 'pair': PRODUCT_ID, 'entry_price': entry_price, 
-                            'entry_unix': time.time()
-                        })
-                        trader.place_initial_stop_loss(client, PRODUCT_ID, qty, sl_price)
-                        manage_trade(entry_price, tp1, tp2, sl_price, qty)
+                qty = open_position(PRODUCT_ID, signal, entry_price, pos_size_usd, sl_price)
+                if qty:
+                    metrics.observe('close_to_order_seconds', time.time() - candle_close)
+                    manage_trade(entry_price, tp1, tp2, sl_price, qty, PRODUCT_ID)
+                    if not PAPER_MODE:
                         BALANCE = get_coinbase_balance(client)
 
             # --- 5. COOL DOWN ---
             time.sleep(15)
 
         except Exception as e:
+            metrics.inc('errors_total', source='run_bot')
             print(f"❌ Critical Error: {e}")
             # If a connection reset happens, wait a bit longer before retry
             time.sleep(60)
 
-def manage_trade(entry, tp1, tp2, sl, qty):
+def check_trade_exit(trade, price):
+    """
+    One step of the TP1 -> breakeven -> TP2/SL state machine.
+    trade: dict from new_trade(); tp1_hit, pnl and exit_price are updated in place
+    (half the position is booked at TP1, the rest at the close).
+    Returns 'TP1', 'SL', 'CLOSED' or None.
+    """
+    event = _exit_event(trade, price)
+    if event:
+        _book(trade, price, 1.0 if event == 'SL' else 0.5)
+    if event in ('SL', 'CLOSED'):
+        trade['exit_price'] = price
+    return event
+
+def _book(trade, price, fraction):
+    # Realized PnL of closing `fraction` of the position at `price`
+    move = price - trade['entry'] if trade['side'] == 'BUY' else trade['entry'] - price
+    trade['pnl'] += fraction * trade['qty'] * move
+
+def _exit_event(trade, price):
+    entry, tp1, tp2, sl = trade['entry'], trade['tp1'], trade['tp2'], trade['sl']
+
+    # Logic for BUY trades
+    if entry < tp2: 
+        if not trade['tp1_hit']:
+            if price >= tp1:
+                trade['tp1_hit'] = True
+                return 'TP1'
+            elif price <= sl:
+                return 'SL'
+        elif price >= tp2 or price <= entry:
+            return 'CLOSED'
+    # Logic for SELL trades
+    else: 
+        if not trade['tp1_hit']:
+            if price <= tp1:
+                trade['tp1_hit'] = True
+                return 'TP1'
+            elif price >= sl:
+                return 'SL'
+        elif price <= tp2 or price >= entry:
+            return 'CLOSED'
+    return None
+
+def new_trade(entry, tp1, tp2, sl, qty):
     # Ensure all inputs are treated as floats
     entry, tp1, tp2, sl, qty = map(float, [entry, tp1, tp2, sl, qty])
-    tp1_hit = False
+    return {
+        'entry': entry, 'tp1': tp1, 'tp2': tp2, 'sl': sl, 'qty': qty, 'tp1_hit': False,
+        'side': 'BUY' if entry < tp2 else 'SELL', 'pnl': 0.0, 'exit_price': None
+    }
+
+def close_trade(trade, product_id=PRODUCT_ID):
+    """Writes the exit price and realized PnL of a finished trade into its OPEN journal row (and the trade database)."""
+    pnl = round(trade['pnl'], 2)
+    exit_unix = time.time()
+    if not journal.update_journal_exit(trade['exit_price'], pnl, JOURNAL_FILE, product_id, exit_unix):
+        print(f"⚠️ [{product_id}] No open journal entry to close.")
+    if _trade_run:
+        db, run_id = _trade_run
+        db.close_trade(run_id, product_id, trade['exit_price'], pnl, exit_unix)
+
+def report_trade_event(event, product_id=PRODUCT_ID):
+    if event == 'TP1':
+        print(f"💰 [{product_id}] TP1 Hit! Moving SL to Breakeven.")
+    elif event == 'SL':
+        print(f"🛑 [{product_id}] SL Hit.")
+    elif event == 'CLOSED':
+        print(f"🏁 [{product_id}] Trade Closed.")
+
+def manage_trade(entry, tp1, tp2, sl, qty, product_id=PRODUCT_ID, feed=None):
+    """
+    Follows the trade tick-by-tick on the price feed (no REST polling). Returns the closing event.
+    Errors and an ended feed don't abandon the position: they are logged and the
+    trade is resubscribed until it closes.
+    """
+    feed = feed or get_price_feed()
+    trade = new_trade(entry, tp1, tp2, sl, qty)
     print(f"🛰️ Monitoring Open Trade...")
-    
+    event = None
+
     while True:
         try:
-            ticker = client.get_public_product(product_id=PRODUCT_ID)
-            price = float(ticker['price'])
-            
-            # Logic for BUY trades
-            if entry < tp2: 
-                if not tp1_hit:
-                    if price >= tp1:
-                        print(f"💰 TP1 Hit! Moving SL to Breakeven.")
-                        tp1_hit = True
-                    elif price <= sl:
-                        print(f"🛑 SL Hit.")
-                        break
-                else:
-                    if price >= tp2 or price <= entry:
-                        print(f"🏁 Trade Closed.")
-                        break
-            # Logic for SELL trades
-            else: 
-                if not tp1_hit:
-                    if price <= tp1:
-                        print(f"💰 TP1 Hit! Moving SL to Breakeven.")
-                        tp1_hit = True
-                    elif price >= sl:
-                        print(f"🛑 SL Hit.")
-                        break
-                else:
-                    if price <= tp2 or price >= entry:
-                        print(f"🏁 Trade Closed.")
-                        break
-                        
-            time.sleep(20)
+            if event in ('SL', 'CLOSED'):
+                # The exit was seen but recording it failed: retry only that
+                close_trade(trade, product_id)
+                return event
+            with closing(feed.ticks(product_id)) as ticks:
+                for price in ticks:
+                    event = check_trade_exit(trade, price)
+                    report_trade_event(event, product_id)
+                    if event in ('SL', 'CLOSED'):
+                        close_trade(trade, product_id)
+                        return event
+            print(f"⚠️ [{product_id}] Price feed ended while the trade was still open, resubscribing...")
         except Exception as e:
-            print(f"Trade Mgmt Error: {e}")
-            time.sleep(10)
+            metrics.inc('errors_total', source='manage_trade')
+            print(f"❌ [{product_id}] Trade Management Error: {e}")
+        time.sleep(TRADE_RETRY_SECONDS)
 
 if __name__ == "__main__":
     run_bot()
\ No newline at end of file
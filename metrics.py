@@ -0,0 +1,198 @@
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram buckets in seconds (API calls, signal compute, candle-close-to-order latency)
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Shared do-nothing context manager returned by timer() while metrics are disabled
+_NULL_TIMER = nullcontext()
+
+class _Histogram:
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # Last slot = above the largest bucket
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+class _Timer:
+    __slots__ = ('metrics', 'name', 'labels', 't0')
+
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.t0, **self.labels)
+        if exc_type is not None:
+            self.metrics.inc('errors_total', source=next(iter(self.labels.values()), self.name))
+        return False
+
+class _InstrumentedClient:
+    """Proxy around an SDK client that times every method call as api_seconds{endpoint=<method>}."""
+
+    def __init__(self, client, metrics):
+        self._client = client
+        self._metrics = metrics
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def call(*args, **kwargs):
+            with self._metrics.timer('api_seconds', endpoint=name):
+                return attr(*args, **kwargs)
+        return call
+
+class Metrics:
+    """
+    Per-stage timers, counters and latency histograms for the live bot.
+    Read them as Prometheus text (serve) or as a periodic log line (log_every).
+    While disabled every call returns straight away, so the instrumentation
+    can stay in place at close to zero cost.
+    """
+
+    def __init__(self, enabled=False, prefix="smc_bot"):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.counters = {}    # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> _Histogram
+        self._lock = threading.Lock()
+
+    # --- Recording ---
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = _Histogram()
+            hist.observe(seconds)
+
+    def timer(self, name, **labels):
+        """Context manager recording the duration of the block (and an error if it raises)."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, labels)
+
+    def timed(self, stage):
+        """Decorator version of timer('stage_seconds', stage=...)."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Timer(self, 'stage_seconds', {'stage': stage}):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def wrap(self, client):
+        """Times every call made through the client. Returns the client itself when disabled."""
+        return _InstrumentedClient(client, self) if self.enabled else client
+
+    # --- Reporting ---
+    @staticmethod
+    def _labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}" if pairs else ""
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((key, (list(h.counts), h.count, h.total)) for key, h in self.histograms.items())
+
+        lines = []
+        seen = set()
+        for (name, labels), value in counters:
+            metric = f"{self.prefix}_{name}"
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{self._labels(labels)} {value}")
+
+        for (name, labels), (counts, count, total) in histograms:
+            metric = f"{self.prefix}_{name}"
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, n in zip(list(BUCKETS) + ["+Inf"], counts):
+                cumulative += n
+                lines.append(f"{metric}_bucket{self._labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{metric}_sum{self._labels(labels)} {total:.6f}")
+            lines.append(f"{metric}_count{self._labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """One line: average/max per timed stage and endpoint, then the error counts."""
+        with self._lock:
+            parts = [
+                f"{dict(labels).get('stage', dict(labels).get('endpoint', name))} "
+                f"avg {h.total / h.count:.3f}s max {h.max:.3f}s (n={h.count})"
+                for (name, labels), h in sorted(self.histograms.items()) if h.count
+            ]
+            errors = sum(v for (name, _), v in self.counters.items() if name == 'errors_total')
+        return " | ".join(parts + [f"errors {errors}"])
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serves render() at http://host:port/metrics from a daemon thread."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') not in ('', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # Keep scrapes out of the bot's console
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def log_every(self, interval):
+        """Prints the summary line every `interval` seconds from a daemon thread."""
+        def loop():
+            while True:
+                time.sleep(interval)
+                print(f"[{datetime.now().strftime('%H:%M:%S')}] 📈 METRICS | {self.summary()}")
+
+        thread = threading.Thread(target=loop, daemon=True)
+        thread.start()
+        return thread
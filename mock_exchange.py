@@ -0,0 +1,268 @@
+import itertools
+import math
+import random
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+from candles import as_series
+from price_feed import PriceFeed
+
+class MockCandleClient:
+    """
+    Local stand-in for the Coinbase candles endpoint (get_candles / get_public_candles).
+    Serves real candles when given a CandleSeries per pair, otherwise a
+    deterministic synthetic price for any timestamp. Responses look like the
+    API: string values, newest candle first. Latency and random errors can be
+    switched on to exercise retries and rate limiting offline.
+    """
+
+    def __init__(self, candles_by_pair=None, latency=0.0, error_rate=0.0, seed=7):
+        self.candles_by_pair = {pid: as_series(c) for pid, c in (candles_by_pair or {}).items()}
+        self.latency = latency
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+
+        # Counters for tests
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _request(self, func, *args, **kwargs):
+        # Every endpoint: counted, delayed by `latency`, and failing at `error_rate`
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            fail = self._rng.random() < self.error_rate
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            if fail:
+                raise ConnectionError("Mock exchange: simulated API error")
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def get_candles(self, product_id, start, end, granularity="FIVE_MINUTE", **kwargs):
+        return self._request(lambda: {'candles': self._candles(product_id, int(start), int(end), granularity)})
+
+    get_public_candles = get_candles
+
+    def _candles(self, product_id, start_ts, end_ts, granularity):
+        if product_id in self.candles_by_pair:
+            series = self.candles_by_pair[product_id]
+            lo = series.start.searchsorted(start_ts, side='left')
+            hi = series.start.searchsorted(end_ts, side='right')
+            rows = series[lo:hi].to_records()
+        else:
+            step = _GRANULARITY_SECONDS[granularity]
+            first = start_ts + (-start_ts % step)
+            rows = [_synthetic_candle(product_id, ts, step) for ts in range(first, end_ts + 1, step)]
+        return [{k: str(v) for k, v in row.items()} for row in reversed(rows)]
+
+class MockExchange(MockCandleClient):
+    """
+    Offline stand-in for the whole REST client (bot, downloader and trader.py):
+    candles, ticker, accounts and orders. Market orders fill at the current price
+    (the close of the candle at clock(), or the synthetic price), and stop orders
+    fill once a ticker read crosses their stop price. Balances and orders live in
+    memory; a repeated client_order_id returns the first order, like Coinbase.
+    """
+
+    def __init__(self, candles_by_pair=None, balances=None, latency=0.0, error_rate=0.0, seed=7, clock=time.time):
+        super().__init__(candles_by_pair, latency, error_rate, seed)
+        self.balances = dict(balances if balances is not None else {'USD': 10_000.0})
+        self.orders = {}  # order_id -> order dict
+        self.clock = clock
+        self._ids = itertools.count(1)
+        self._book_lock = threading.RLock()
+
+    # --- Market data ---
+    def price(self, product_id):
+        now = self.clock()
+        series = self.candles_by_pair.get(product_id)
+        if series is None:
+            return round(_synthetic_price(product_id, now), 2)
+        idx = max(int(series.start.searchsorted(now, side='right')) - 1, 0)
+        return float(series.close[idx])
+
+    def get_public_product(self, product_id, **kwargs):
+        return self._request(self._product, product_id)
+
+    get_product = get_public_product
+
+    def _product(self, product_id):
+        price = self.price(product_id)
+        self._trigger_stops(product_id, price)
+        base, quote = product_id.split('-')
+        return {'product_id': product_id, 'price': str(price), 'base_currency_id': base, 'quote_currency_id': quote}
+
+    # --- Accounts ---
+    def get_accounts(self, **kwargs):
+        return self._request(self._accounts)
+
+    def _accounts(self):
+        with self._book_lock:
+            return SimpleNamespace(accounts=[
+                SimpleNamespace(currency=cur, available_balance={'value': f"{bal:.8f}", 'currency': cur})
+                for cur, bal in self.balances.items()
+            ])
+
+    # --- Orders ---
+    def market_order_buy(self, client_order_id=None, product_id=None, quote_size=None, base_size=None, **kwargs):
+        return self._request(self._market, client_order_id, product_id, 'BUY', quote_size, base_size)
+
+    def market_order_sell(self, client_order_id=None, product_id=None, base_size=None, **kwargs):
+        return self._request(self._market, client_order_id, product_id, 'SELL', None, base_size)
+
+    def stop_limit_order_gtc_sell(self, client_order_id=None, product_id=None, base_size=None,
+                                  limit_price=None, stop_price=None, **kwargs):
+        return self._request(self._stop, client_order_id, product_id, 'SELL', base_size, limit_price, stop_price)
+
+    def stop_limit_order_gtc_buy(self, client_order_id=None, product_id=None, base_size=None,
+                                 limit_price=None, stop_price=None, **kwargs):
+        return self._request(self._stop, client_order_id, product_id, 'BUY', base_size, limit_price, stop_price)
+
+    def cancel_orders(self, order_ids=None, product_ids=None, **kwargs):
+        return self._request(self._cancel, order_ids, product_ids)
+
+    def list_orders(self, product_id=None, order_status=None, **kwargs):
+        with self._book_lock:
+            orders = [dict(o) for o in self.orders.values()
+                      if (product_id is None or o['product_id'] == product_id)
+                      and (not order_status or o['status'] in order_status)]
+        return self._request(lambda: {'orders': orders})
+
+    def get_order(self, order_id, **kwargs):
+        return self._request(lambda: {'order': dict(self.orders[order_id])})
+
+    def _new_order(self, client_order_id, product_id, side, order_type):
+        order_id = f"mock-{next(self._ids)}"
+        order = {
+            'order_id': order_id, 'client_order_id': client_order_id or str(uuid.uuid4()),
+            'product_id': product_id, 'side': side, 'order_type': order_type, 'status': 'OPEN',
+            'created_time': self.clock()
+        }
+        self.orders[order_id] = order
+        return order
+
+    def _existing(self, client_order_id):
+        if client_order_id:
+            for order in self.orders.values():
+                if order['client_order_id'] == client_order_id:
+                    return order
+        return None
+
+    def _response(self, order):
+        # Same shape as the SDK's create-order reply: the fill itself is only in get_order
+        if order['status'] == 'REJECTED':
+            return {'success': False,
+                    'error_response': {'error': 'INSUFFICIENT_FUND', 'message': 'Insufficient balance'}}
+        return {'success': True, 'success_response': {'order_id': order['order_id'], 'product_id': order['product_id'],
+                'side': order['side'], 'client_order_id': order['client_order_id']}}
+
+    def _fill(self, order, price, base_size):
+        # Moves the balances; rejects the order if the account can't pay for it
+        base, quote = order['product_id'].split('-')
+        cost = base_size * price
+        if order['side'] == 'BUY' and self.balances.get(quote, 0.0) < cost - 1e-9:
+            order['status'] = 'REJECTED'
+            return
+        if order['side'] == 'SELL' and self.balances.get(base, 0.0) < base_size - 1e-9:
+            order['status'] = 'REJECTED'
+            return
+        sign = 1 if order['side'] == 'BUY' else -1
+        self.balances[base] = self.balances.get(base, 0.0) + sign * base_size
+        self.balances[quote] = self.balances.get(quote, 0.0) - sign * cost
+        order.update(status='FILLED', base_size=f"{base_size:.8f}", filled_size=f"{base_size:.8f}",
+                     average_filled_price=str(price), filled_time=self.clock())
+
+    def _market(self, client_order_id, product_id, side, quote_size, base_size):
+        with self._book_lock:
+            order = self._existing(client_order_id)
+            if order is None:
+                price = self.price(product_id)
+                order = self._new_order(client_order_id, product_id, side, 'MARKET')
+                size = float(base_size) if base_size is not None else float(quote_size) / price
+                self._fill(order, price, size)
+            return self._response(order)
+
+    def _stop(self, client_order_id, product_id, side, base_size, limit_price, stop_price):
+        with self._book_lock:
+            order = self._existing(client_order_id)
+            if order is None:
+                order = self._new_order(client_order_id, product_id, side, 'STOP_LIMIT')
+                order.update(base_size=str(base_size), limit_price=str(limit_price), stop_price=str(stop_price))
+            return self._response(order)
+
+    def _cancel(self, order_ids, product_ids):
+        with self._book_lock:
+            results = []
+            for order in self.orders.values():
+                if order['status'] != 'OPEN':
+                    continue
+                if (order_ids and order['order_id'] in order_ids) or (product_ids and order['product_id'] in product_ids):
+                    order['status'] = 'CANCELLED'
+                    results.append({'success': True, 'order_id': order['order_id']})
+            return {'results': results}
+
+    def _trigger_stops(self, product_id, price):
+        with self._book_lock:
+            for order in self.orders.values():
+                if order['status'] != 'OPEN' or order['product_id'] != product_id or order['order_type'] != 'STOP_LIMIT':
+                    continue
+                stop = float(order['stop_price'])
+                if (order['side'] == 'SELL' and price <= stop) or (order['side'] == 'BUY' and price >= stop):
+                    self._fill(order, price, float(order['base_size']))
+
+class MockTickerFeed(PriceFeed):
+    """
+    Price feed for offline runs against a MockExchange: polls its ticker every
+    `interval` seconds while someone is subscribed (this also triggers its stop orders).
+    """
+
+    def __init__(self, exchange, interval=1.0, stall_timeout=60):
+        super().__init__(stall_timeout)
+        self.exchange = exchange
+        self.interval = interval
+        self._threads = {}
+
+    def _on_subscribe(self, product_id):
+        with self._lock:
+            if product_id in self._threads:
+                return
+            thread = self._threads[product_id] = threading.Thread(target=self._poll, args=(product_id,), daemon=True)
+        thread.start()
+
+    def _on_unsubscribe(self, product_id):
+        with self._lock:
+            self._threads.pop(product_id, None)
+
+    def _poll(self, product_id):
+        while self._threads.get(product_id) is threading.current_thread():
+            try:
+                self.publish(product_id, float(self.exchange.get_public_product(product_id=product_id)['price']))
+            except Exception as e:
+                print(f"Price Feed Error: {e}")
+            time.sleep(self.interval)
+
+_GRANULARITY_SECONDS = {
+    "ONE_MINUTE": 60, "FIVE_MINUTE": 300, "FIFTEEN_MINUTE": 900, "THIRTY_MINUTE": 1800,
+    "ONE_HOUR": 3600, "TWO_HOUR": 7200, "SIX_HOUR": 21600, "ONE_DAY": 86400
+}
+
+def _synthetic_price(product_id, ts):
+    base = 100 + (sum(map(ord, product_id)) % 50) * 20
+    return base * (1 + 0.05 * math.sin(ts / 86400) + 0.01 * math.sin(ts / 3517))
+
+def _synthetic_candle(product_id, ts, step):
+    open_p = _synthetic_price(product_id, ts)
+    close_p = _synthetic_price(product_id, ts + step)
+    wick = abs(close_p - open_p) * 0.5 + open_p * 0.0005
+    return {
+        'start': ts, 'low': round(min(open_p, close_p) - wick, 2), 'high': round(max(open_p, close_p) + wick, 2),
+        'open': round(open_p, 2), 'close': round(close_p, 2), 'volume': round(10 + (ts // step) % 7, 2)
+    }
@@ -0,0 +1,137 @@
+import argparse
+import csv
+import os
+import time
+import numpy as np
+from performance_summary import get_latest_journal, iter_journal
+
+# Paths simulated per NumPy batch; bounds memory to about CHUNK_PATHS * trades * 8 bytes
+CHUNK_PATHS = 10_000
+
+# Equity percentiles reported per checkpoint (confidence bands)
+BAND_PERCENTILES = [5, 25, 50, 75, 95]
+DRAWDOWN_PERCENTILES = [50, 75, 90, 95, 99]
+MAX_CHECKPOINTS = 50
+
+def r_multiples(pnl, initial_balance=1000, risk_percent=1.0):
+    """
+    Converts journal P/L into R-multiples (P/L / amount risked). Each trade
+    risked risk_percent of the equity before it, as in the backtest.
+    """
+    pnl = np.asarray(pnl, dtype=np.float64)
+    equity_before = initial_balance + np.r_[0.0, np.cumsum(pnl)[:-1]]
+    return pnl / (equity_before * risk_percent / 100)
+
+def simulate_paths(samples, n_paths=100_000, method='bootstrap', units='r', risk_percent=1.0,
+                   initial_balance=1000, ruin_fraction=0.5, seed=None, chunk_paths=CHUNK_PATHS):
+    """
+    Monte Carlo over trade order. Every path is a random reordering of the trades:
+    method='bootstrap' draws with replacement, 'shuffle' permutes them.
+    units='r': samples are R-multiples, compounded at risk_percent per trade.
+    units='usd': samples are fixed dollar P/L, added to the balance.
+    A path is ruined once equity falls to ruin_fraction of the starting balance.
+    """
+    samples = np.asarray(samples, dtype=np.float64)
+    n_trades = len(samples)
+    rng = np.random.default_rng(seed)
+    checkpoints = np.unique(np.linspace(0, n_trades - 1, min(n_trades, MAX_CHECKPOINTS)).astype(int))
+
+    max_drawdown = np.empty(n_paths)
+    final_equity = np.empty(n_paths)
+    ruined = np.empty(n_paths, dtype=bool)
+    at_checkpoints = np.empty((n_paths, len(checkpoints)))
+
+    for lo in range(0, n_paths, chunk_paths):
+        hi = min(lo + chunk_paths, n_paths)
+        if method == 'shuffle':
+            draws = rng.permuted(np.broadcast_to(samples, (hi - lo, n_trades)), axis=1)
+        else:
+            draws = samples[rng.integers(0, n_trades, size=(hi - lo, n_trades))]
+
+        if units == 'r':
+            # Compounding: each trade moves equity by R * risk%
+            equity = initial_balance * np.cumprod(1 + draws * (risk_percent / 100), axis=1)
+        else:
+            equity = initial_balance + np.cumsum(draws, axis=1)
+
+        peak = np.maximum(np.maximum.accumulate(equity, axis=1), initial_balance)
+        max_drawdown[lo:hi] = ((equity - peak) / peak).min(axis=1)
+        final_equity[lo:hi] = equity[:, -1]
+        ruined[lo:hi] = (equity <= initial_balance * ruin_fraction).any(axis=1)
+        at_checkpoints[lo:hi] = equity[:, checkpoints]
+
+    return {
+        'paths': n_paths,
+        'trades': n_trades,
+        'drawdown_pct': {p: float(np.percentile(max_drawdown, 100 - p) * 100) for p in DRAWDOWN_PERCENTILES},
+        'final_equity': {p: float(np.percentile(final_equity, p)) for p in BAND_PERCENTILES},
+        'ruin_probability': float(ruined.mean()),
+        'bands': {
+            'trade': (checkpoints + 1).tolist(),
+            **{p: np.percentile(at_checkpoints, p, axis=0).tolist() for p in BAND_PERCENTILES}
+        }
+    }
+
+def write_bands(result, filename):
+    bands = result['bands']
+    with open(filename, mode='w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Trade'] + [f"P{p}" for p in BAND_PERCENTILES])
+        for i, trade in enumerate(bands['trade']):
+            writer.writerow([trade] + [round(bands[p][i], 2) for p in BAND_PERCENTILES])
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo drawdown and risk-of-ruin analysis of a trade journal")
+    parser.add_argument("--file", type=str, help="Journal CSV or npz (default: newest trade_journal_*.csv)")
+    parser.add_argument("--coin", type=str, help="Pick the newest journal of this coin instead")
+    parser.add_argument("--paths", type=int, default=100_000, help="Simulated equity paths (default: 100000)")
+    parser.add_argument("--method", choices=["bootstrap", "shuffle"], default="bootstrap",
+                        help="bootstrap = resample with replacement, shuffle = reorder the same trades")
+    parser.add_argument("--units", choices=["r", "usd"], default="r",
+                        help="r = R-multiples compounded at --risk (default), usd = the journal's dollar P/L")
+    parser.add_argument("--risk", type=float, default=1.0, help="Risk per trade in %% for the simulation (main.RISK_PCT)")
+    parser.add_argument("--journal-risk", type=float, default=1.0, help="Risk %% the journal was traded with (for R-multiples)")
+    parser.add_argument("--initial-balance", type=float, default=1000, help="Starting balance (default: 1000)")
+    parser.add_argument("--ruin", type=float, default=50, help="Ruin = equity falls this many %% below the start (default: 50)")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed (repeatable results)")
+    parser.add_argument("--out", type=str, help="Save the equity confidence bands to this CSV")
+    args = parser.parse_args()
+
+    journal_file = args.file or get_latest_journal(args.coin)
+    if not os.path.exists(journal_file):
+        print(f"❌ Error: {journal_file} not found.")
+        return
+
+    pnl = np.fromiter((p for p, _ in iter_journal(journal_file)), dtype=np.float64)
+    if len(pnl) < 2:
+        print(f"⚠️ Warning: {journal_file} has {len(pnl)} closed trades. Nothing to resample.")
+        return
+
+    samples = r_multiples(pnl, args.initial_balance, args.journal_risk) if args.units == 'r' else pnl
+    t0 = time.time()
+    result = simulate_paths(samples, args.paths, args.method, args.units, args.risk,
+                            args.initial_balance, 1 - args.ruin / 100, args.seed)
+
+    print("\n" + "="*45)
+    print(f"        🎲 MONTE CARLO RISK REPORT")
+    print(f"   File: {journal_file}")
+    print("="*45)
+    print(f"Paths x Trades:       {result['paths']:,} x {result['trades']} ({args.method}, {time.time() - t0:.2f}s)")
+    if args.units == 'r':
+        print(f"Risk per Trade:       {args.risk:.2f}% (avg R {samples.mean():+.3f})")
+    print("-" * 45)
+    for p, dd in result['drawdown_pct'].items():
+        print(f"{f'Max Drawdown P{p}:':<22}{dd:.2f}%")
+    print("-" * 45)
+    for p, eq in result['final_equity'].items():
+        print(f"{f'Final Equity P{p}:':<22}${eq:.2f}")
+    print("-" * 45)
+    print(f"{f'Risk of Ruin (-{args.ruin:.0f}%):':<22}{result['ruin_probability'] * 100:.3f}%")
+    print("="*45)
+
+    if args.out:
+        write_bands(result, args.out)
+        print(f"📄 Equity confidence bands saved to: {args.out}")
+
+if __name__ == "__main__":
+    main()
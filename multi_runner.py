@@ -0,0 +1,175 @@
+import asyncio
+import time
+from contextlib import aclosing
+from datetime import datetime
+import main as bot
+
+# Limit on simultaneous REST calls so 30 pairs don't burst the API at candle close
+MAX_CONCURRENT_REQUESTS = 8
+CANDLE_SECONDS = 300
+
+# Shared account limits (all pairs together), as in portfolio_backtest.py
+MAX_POSITIONS = 5     # Trades open at the same time
+MAX_OPEN_RISK = 5.0   # % of the balance that all open stops may lose together
+
+class MultiPairRunner:
+    """
+    Asyncio version of main.run_bot for many pairs in one process.
+    Every candle close all pairs are scanned concurrently, and each open trade
+    is managed by its own task, so scanning never stops while positions are open.
+    The Coinbase SDK and the signal detection are blocking, so they run in worker threads.
+    Every entry is sized against the balance the open trades haven't committed yet, and
+    entries beyond max_positions or max_open_risk % of the balance are skipped (None = no limit).
+    """
+
+    def __init__(self, product_ids, max_concurrent_requests=MAX_CONCURRENT_REQUESTS, feed=None,
+                 max_positions=MAX_POSITIONS, max_open_risk=MAX_OPEN_RISK):
+        self.product_ids = list(product_ids)
+        self.feed = feed or bot.get_price_feed()
+        self.max_positions = max_positions
+        self.max_open_risk = max_open_risk
+        self.open_trades = {}  # product_id -> asyncio.Task managing that trade
+        self.positions = {}    # product_id -> trade dict (from new_trade) of every open or opening trade
+        self._api_slots = asyncio.Semaphore(max_concurrent_requests)
+
+    def committed(self):
+        """(notional, open risk) in USD of the open trades; the risk is zero once TP1 moved the stop to breakeven."""
+        notional = sum(t['qty'] * t['entry'] for t in self.positions.values())
+        risk = sum(0.0 if t['tp1_hit'] else t['qty'] * abs(t['entry'] - t['sl']) for t in self.positions.values())
+        return notional, risk
+
+    async def _call(self, func, *args, **kwargs):
+        """Runs a blocking SDK/HTTP call in a thread, limited by the request semaphore."""
+        async with self._api_slots:
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+    async def run(self):
+        mode_text = "VIRTUAL (Paper)" if bot.PAPER_MODE else "REAL MONEY"
+        print(f"🚀 SMC Multi-Pair Bot Initializing in {mode_text} mode...")
+
+        if not bot.PAPER_MODE:
+            bot.BALANCE = await self._call(bot.get_coinbase_balance, bot.client)
+
+        bot.start_trade_run(self.product_ids)
+        bot.start_metrics()
+        status_init = f"✅ Bot Online!\n💵 Balance: ${bot.BALANCE:.2f}\n📍 Pairs: {', '.join(self.product_ids)}"
+        print("-" * 30 + "\n" + status_init + "\n" + "-" * 30)
+        bot.send_telegram(status_init)
+
+        while True:
+            # --- 1. TIMING SYNC ---
+            seconds_into_candle = int(time.time()) % CANDLE_SECONDS
+            if seconds_into_candle > 10:
+                await asyncio.sleep(CANDLE_SECONDS - seconds_into_candle + 1)
+
+            # --- 2. SCAN EVERY PAIR WITHOUT AN OPEN TRADE ---
+            candle_close = int(time.time()) // CANDLE_SECONDS * CANDLE_SECONDS
+            bot.metrics.observe('heartbeat_delay_seconds', time.time() - candle_close)
+            ts = datetime.now().strftime('%H:%M:%S')
+            idle_pairs = [p for p in self.product_ids if p not in self.open_trades]
+            print(f"[{ts}] 🛰️ HEARTBEAT | scanning {len(idle_pairs)} pairs | {len(self.open_trades)} open trades")
+            await asyncio.gather(*(self.scan_pair(p, candle_close) for p in idle_pairs))
+
+            # --- 3. COOL DOWN (skips to the next candle close) ---
+            await asyncio.sleep(15)
+
+    async def scan_pair(self, product_id, candle_close):
+        try:
+            candles = await self._call(bot.fetch_candles, product_id)
+            if len(candles) < bot.LOOKBACK_WINDOW:
+                print(f"⚠️ [{product_id}] Data warm-up: {len(candles)}/{bot.LOOKBACK_WINDOW}")
+                return
+
+            # CPU-bound: off the event loop, so open trades still get their ticks at candle close
+            with bot.metrics.timer('stage_seconds', stage='generate_signal'):
+                signal, structural_price, counts = await asyncio.to_thread(bot.pair_signal, product_id, candles)
+            htf = f" | HTF: {bot.format_htf(counts['htf'])}" if 'htf' in counts else ""
+            print(f"   ├─ {product_id:<10} Trend: {counts['trend']} | Fakeout: {counts['fake']} | "
+                  f"Bull: {counts['bull']}/3 | Bear: {counts['bear']}/3{htf}")
+
+            if signal in ['BUY', 'SELL'] and structural_price:
+                await self.enter_trade(product_id, signal, structural_price, candle_close)
+        except Exception as e:
+            bot.metrics.inc('errors_total', source='scan_pair')
+            print(f"❌ [{product_id}] Scan Error: {e}")
+
+    async def enter_trade(self, product_id, signal, structural_price, candle_close):
+        ticker = await self._call(bot.client.get_public_product, product_id=product_id)
+        entry_price = float(ticker['price'])
+
+        # No await from here to the reservation, so concurrent entries see each other's trades
+        if self.max_positions is not None and len(self.positions) >= self.max_positions:
+            print(f"⚠️ [{product_id}] Skipping {signal}: {len(self.positions)} trades already open")
+            return
+        notional, open_risk = self.committed()
+        available = bot.BALANCE - notional
+        if available <= 0:
+            print(f"⚠️ [{product_id}] Skipping {signal}: the whole balance is committed to open trades")
+            return
+        pos_size_usd, sl_price, tp1, tp2 = bot.plan_trade(entry_price, structural_price, available)
+        trade = bot.new_trade(entry_price, tp1, tp2, sl_price, pos_size_usd / entry_price)
+        new_risk = trade['qty'] * abs(entry_price - sl_price)
+        if self.max_open_risk is not None and \
+                open_risk + new_risk > bot.BALANCE * self.max_open_risk / 100 + 1e-9:
+            print(f"⚠️ [{product_id}] Skipping {signal}: open risk would exceed {self.max_open_risk}% of the balance")
+            return
+        self.positions[product_id] = trade
+
+        print(f"🎯 [{product_id}] {signal} Signal Found! Entry: {entry_price} | SL: {sl_price} | TP2: {tp2}")
+        try:
+            qty = await self._call(bot.open_position, product_id, signal, entry_price, pos_size_usd, sl_price)
+        except Exception:
+            self.positions.pop(product_id, None)
+            raise
+        if not qty:
+            self.positions.pop(product_id, None)
+            return
+        bot.metrics.observe('close_to_order_seconds', time.time() - candle_close)
+        trade['qty'] = float(qty)
+        task = asyncio.create_task(self.manage_trade(product_id, trade))
+        self.open_trades[product_id] = task
+        task.add_done_callback(lambda _: self._trade_done(product_id))
+
+    def _trade_done(self, product_id):
+        self.open_trades.pop(product_id, None)
+        self.positions.pop(product_id, None)
+
+    async def manage_trade(self, product_id, trade):
+        """Follows one trade until it closes; like main.manage_trade, errors and feed ends only resubscribe."""
+        print(f"🛰️ [{product_id}] Monitoring Open Trade...")
+        event = None
+        while event not in ('SL', 'CLOSED'):
+            try:
+                async with aclosing(self.feed.aticks(product_id)) as ticks:
+                    async for price in ticks:
+                        event = bot.check_trade_exit(trade, price)
+                        bot.report_trade_event(event, product_id)
+                        if event in ('SL', 'CLOSED'):
+                            break
+                if event not in ('SL', 'CLOSED'):
+                    print(f"⚠️ [{product_id}] Price feed ended while the trade was still open, resubscribing...")
+            except Exception as e:
+                bot.metrics.inc('errors_total', source='manage_trade')
+                print(f"❌ [{product_id}] Trade Management Error: {e}")
+            if event not in ('SL', 'CLOSED'):
+                await asyncio.sleep(bot.TRADE_RETRY_SECONDS)
+
+        # The exit was seen: keep retrying until it is recorded
+        while True:
+            try:
+                await asyncio.to_thread(bot.close_trade, trade, product_id)
+                break
+            except Exception as e:
+                bot.metrics.inc('errors_total', source='manage_trade')
+                print(f"❌ [{product_id}] Trade Close Error: {e}")
+                await asyncio.sleep(bot.TRADE_RETRY_SECONDS)
+
+        if not bot.PAPER_MODE:
+            # The USD balance excludes what the other open trades hold; add it back so
+            # bot.BALANCE stays the account size the committed notional is taken from
+            self.positions.pop(product_id, None)
+            cash = await self._call(bot.get_coinbase_balance, bot.client)
+            bot.BALANCE = cash + self.committed()[0]
+
+if __name__ == "__main__":
+    asyncio.run(MultiPairRunner(bot.PRODUCT_IDS).run())
@@ -1,32 +1,207 @@
+import atexit
+import itertools
 import os
+import threading
+import time
+from contextlib import nullcontext
 import requests
 from dotenv import load_dotenv
 
 # Load environment variables once at the start of the module
 load_dotenv()
 
-# --- Load Telegram Credentials ---
-TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN").strip()
-TELEGRAM_CHAT_ID = str(os.getenv("TELEGRAM_CHAT_ID")).strip()
+# --- Load Telegram Credentials (empty = notifications off) ---
+TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN", "").strip()
+TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID", "").strip()
+TELEGRAM_API = "https://api.telegram.org"
 
-def send_telegram_notification(message):
+# Priorities: a full queue drops LOW first and never drops HIGH for a lower one
+HIGH = 0    # Orders, fills, exits, errors
+NORMAL = 1  # Status messages
+LOW = 2     # Heartbeats and other chatter
+
+QUEUE_SIZE = 200           # Pending messages kept while Telegram is slow or down
+BATCH_WINDOW = 1.0         # Seconds a burst is collected before it is sent as one message
+MIN_INTERVAL = 1.0         # Telegram allows about one message per second per chat
+MAX_MESSAGE_CHARS = 4096   # Telegram's message size limit
+MAX_RETRIES = 3
+
+class NotificationService:
+    """
+    Sends Telegram messages from a background thread so trading code never waits
+    on the Telegram API. notify() only queues the message (bounded queue) and returns.
+    The worker merges everything queued within BATCH_WINDOW into one message,
+    keeps at most one message per MIN_INTERVAL, waits out 429 retry_after replies
+    and reuses one HTTP session. Messages queued with the same key replace each
+    other (e.g. key='heartbeat' keeps only the newest heartbeat).
+    base_url can point at a local HTTP stand-in of the Bot API for testing.
+    """
+
+    def __init__(self, token=TELEGRAM_BOT_TOKEN, chat_id=TELEGRAM_CHAT_ID, base_url=TELEGRAM_API,
+                 queue_size=QUEUE_SIZE, batch_window=BATCH_WINDOW, min_interval=MIN_INTERVAL,
+                 timeout=10, parse_mode=None, metrics=None):
+        self.enabled = bool(token and chat_id)
+        self.url = f"{base_url.rstrip('/')}/bot{token}/sendMessage"
+        self.chat_id = chat_id
+        self.queue_size = queue_size
+        self.batch_window = batch_window
+        self.min_interval = min_interval
+        self.timeout = timeout
+        self.parse_mode = parse_mode
+        self.metrics = metrics
+        self.stats = {'queued': 0, 'coalesced': 0, 'dropped': 0, 'sent': 0, 'failed': 0}
+
+        self._pending = []  # [priority, seq, key, text]
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._busy = False
+        self._closed = False
+        self._thread = None
+        self._session = requests.Session()
+        self._last_sent = 0.0
+
+    # --- Producer side (called from trading code, never blocks on the network) ---
+    def notify(self, message, priority=NORMAL, key=None):
+        """Queues a message. Returns False if it was dropped (disabled, closed or queue full)."""
+        if not self.enabled or self._closed:
+            return False
+        with self._cond:
+            if key is not None:
+                for item in self._pending:
+                    if item[2] == key:
+                        item[0] = min(item[0], priority)
+                        item[3] = message
+                        self.stats['coalesced'] += 1
+                        return True
+
+            if len(self._pending) >= self.queue_size:
+                # Evict the oldest of the least important messages, unless the new one is no more important
+                worst = max(self._pending, key=lambda item: (item[0], -item[1]))
+                if worst[0] <= priority:
+                    self.stats['dropped'] += 1
+                    return False
+                self._pending.remove(worst)
+                self.stats['dropped'] += 1
+
+            self._pending.append([priority, next(self._seq), key, message])
+            self.stats['queued'] += 1
+            self._cond.notify()
+
+        if self._thread is None:
+            self._start()
+        return True
+
+    def _start(self):
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="notifications", daemon=True)
+                self._thread.start()
+
+    # --- Worker ---
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                self._busy = True
+
+            # Let the burst build up, and stay under Telegram's per-chat rate
+            wait = max(self.batch_window, self._last_sent + self.min_interval - time.time())
+            if not self._closed:
+                time.sleep(wait)
+
+            with self._cond:
+                batch = self._take_batch()
+            self._send(batch)
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
+    def _take_batch(self):
+        # Most important first, oldest first within a priority, up to Telegram's size limit
+        self._pending.sort(key=lambda item: (item[0], item[1]))
+        parts, size = [], 0
+        while self._pending and (not parts or size + len(self._pending[0][3]) + 1 <= MAX_MESSAGE_CHARS):
+            text = self._pending.pop(0)[3][:MAX_MESSAGE_CHARS]
+            parts.append(text)
+            size += len(text) + 1
+        return parts
+
+    def _send(self, parts):
+        payload = {'chat_id': self.chat_id, 'text': "\n\n".join(parts)}
+        if self.parse_mode:
+            payload['parse_mode'] = self.parse_mode
+
+        for _ in range(MAX_RETRIES):
+            timer = self.metrics.timer('stage_seconds', stage='telegram') if self.metrics else nullcontext()
+            try:
+                with timer:
+                    response = self._session.post(self.url, json=payload, timeout=self.timeout)
+                self._last_sent = time.time()
+                if response.status_code == 429:
+                    # Flood control: Telegram says how long to back off
+                    try:
+                        retry_after = response.json().get('parameters', {}).get('retry_after', 1)
+                    except ValueError:
+                        retry_after = 1
+                    time.sleep(min(float(retry_after), 60))
+                    continue
+                if 400 <= response.status_code < 500:
+                    # Bad token/chat or message: retrying won't help
+                    print(f"Failed to send Telegram notification: {response.status_code} {response.reason}")
+                    break
+                response.raise_for_status()
+                self.stats['sent'] += len(parts)
+                return True
+            except requests.exceptions.RequestException as e:
+                self._last_sent = time.time()
+                print(f"Telegram Error: {e}")
+                time.sleep(self.min_interval)
+        self.stats['failed'] += len(parts)
+        return False
+
+    # --- Shutdown ---
+    def flush(self, timeout=None):
+        """Waits until every queued message was sent (or given up). Returns False on timeout."""
+        if self._thread is None:
+            return True
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+    def close(self, timeout=5):
+        """Sends what is still queued (skipping the batch wait) and stops the worker."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._session.close()
+
+_default_service = None
+_default_lock = threading.Lock()
+
+def get_notification_service(token=None, chat_id=None, metrics=None):
+    """
+    The process's one notification service (one worker, one rate limit per chat),
+    closed (and flushed) at exit. Plain text, since callers add things like a
+    '[PAPER] ' prefix. token/chat_id default to .env and only count on the first call.
+    """
+    global _default_service
+    with _default_lock:
+        if _default_service is None:
+            _default_service = NotificationService(token or TELEGRAM_BOT_TOKEN, chat_id or TELEGRAM_CHAT_ID,
+                                                   metrics=metrics)
+            atexit.register(_default_service.close)
+        elif metrics is not None and _default_service.metrics is None:
+            _default_service.metrics = metrics
+    return _default_service
+
+def send_telegram_notification(message, priority=NORMAL, key=None):
     """
-    Sends a message to the specified Telegram chat using the bot.
+    Queues a message to the specified Telegram chat; returns straight away.
     """
-    if not all([TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID]):
-        print("Telegram keys missing or not loaded. Notification not sent.")
-        return
-
-    url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
-    payload = {
-        'chat_id': TELEGRAM_CHAT_ID,
-        'text': message,
-        'parse_mode': 'Markdown'
-    }
-
-    try:
-        response = requests.post(url, data=payload, timeout=5)
-        response.raise_for_status()
-        print(f"Notification sent: {message}")
-    except requests.exceptions.RequestException as e:
-        print(f"Failed to send Telegram notification: {response.status_code} {response.reason} for url: {url} | Details: {e}")
\ No newline at end of file
+    if not get_notification_service().notify(message, priority, key):
+        if not all([TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID]):
+            print("Telegram keys missing or not loaded. Notification not sent.")
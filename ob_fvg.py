@@ -1,56 +1,63 @@
+import numpy as np
+from candles import as_series
+
+def _later_min(values):
+    """later[i] = min(values[i+1:]); +inf for the last candle (nothing after it)."""
+    later = np.full(len(values), np.inf)
+    if len(values) > 1:
+        later[:-1] = np.minimum.accumulate(values[:0:-1])[::-1]
+    return later
+
+def _later_max(values):
+    """later[i] = max(values[i+1:]); -inf for the last candle (nothing after it)."""
+    later = np.full(len(values), -np.inf)
+    if len(values) > 1:
+        later[:-1] = np.maximum.accumulate(values[:0:-1])[::-1]
+    return later
+
 def detect_order_blocks(candles):
+    candles = as_series(candles)
+    opens, highs, lows, closes = candles.open, candles.high, candles.low, candles.close
+    if len(closes) < 2:
+        return []
+
+    # Pattern at candle i uses the previous candle (i-1) as the OB zone
+    curr_o, curr_c = opens[1:], closes[1:]
+    prev_o, prev_c, prev_h, prev_l = opens[:-1], closes[:-1], highs[:-1], lows[:-1]
+    bullish = (curr_c > curr_o) & (prev_c < prev_o) & (curr_c > prev_h)
+    bearish = ~bullish & (curr_c < curr_o) & (prev_c > prev_o) & (curr_c < prev_l)
+
+    # --- MITIGATION CHECK ---
+    # A later candle dips into a Bullish OB (low <= OB high) or rallies into a
+    # Bearish OB (high >= OB low). Comparing against the lowest low / highest high
+    # AFTER the OB answers this for every OB in a single O(n) pass.
+    bullish &= _later_min(lows)[1:] > prev_h
+    bearish &= _later_max(highs)[1:] < prev_l
+
     ob_list = []
-    # Loop to find initial OB patterns
-    for i in range(1, len(candles)):
-        prev = candles[i-1]
-        curr = candles[i]
-        
-        ob = None
-        # Bullish OB detection
-        if curr['close'] > curr['open'] and prev['close'] < prev['open'] and curr['close'] > prev['high']:
-            ob = {'type': 'bullish', 'low': prev['low'], 'high': prev['high'], 'index': i}
-        # Bearish OB detection
-        elif curr['close'] < curr['open'] and prev['close'] > prev['open'] and curr['close'] < prev['low']:
-            ob = {'type': 'bearish', 'low': prev['low'], 'high': prev['high'], 'index': i}
-
-        if ob:
-            # --- MITIGATION CHECK ---
-            # Check every candle from the OB creation until the latest candle
-            is_mitigated = False
-            for j in range(i + 1, len(candles)):
-                # If a future candle dips into a Bullish OB or rallies into a Bearish OB
-                if ob['type'] == 'bullish' and candles[j]['low'] <= ob['high']:
-                    is_mitigated = True
-                    break
-                elif ob['type'] == 'bearish' and candles[j]['high'] >= ob['low']:
-                    is_mitigated = True
-                    break
-            
-            if not is_mitigated:
-                ob_list.append(ob)
-                
+    for i in (np.flatnonzero(bullish | bearish) + 1).tolist():
+        ob_type = 'bullish' if bullish[i-1] else 'bearish'
+        ob_list.append({'type': ob_type, 'low': float(lows[i-1]), 'high': float(highs[i-1]), 'index': i})
     return ob_list
 
 def detect_fvg(candles):
+    candles = as_series(candles)
+    highs, lows = candles.high, candles.low
+    if len(lows) < 3:
+        return []
+
+    # Gap between candle i-2 and candle i
+    bullish = lows[2:] > highs[:-2]
+    bearish = ~bullish & (highs[2:] < lows[:-2])
+
+    # --- MITIGATION CHECK --- (same suffix min/max trick as the order blocks)
+    bullish &= _later_min(lows)[2:] > highs[:-2]
+    bearish &= _later_max(highs)[2:] < lows[:-2]
+
     fvg_list = []
-    for i in range(2, len(candles)):
-        fvg = None
-        if candles[i]['low'] > candles[i-2]['high']:
-            fvg = {'type': 'bullish', 'low': candles[i-2]['high'], 'high': candles[i]['low'], 'index': i}
-        elif candles[i]['high'] < candles[i-2]['low']:
-            fvg = {'type': 'bearish', 'low': candles[i]['high'], 'high': candles[i-2]['low'], 'index': i}
-
-        if fvg:
-            # --- MITIGATION CHECK ---
-            is_mitigated = False
-            for j in range(i + 1, len(candles)):
-                if fvg['type'] == 'bullish' and candles[j]['low'] <= fvg['low']:
-                    is_mitigated = True
-                    break
-                elif fvg['type'] == 'bearish' and candles[j]['high'] >= fvg['high']:
-                    is_mitigated = True
-                    break
-            
-            if not is_mitigated:
-                fvg_list.append(fvg)
+    for i in (np.flatnonzero(bullish | bearish) + 2).tolist():
+        if bullish[i-2]:
+            fvg_list.append({'type': 'bullish', 'low': float(highs[i-2]), 'high': float(lows[i]), 'index': i})
+        else:
+            fvg_list.append({'type': 'bearish', 'low': float(highs[i]), 'high': float(lows[i-2]), 'index': i})
     return fvg_list
\ No newline at end of file
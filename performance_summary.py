@@ -1,8 +1,13 @@
 ﻿import pandas as pd
 import numpy as np
+import csv
 import os
 import glob
+import time
 import argparse
+from datetime import datetime, timedelta
+from trade_db import TradeDB
+from journal import load_journal_npz
 
 def get_latest_journal(coin_name=None):
     """
@@ -25,7 +30,281 @@ def get_latest_journal(coin_name=None):
     # Return the most recently created file
     return max(files, key=os.path.getctime)
 
-def calculate_performance(coin_name=None):
+def compute_metrics(pnl, initial_balance=1000):
+    """Report metrics for a series of per-trade P/L values (in trade order)."""
+    pnl = pd.Series(pnl, dtype=float).reset_index(drop=True)
+
+    # 1. Basic Metrics
+    total_trades = len(pnl)
+    winning_trades = pnl[pnl > 0]
+    losing_trades = pnl[pnl < 0]
+    
+    win_rate = (len(winning_trades) / total_trades) * 100 if total_trades > 0 else 0
+    total_pnl = pnl.sum()
+    
+    # 2. Advanced Metrics
+    avg_win = winning_trades.mean() if not winning_trades.empty else 0
+    avg_loss = losing_trades.mean() if not losing_trades.empty else 0
+    
+    gross_profit = winning_trades.sum()
+    gross_loss = abs(losing_trades.sum())
+    profit_factor = gross_profit / gross_loss if gross_loss != 0 else float('inf')
+    
+    # 3. Drawdown Calculation (Assuming $1000 starting capital)
+    # The peak starts at the initial balance, so a losing first trade is a drawdown (same as RunStats)
+    equity = initial_balance + pnl.cumsum()
+    peak = equity.cummax().clip(lower=initial_balance)
+    drawdown = (equity - peak) / peak
+    max_drawdown = drawdown.min() * 100 if total_trades > 0 else 0
+
+    return {
+        'total_trades': total_trades,
+        'win_rate': win_rate,
+        'total_pnl': total_pnl,
+        'profit_factor': profit_factor,
+        'avg_win': avg_win,
+        'avg_loss': avg_loss,
+        'largest_win': pnl.max() if total_trades > 0 else 0,
+        'largest_loss': pnl.min() if total_trades > 0 else 0,
+        'max_drawdown': max_drawdown,
+        'final_equity': equity.iloc[-1] if total_trades > 0 else initial_balance
+    }
+
+def print_report(m, source):
+    print("\n" + "="*45)
+    print(f"        📊 STRATEGY PERFORMANCE REPORT")
+    print(f"   {source}")
+    print("="*45)
+    print(f"Total Trades:         {m['total_trades']}")
+    print(f"Win Rate:             {m['win_rate']:.2f}%")
+    print(f"Total Profit/Loss:    ${m['total_pnl']:.2f}")
+    print(f"Profit Factor:        {m['profit_factor']:.2f}")
+    print("-" * 45)
+    print(f"Average Win:          ${m['avg_win']:.2f}")
+    print(f"Average Loss:         ${m['avg_loss']:.2f}")
+    print(f"Largest Win:          ${m['largest_win']:.2f}")
+    print(f"Largest Loss:         ${m['largest_loss']:.2f}")
+    print("-" * 45)
+    print(f"Maximum Drawdown:     {m['max_drawdown']:.2f}%")
+    print(f"Final Equity:         ${m['final_equity']:.2f}")
+    print("="*45)
+
+def parse_since(value):
+    """'7d' / '12h' (relative) or 'YYYY-MM-DD' -> Unix time."""
+    if value[-1] in 'dh' and value[:-1].isdigit():
+        unit = 'days' if value[-1] == 'd' else 'hours'
+        return (datetime.now() - timedelta(**{unit: int(value[:-1])})).timestamp()
+    return datetime.strptime(value, "%Y-%m-%d").timestamp()
+
+def list_runs(db, coin_name=None, since=None):
+    """One line per run in the trade database, e.g. all ETH runs of the last week."""
+    runs = db.find_runs(pair=coin_name, since=since)
+    if not runs:
+        print("⚠️ No matching runs in the trade database.")
+        return
+
+    print(f"\n{'Run':>5}  {'Started':<16}  {'Kind':<8}  {'Pairs':<22}  {'Trades':>6}  {'Win %':>6}  {'P/L USD':>10}")
+    print("-" * 85)
+    for r in runs:
+        started = datetime.fromtimestamp(r['created']).strftime('%Y-%m-%d %H:%M')
+        win_rate = 100 * r['wins'] / r['trades'] if r['trades'] else 0
+        print(f"{r['run_id']:>5}  {started:<16}  {r['kind']:<8}  {r['pairs'][:22]:<22}  "
+              f"{r['trades']:>6}  {win_rate:>6.2f}  {r['total_pnl']:>10.2f}")
+
+def compare_runs(db, run_ids):
+    """Side-by-side metrics (and differing parameters) of several runs."""
+    runs = [db.get_run(run_id) for run_id in run_ids]
+    missing = [run_id for run_id, run in zip(run_ids, runs) if run is None]
+    if missing:
+        print(f"❌ Error: Unknown run id(s): {', '.join(map(str, missing))}")
+        return
+
+    metrics = []
+    for run in runs:
+        balance = run['params'].get('initial_balance', run['params'].get('balance', 1000))
+        pnl = [t['pnl'] for t in db.run_trades(run['run_id'])]
+        metrics.append(compute_metrics(pnl, balance))
+
+    rows = [
+        ("Pairs", lambda r, m: r['pairs']),
+        ("Kind", lambda r, m: r['kind']),
+        ("Data Hash", lambda r, m: (r['data_hash'] or '-')[:12]),
+        ("Total Trades", lambda r, m: m['total_trades']),
+        ("Win Rate", lambda r, m: f"{m['win_rate']:.2f}%"),
+        ("Total Profit/Loss", lambda r, m: f"${m['total_pnl']:.2f}"),
+        ("Profit Factor", lambda r, m: f"{m['profit_factor']:.2f}"),
+        ("Average Win", lambda r, m: f"${m['avg_win']:.2f}"),
+        ("Average Loss", lambda r, m: f"${m['avg_loss']:.2f}"),
+        ("Maximum Drawdown", lambda r, m: f"{m['max_drawdown']:.2f}%"),
+        ("Final Equity", lambda r, m: f"${m['final_equity']:.2f}")
+    ]
+    # Only show parameters that differ between the runs
+    param_names = sorted({k for r in runs for k in r['params']})
+    for name in param_names:
+        if len({str(r['params'].get(name)) for r in runs}) > 1:
+            rows.append((name, lambda r, m, name=name: r['params'].get(name, '-')))
+
+    print("\n" + "="*(22 + 16 * len(runs)))
+    print(f"{'':<22}" + "".join(f"{'Run ' + str(r['run_id']):>16}" for r in runs))
+    print("="*(22 + 16 * len(runs)))
+    for label, value in rows:
+        print(f"{label + ':':<22}" + "".join(f"{str(value(r, m)):>16}" for r, m in zip(runs, metrics)))
+    print("="*(22 + 16 * len(runs)))
+
+class RunStats:
+    """
+    Streaming metrics for one run. Trades are added one at a time, so a journal
+    is never held in memory. Sharpe/Sortino are per trade (not annualized), on
+    returns measured against the equity before each trade.
+    """
+
+    def __init__(self, name, initial_balance=1000):
+        self.name = name
+        self.initial_balance = initial_balance
+        self.trades = self.wins = 0
+        self.gross_profit = self.gross_loss = 0.0
+        self.largest_win = self.largest_loss = 0.0
+        self.equity = self.peak = initial_balance
+        self.max_drawdown = 0.0
+        self.ret_sum = self.ret_sq = self.downside_sq = 0.0
+        self.losing_streak = self.longest_losing_streak = 0
+        self.monthly = {}  # 'YYYY-MM' -> P/L
+
+    def add(self, pnl, month=None):
+        ret = pnl / self.equity if self.equity else 0.0
+        self.ret_sum += ret
+        self.ret_sq += ret * ret
+        if ret < 0:
+            self.downside_sq += ret * ret
+
+        self.trades += 1
+        if pnl > 0:
+            self.wins += 1
+            self.gross_profit += pnl
+            if pnl > self.largest_win:
+                self.largest_win = pnl
+            self.losing_streak = 0
+        elif pnl < 0:
+            self.gross_loss -= pnl
+            if pnl < self.largest_loss:
+                self.largest_loss = pnl
+            self.losing_streak += 1
+            if self.losing_streak > self.longest_losing_streak:
+                self.longest_losing_streak = self.losing_streak
+        else:
+            self.losing_streak = 0
+
+        self.equity += pnl
+        if self.equity > self.peak:
+            self.peak = self.equity
+        elif (self.equity - self.peak) / self.peak < self.max_drawdown:
+            self.max_drawdown = (self.equity - self.peak) / self.peak
+        if month:
+            self.monthly[month] = self.monthly.get(month, 0.0) + pnl
+
+    def result(self):
+        n = self.trades
+        mean = self.ret_sum / n if n else 0.0
+        std = np.sqrt(max(self.ret_sq - n * mean * mean, 0.0) / (n - 1)) if n > 1 else 0.0
+        downside = np.sqrt(self.downside_sq / n) if n else 0.0
+        return {
+            'run': self.name,
+            'trades': n,
+            'win_rate': round(100 * self.wins / n, 2) if n else 0.0,
+            'total_pnl': round(self.equity - self.initial_balance, 2),
+            'profit_factor': round(self.gross_profit / self.gross_loss, 3) if self.gross_loss else float('inf'),
+            'expectancy': round((self.equity - self.initial_balance) / n, 2) if n else 0.0,
+            'sharpe': round(mean / std, 3) if std else 0.0,
+            'sortino': round(mean / downside, 3) if downside else 0.0,
+            'max_drawdown_pct': round(self.max_drawdown * 100, 2),
+            'longest_losing_streak': self.longest_losing_streak,
+            'largest_win': round(self.largest_win, 2),
+            'largest_loss': round(self.largest_loss, 2),
+            'final_equity': round(self.equity, 2),
+            **{f"pnl_{month}": round(v, 2) for month, v in sorted(self.monthly.items())}
+        }
+
+def iter_journal(path):
+    """Yields (pnl, 'YYYY-MM') for every closed trade of a CSV or npz journal, in file order."""
+    if path.endswith('.npz'):
+        columns = load_journal_npz(path)
+        for pnl, exit_unix in zip(columns['pnl'].tolist(), columns['exit_unix'].tolist()):
+            if exit_unix == exit_unix:  # NaN = still open
+                yield pnl, datetime.fromtimestamp(exit_unix).strftime('%Y-%m')
+        return
+
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        exit_col, pnl_col = header.index('Exit_Date'), header.index('P/L_USD')
+        for row in reader:
+            if len(row) <= pnl_col or row[exit_col] == 'OPEN':
+                continue
+            try:
+                pnl = float(row[pnl_col])
+            except ValueError:
+                pnl = 0.0
+            yield pnl, row[exit_col][:7]
+
+def expand_paths(patterns):
+    """Files and glob patterns (quoted on Windows shells) -> sorted journal paths."""
+    paths = set()
+    for pattern in patterns:
+        paths.update(glob.glob(pattern) if glob.has_magic(pattern) else [pattern])
+    return sorted(p for p in paths if os.path.isfile(p))
+
+def analyze_journals(paths, initial_balance=1000):
+    """One streaming pass per journal; memory stays flat however many runs there are."""
+    results = []
+    for path in paths:
+        stats = RunStats(os.path.splitext(os.path.basename(path))[0], initial_balance)
+        try:
+            for pnl, month in iter_journal(path):
+                stats.add(pnl, month)
+        except (OSError, KeyError, ValueError) as e:
+            print(f"⚠️ Skipping {path}: {e}")
+            continue
+        results.append(stats.result())
+    results.sort(key=lambda r: r['total_pnl'], reverse=True)
+    return results
+
+def write_comparison(results, filename):
+    """Comparison table as CSV: one row per run, one pnl_YYYY-MM column per month."""
+    months = sorted({k for r in results for k in r if k.startswith('pnl_')})
+    columns = [k for k in results[0] if not k.startswith('pnl_')] + months
+    with open(filename, mode='w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns, restval=0.0)
+        writer.writeheader()
+        writer.writerows(results)
+
+def print_comparison(results, top=20):
+    print(f"\n{'Run':<40} {'Trades':>6} {'Win %':>6} {'P/L USD':>10} {'PF':>6} {'Exp.':>7} "
+          f"{'Sharpe':>7} {'Sortino':>7} {'DD %':>7} {'L.Str':>5}")
+    print("-" * 110)
+    for r in results[:top]:
+        print(f"{r['run'][:40]:<40} {r['trades']:>6} {r['win_rate']:>6.2f} {r['total_pnl']:>10.2f} "
+              f"{r['profit_factor']:>6.2f} {r['expectancy']:>7.2f} {r['sharpe']:>7.3f} {r['sortino']:>7.3f} "
+              f"{r['max_drawdown_pct']:>7.2f} {r['longest_losing_streak']:>5}")
+    if len(results) > top:
+        print(f"... {len(results) - top} more runs")
+
+def batch_performance(patterns, initial_balance=1000, out_file=None, top=20):
+    paths = expand_paths(patterns)
+    if not paths:
+        print("❌ Error: No journal files matched.")
+        return
+    t0 = time.time()
+    results = analyze_journals(paths, initial_balance)
+    if not results:
+        return
+    print_comparison(results, top)
+    print("-" * 110)
+    print(f"✅ Analyzed {len(results)} runs in {time.time() - t0:.2f}s")
+    if out_file:
+        write_comparison(results, out_file)
+        print(f"📄 Comparison table (with monthly P/L) saved to: {out_file}")
+
+def calculate_performance(coin_name=None, initial_balance=1000):
     # Automatically grab the relevant file
     journal_file = get_latest_journal(coin_name)
     
@@ -41,50 +320,15 @@ def calculate_performance(coin_name=None):
             print(f"⚠️ Warning: {journal_file} is empty. No trades to analyze.")
             return
             
+        # Same rule as iter_journal: trades still OPEN are not counted
+        df = df[df['Exit_Date'].astype(str) != 'OPEN']
+        if df.empty:
+            print(f"⚠️ Warning: {journal_file} has no closed trades yet.")
+            return
+
         # Ensure P/L_USD is numeric and handle potential string issues
-        df['P/L_USD'] = pd.to_numeric(df['P/L_USD'], errors='coerce').fillna(0)
-        
-        # 1. Basic Metrics
-        total_trades = len(df)
-        winning_trades = df[df['P/L_USD'] > 0]
-        losing_trades = df[df['P/L_USD'] < 0]
-        
-        win_rate = (len(winning_trades) / total_trades) * 100 if total_trades > 0 else 0
-        total_pnl = df['P/L_USD'].sum()
-        
-        # 2. Advanced Metrics
-        avg_win = winning_trades['P/L_USD'].mean() if not winning_trades.empty else 0
-        avg_loss = losing_trades['P/L_USD'].mean() if not losing_trades.empty else 0
-        
-        gross_profit = winning_trades['P/L_USD'].sum()
-        gross_loss = abs(losing_trades['P/L_USD'].sum())
-        profit_factor = gross_profit / gross_loss if gross_loss != 0 else float('inf')
-        
-        # 3. Drawdown Calculation (Assuming $1000 starting capital)
-        initial_balance = 1000
-        df['Equity'] = initial_balance + df['P/L_USD'].cumsum()
-        peak = df['Equity'].cummax()
-        drawdown = (df['Equity'] - peak) / peak
-        max_drawdown = drawdown.min() * 100
-
-        # --- Print the Report ---
-        print("\n" + "="*45)
-        print(f"        📊 STRATEGY PERFORMANCE REPORT")
-        print(f"   File: {journal_file}")
-        print("="*45)
-        print(f"Total Trades:         {total_trades}")
-        print(f"Win Rate:             {win_rate:.2f}%")
-        print(f"Total Profit/Loss:    ${total_pnl:.2f}")
-        print(f"Profit Factor:        {profit_factor:.2f}")
-        print("-" * 45)
-        print(f"Average Win:          ${avg_win:.2f}")
-        print(f"Average Loss:         ${avg_loss:.2f}")
-        print(f"Largest Win:          ${df['P/L_USD'].max() if total_trades > 0 else 0:.2f}")
-        print(f"Largest Loss:         ${df['P/L_USD'].min() if total_trades > 0 else 0:.2f}")
-        print("-" * 45)
-        print(f"Maximum Drawdown:     {max_drawdown:.2f}%")
-        print(f"Final Equity:         ${df['Equity'].iloc[-1] if total_trades > 0 else initial_balance:.2f}")
-        print("="*45)
+        pnl = pd.to_numeric(df['P/L_USD'], errors='coerce').fillna(0)
+        print_report(compute_metrics(pnl, initial_balance), f"File: {journal_file}")
 
     except PermissionError:
         print(f"❌ Error: Could not read {journal_file}. Close it in Excel first!")
@@ -95,6 +339,28 @@ if __name__ == "__main__":
     # Setup CLI for coin filtering
     parser = argparse.ArgumentParser(description="Analyze Strategy Performance")
     parser.add_argument("--coin", type=str, help="Specific coin to analyze (e.g., BTC, ETH, XRP)")
+    parser.add_argument("--db", type=str, help="Query this SQLite trade database instead of the CSV journals")
+    parser.add_argument("--since", type=str, help="With --db: only runs started since 7d / 12h / YYYY-MM-DD")
+    parser.add_argument("--run", type=int, action="append", help="With --db: run id to compare (repeatable)")
+    parser.add_argument(
+        "--batch", type=str, nargs="+",
+        help="Compare many journals (CSV or npz, files or glob patterns, e.g. 'sweep_journals/*.npz')"
+    )
+    parser.add_argument("--initial-balance", type=float, default=1000, help="Starting capital for equity/drawdown (default: 1000)")
+    parser.add_argument("--out", type=str, help="With --batch: save the comparison table to this CSV")
+    parser.add_argument("--top", type=int, default=20, help="With --batch: runs to print (default: 20)")
     args = parser.parse_args()
 
-    calculate_performance(args.coin)
\ No newline at end of file
+    if args.batch:
+        batch_performance(args.batch, args.initial_balance, args.out, args.top)
+    elif args.db:
+        if not os.path.exists(args.db):
+            print(f"❌ Error: {args.db} not found.")
+        else:
+            with TradeDB(args.db) as db:
+                if args.run:
+                    compare_runs(db, args.run)
+                else:
+                    list_runs(db, args.coin, parse_since(args.since) if args.since else None)
+    else:
+        calculate_performance(args.coin, args.initial_balance)
\ No newline at end of file
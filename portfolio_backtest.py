@@ -0,0 +1,233 @@
+import argparse
+import heapq
+import itertools
+import os
+import time
+from datetime import datetime
+from candle_file import CandleFile, load_candles, EXTENSION
+from candle_store import CandleStore
+from signal_engine import SignalEngine
+from strategy import WINDOW_SIZE, MIN_CONFIRMATIONS, apply_htf_filter
+from resample import MultiTimeframe
+from risk import calculate_position_size, calculate_take_profit
+from journal import JournalWriter
+from candles import as_series
+from sweep import summarize_trades
+
+# Candles turned into Python floats per pair at a time; bounds the memory of the event stream
+EVENT_CHUNK = 4096
+
+# Shared account limits (all pairs together)
+MAX_POSITIONS = 5     # Trades open at the same time
+MAX_OPEN_RISK = 5.0   # % of the balance that all open stops may lose together
+
+def _bar_events(k, candles, chunk=EVENT_CHUNK):
+    """(start, pair index, bar index, open, high, low, close) for every candle of one pair, oldest first."""
+    for lo in range(0, len(candles), chunk):
+        hi = min(lo + chunk, len(candles))
+        yield from zip(
+            candles.start[lo:hi].tolist(), itertools.repeat(k, hi - lo), range(lo, hi),
+            candles.open[lo:hi].tolist(), candles.high[lo:hi].tolist(),
+            candles.low[lo:hi].tolist(), candles.close[lo:hi].tolist()
+        )
+
+def _open_risk(pos):
+    # Dollar loss if the current stop is hit (zero once TP1 moved it to breakeven)
+    return 0.0 if pos['tp1_hit'] else pos['size'] * abs(pos['entry_price'] - pos['sl'])
+
+def _step_position(pos, low, high):
+    """
+    Applies one bar to an open position; True once it is closed.
+    Same rules as backtest.simulate_trade_outcome, one bar at a time.
+    """
+    is_buy = pos['side'] == 'BUY'
+    entry, sl, tp1, tp2 = pos['entry_price'], pos['sl'], pos['tp1'], pos['tp2']
+
+    # --- Phase 1: Stop Loss or TP1 (SL wins if both are touched) ---
+    if not pos['tp1_hit']:
+        if (is_buy and low <= sl) or (not is_buy and high >= sl):
+            pos['pnl_unit'] = sl - entry if is_buy else entry - sl
+            return True
+        if (is_buy and high >= tp1) or (not is_buy and low <= tp1):
+            pos['pnl_unit'] += 0.5 * (tp1 - entry if is_buy else entry - tp1)
+            pos['tp1_hit'] = True
+        return False
+
+    # --- Phase 2: TP2 or Breakeven Stop (TP2 wins if both are touched) ---
+    if (is_buy and high >= tp2) or (not is_buy and low <= tp2):
+        pos['pnl_unit'] += 0.5 * (tp2 - entry if is_buy else entry - tp2)
+        return True
+    return (is_buy and low <= entry) or (not is_buy and high >= entry)
+
+def run_portfolio(sources, initial_balance=1000, risk_percent=1.0, max_positions=MAX_POSITIONS,
+                  max_open_risk=MAX_OPEN_RISK, window_size=WINDOW_SIZE, min_confirmations=MIN_CONFIRMATIONS,
+                  rr_ratio=2.0, sl_buffer=0.0001, warmup=50, htf_timeframes=None, base=300,
+                  write_journal=True, journal_format='csv', journal=None):
+    """
+    Backtests several pairs on one account. sources: {pair: candles}.
+    The pairs' candles are heap-merged into one time-ordered event stream; each
+    pair has its own signal engine, and every entry is sized with
+    risk.calculate_position_size against the shared balance. Entries beyond
+    max_positions open trades, or whose stop would take the open risk above
+    max_open_risk % of the balance, are skipped (None = no limit).
+    Returns (trades, report_filename, skipped) with trades in exit order.
+    """
+    pairs = list(sources)
+    series = [as_series(sources[p]) for p in pairs]
+    engines = [SignalEngine(window_size, min_confirmations) for _ in pairs]
+    mtfs = [MultiTimeframe(htf_timeframes, base) for _ in pairs] if htf_timeframes else None
+    lasts = [len(s) - 1 for s in series]
+    positions = [None] * len(pairs)
+
+    balance = initial_balance
+    trades = []
+    skipped = 0
+
+    report_filename = None
+    writer = journal
+    if writer is None and write_journal:
+        report_filename = f"trade_journal_PORTFOLIO_{datetime.now().strftime('%Y_%m_%d_%H_%M')}.{journal_format}"
+        writer = JournalWriter(report_filename, fmt=journal_format)
+
+    def close(k, i):
+        nonlocal balance
+        pos = positions[k]
+        positions[k] = None
+        pnl = pos['size'] * pos['pnl_unit']
+        balance += pnl
+        candles = series[k]
+        if writer is not None:
+            writer.log({
+                'entry_unix': int(candles.start[pos['entry_idx']]),
+                'exit_unix': int(candles.start[i]),
+                'pair': pairs[k],
+                'side': pos['side'],
+                'entry_price': pos['entry_price'],
+                'exit_price': float(candles.close[i]),
+                'pnl': round(pnl, 2)
+            })
+        trades.append({'Pair': pairs[k], 'Signal': pos['side'], 'PnL': pnl, 'Balance': balance})
+
+    stream = heapq.merge(*(_bar_events(k, s) for k, s in enumerate(series)))
+    for _, events in itertools.groupby(stream, key=lambda e: e[0]):
+        # --- 1. EXITS: every pair's bar at this time, before any new entry is sized ---
+        candidates = []
+        for start, k, i, o, h, l, c in events:
+            signal, structural_price, counts = engines[k].update_ohlc(o, h, l, c)
+            if mtfs is not None:
+                trends = mtfs[k].update_ohlc(start, o, h, l, c)
+                signal, structural_price, _ = apply_htf_filter(signal, structural_price, counts, trends)
+
+            pos = positions[k]
+            if pos is not None:
+                # A pair has one trade at a time and can't re-enter on its exit bar
+                if (i > pos['entry_idx'] and _step_position(pos, l, h)) or i == lasts[k]:
+                    close(k, i)
+                continue
+            if warmup <= i < lasts[k] and signal in ['BUY', 'SELL'] and structural_price:
+                candidates.append((k, i, signal, c, structural_price))
+
+        # --- 2. ENTRIES: sized against the shared balance, within the account limits ---
+        for k, i, signal, entry_price, structural_price in candidates:
+            open_positions = [p for p in positions if p is not None]
+            pos_size, sl_price = calculate_position_size(balance, risk_percent, entry_price, structural_price, sl_buffer)
+            new_risk = pos_size * abs(entry_price - sl_price)
+            if max_positions is not None and len(open_positions) >= max_positions:
+                skipped += 1
+                continue
+            if max_open_risk is not None and \
+                    sum(_open_risk(p) for p in open_positions) + new_risk > balance * max_open_risk / 100 + 1e-9:
+                skipped += 1
+                continue
+
+            risk_in_price = abs(entry_price - sl_price)
+            positions[k] = {
+                'side': signal,
+                'entry_idx': i,
+                'entry_price': entry_price,
+                'size': pos_size,
+                'sl': sl_price,
+                'tp1': entry_price + (risk_in_price if signal == 'BUY' else -risk_in_price),
+                'tp2': calculate_take_profit(entry_price, sl_price, rr_ratio),
+                'tp1_hit': False,
+                'pnl_unit': 0.0
+            }
+
+    if writer is not None and journal is None:
+        writer.close()
+    return trades, report_filename, skipped
+
+def load_sources(files=None, store_pairs=None, start_ts=None, end_ts=None, granularity=300):
+    """{pair: candles} from candle files (.bin mapped, CSV parsed into arrays) and/or the local candle store."""
+    sources = {}
+    for path in files or []:
+        if path.endswith(EXTENSION):
+            pair = CandleFile(path).pair
+        else:
+            pair = os.path.basename(path).replace(".csv", "").split('_')[0].upper()
+        sources[pair] = load_candles(path)
+    for pair in store_pairs or []:
+        sources[pair.upper()] = CandleStore(pair.upper(), granularity).load(start_ts, end_ts)
+    return sources
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest several pairs on one shared account")
+    parser.add_argument("files", nargs="*", help="Candle CSV or .bin files, one per pair")
+    parser.add_argument("--pairs", type=str, help="Comma-separated pairs to load from the local candle store instead")
+    parser.add_argument("--start", type=str, help="Store start date (YYYY-MM-DD), used with --pairs")
+    parser.add_argument("--end", type=str, help="Store end date (YYYY-MM-DD), used with --pairs")
+    parser.add_argument("--granularity", type=int, default=300, help="Candle size in seconds (default: 300)")
+    parser.add_argument("--balance", type=float, default=1000, help="Initial shared balance")
+    parser.add_argument("--risk", type=float, default=1.0, help="Risk per trade in %% of the balance")
+    parser.add_argument("--max-positions", type=int, default=MAX_POSITIONS,
+                        help=f"Open trades at the same time (default: {MAX_POSITIONS}, 0 = no limit)")
+    parser.add_argument("--max-open-risk", type=float, default=MAX_OPEN_RISK,
+                        help=f"%% of the balance all open stops may lose together (default: {MAX_OPEN_RISK}, 0 = no limit)")
+    parser.add_argument("--htf", type=str, help="Higher-timeframe trend filter in seconds (e.g. 900,3600,14400)")
+    parser.add_argument("--journal-format", choices=["csv", "npz"], default="csv", help="Trade journal output")
+    args = parser.parse_args()
+
+    missing = [f for f in args.files if not os.path.exists(f)]
+    if missing:
+        print(f"❌ Error: Could not find file(s): {', '.join(missing)}")
+        return
+    store_pairs = [p.strip() for p in args.pairs.split(',') if p.strip()] if args.pairs else []
+    if not args.files and not store_pairs:
+        parser.error("Give candle files or --pairs")
+
+    start_ts = int(datetime.strptime(args.start, "%Y-%m-%d").timestamp()) if args.start else None
+    end_ts = int(datetime.strptime(args.end, "%Y-%m-%d").timestamp()) if args.end else None
+    sources = load_sources(args.files, store_pairs, start_ts, end_ts, args.granularity)
+    empty = [pair for pair, candles in sources.items() if len(candles) == 0]
+    if empty:
+        print(f"❌ Error: No candles for {', '.join(empty)}. Run download_data.py first.")
+        return
+    htf = tuple(int(tf) for tf in args.htf.split(',')) if args.htf else None
+
+    print(f"🚀 Portfolio backtest on {len(sources)} pairs ({sum(len(c) for c in sources.values()):,} candles)...")
+    t0 = time.time()
+    trades, report_filename, skipped = run_portfolio(
+        sources,
+        initial_balance=args.balance,
+        risk_percent=args.risk,
+        max_positions=args.max_positions or None,
+        max_open_risk=args.max_open_risk or None,
+        htf_timeframes=htf,
+        base=args.granularity,
+        journal_format=args.journal_format
+    )
+
+    stats = summarize_trades(trades, args.balance)
+    print(f"✅ Finished in {time.time() - t0:.1f}s")
+    print("-" * 30)
+    for pair in sources:
+        pnls = [t['PnL'] for t in trades if t['Pair'] == pair]
+        print(f"{pair:<10} {len(pnls):>5} trades | PnL ${sum(pnls):>10.2f}")
+    print("-" * 30)
+    print(f"Portfolio: {stats['trades']} trades | Win Rate {stats['win_rate']}% | PF {stats['profit_factor']} | "
+          f"DD {stats['max_drawdown_pct']}% | Final Balance ${stats['final_balance']:.2f}")
+    print(f"Signals skipped by the account limits: {skipped}")
+    print(f"📄 Full trade log saved to: {report_filename}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+import asyncio
+import json
+import queue
+import threading
+import time
+
+# Sentinel pushed to subscribers when a feed has no more prices
+END_OF_FEED = None
+
+class PriceFeed:
+    """
+    Base class for ticker price feeds.
+    Producers call publish(product_id, price) from any thread; consumers read
+    prices with ticks() (blocking) or aticks() (asyncio) and react to every tick.
+    After stall_timeout seconds without a tick the feed gets a chance to recover
+    (_on_stall) and, if given, fallback(product_id) supplies a REST price every
+    poll_interval seconds until ticks arrive again, so an open trade is never left unmanaged.
+    """
+
+    def __init__(self, stall_timeout=60, fallback=None, poll_interval=10):
+        self.stall_timeout = stall_timeout  # Seconds without a tick before the feed counts as stalled
+        self.fallback = fallback
+        self.poll_interval = poll_interval
+        self._subscribers = {}  # product_id -> list of (loop or None, queue)
+        self._lock = threading.Lock()
+
+    # --- Producer side ---
+    def publish(self, product_id, price):
+        with self._lock:
+            subscribers = list(self._subscribers.get(product_id, ()))
+        for loop, q in subscribers:
+            self._deliver(loop, q, price)
+
+    @staticmethod
+    def _deliver(loop, q, price):
+        if loop is None:
+            q.put_nowait(price)
+        else:
+            loop.call_soon_threadsafe(q.put_nowait, price)
+
+    def close(self):
+        """Ends every open ticks()/aticks() stream."""
+        with self._lock:
+            product_ids = list(self._subscribers)
+        for product_id in product_ids:
+            self.publish(product_id, END_OF_FEED)
+
+    # --- Subscription hooks for subclasses ---
+    def _on_subscribe(self, product_id):
+        pass
+
+    def _on_unsubscribe(self, product_id):
+        pass
+
+    def _on_stall(self, product_id):
+        pass
+
+    def _stalled(self, product_id, first):
+        # Called from the consumer after a timeout: recover the stream, then poll a price
+        if first:
+            source = "polling REST prices" if self.fallback else "still waiting"
+            print(f"⚠️ [{product_id}] No price update for {self.stall_timeout}s, reconnecting and {source}...")
+            self._on_stall(product_id)
+        if self.fallback is None:
+            return None
+        try:
+            return float(self.fallback(product_id))
+        except Exception as e:
+            print(f"⚠️ [{product_id}] Fallback price failed: {e}")
+            return None
+
+    def _wait(self, stalled):
+        return self.poll_interval if stalled and self.fallback else self.stall_timeout
+
+    def _add(self, product_id, loop, q):
+        with self._lock:
+            self._subscribers.setdefault(product_id, []).append((loop, q))
+        self._on_subscribe(product_id)
+
+    def _remove(self, product_id, loop, q):
+        with self._lock:
+            subs = self._subscribers.get(product_id, [])
+            if (loop, q) in subs:
+                subs.remove((loop, q))
+            last_one = not subs
+            if last_one:
+                self._subscribers.pop(product_id, None)
+        if last_one:
+            self._on_unsubscribe(product_id)
+
+    # --- Consumer side ---
+    def ticks(self, product_id):
+        """Blocking generator of prices for one pair. Ends when the feed closes."""
+        q = queue.Queue()
+        self._add(product_id, None, q)
+        stalled = False
+        try:
+            while True:
+                try:
+                    price = q.get(timeout=self._wait(stalled))
+                except queue.Empty:
+                    price = self._stalled(product_id, not stalled)
+                    stalled = True
+                    if price is not None:
+                        yield price
+                    continue
+                if price is END_OF_FEED:
+                    return
+                stalled = False
+                yield price
+        finally:
+            self._remove(product_id, None, q)
+
+    async def aticks(self, product_id):
+        """Async generator version of ticks() for the asyncio runner."""
+        loop = asyncio.get_running_loop()
+        q = asyncio.Queue()
+        self._add(product_id, loop, q)
+        stalled = False
+        try:
+            while True:
+                try:
+                    price = await asyncio.wait_for(q.get(), timeout=self._wait(stalled))
+                except asyncio.TimeoutError:
+                    # Reconnecting and REST calls block, so they run off the event loop
+                    price = await asyncio.to_thread(self._stalled, product_id, not stalled)
+                    stalled = True
+                    if price is not None:
+                        yield price
+                    continue
+                if price is END_OF_FEED:
+                    return
+                stalled = False
+                yield price
+        finally:
+            self._remove(product_id, loop, q)
+
+class WebSocketPriceFeed(PriceFeed):
+    """
+    Live prices from the Coinbase Advanced Trade WebSocket 'ticker' channel.
+    Also subscribes to 'heartbeats', which keeps quiet subscriptions open.
+    A stalled socket is closed, reopened and resubscribed (at most once per stall_timeout).
+    """
+
+    CHANNELS = ["ticker", "heartbeats"]
+
+    def __init__(self, key_file=None, stall_timeout=60, fallback=None, poll_interval=10):
+        super().__init__(stall_timeout, fallback, poll_interval)
+        from coinbase.websocket import WSClient
+
+        self._ws = WSClient(key_file=str(key_file) if key_file else None, on_message=self._on_message)
+        self._ws_lock = threading.Lock()
+        self._is_open = False
+        self._last_reconnect = 0.0
+
+    def _on_subscribe(self, product_id):
+        with self._ws_lock:
+            if not self._is_open:
+                self._ws.open()
+                self._is_open = True
+            self._ws.subscribe(product_ids=[product_id], channels=self.CHANNELS)
+
+    def _on_unsubscribe(self, product_id):
+        with self._ws_lock:
+            if self._is_open:
+                self._ws.unsubscribe(product_ids=[product_id], channels=self.CHANNELS)
+
+    def _on_stall(self, product_id):
+        with self._ws_lock:
+            if time.time() - self._last_reconnect < self.stall_timeout:
+                return  # Another pair's stream already reconnected it
+            self._last_reconnect = time.time()
+            with self._lock:
+                product_ids = list(self._subscribers)
+            try:
+                if self._is_open:
+                    self._ws.close()
+            except Exception as e:
+                print(f"Price Feed Error (close): {e}")
+            self._is_open = False
+            try:
+                self._ws.open()
+                self._is_open = True
+                if product_ids:
+                    self._ws.subscribe(product_ids=product_ids, channels=self.CHANNELS)
+                print(f"🔌 Price feed reconnected ({', '.join(product_ids)})")
+            except Exception as e:
+                print(f"Price Feed Error (reconnect): {e}")
+
+    def _on_message(self, message):
+        try:
+            data = json.loads(message)
+            if data.get('channel') != 'ticker':
+                return
+            for event in data.get('events', []):
+                for ticker in event.get('tickers', []):
+                    self.publish(ticker['product_id'], float(ticker['price']))
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"Price Feed Error: {e}")
+
+    def close(self):
+        super().close()
+        with self._ws_lock:
+            if self._is_open:
+                self._ws.close()
+                self._is_open = False
+
+class ReplayPriceFeed(PriceFeed):
+    """
+    Local stand-in feed: replays a fixed list of prices per pair, then ends.
+    Used for tests and offline runs instead of the WebSocket.
+    """
+
+    def __init__(self, prices_by_pair):
+        super().__init__()
+        self.prices_by_pair = {pid: list(prices) for pid, prices in prices_by_pair.items()}
+
+    @classmethod
+    def from_candles(cls, product_id, candles):
+        return cls({product_id: candle_ticks(candles)})
+
+    def _add(self, product_id, loop, q):
+        # Each subscriber gets the full replay, then the end marker
+        super()._add(product_id, loop, q)
+        for price in self.prices_by_pair.get(product_id, []):
+            self._deliver(loop, q, price)
+        self._deliver(loop, q, END_OF_FEED)
+
+def candle_ticks(candles):
+    """
+    Turns candles into a tick path (4 prices per candle).
+    Green candles are assumed to go open -> low -> high -> close, red ones open -> high -> low -> close.
+    """
+    ticks = []
+    for c in candles:
+        o, h, l, cl = float(c['open']), float(c['high']), float(c['low']), float(c['close'])
+        ticks.extend([o, l, h, cl] if cl >= o else [o, h, l, cl])
+    return ticks
@@ -0,0 +1,32 @@
+import threading
+import time
+
+# Coinbase Advanced Trade REST limits (requests per second)
+PUBLIC_RATE = 10   # Public endpoints (get_public_candles, get_public_product, ...)
+PRIVATE_RATE = 30  # Authenticated endpoints (get_candles, orders, accounts, ...)
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. acquire() blocks until a token is available, so
+    any number of threads together stay under `rate` calls per second, with
+    bursts of up to `capacity` calls.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
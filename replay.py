@@ -0,0 +1,289 @@
+import argparse
+import contextlib
+import csv
+import io
+import os
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+from candle_file import CandleFile, load_candles, EXTENSION
+from candles import as_series
+from mock_exchange import MockExchange
+from notifications import NotificationService
+from price_feed import PriceFeed
+from signal_engine import SignalEngine
+from journal import JournalWriter, TIME_FORMAT
+from backtest import run_backtest
+import main as bot
+
+class ReplayFinished(BaseException):
+    """Raised by the replay clock at the end of the data. A BaseException, so run_bot's except Exception lets it through."""
+
+class ReplayClock:
+    """
+    Stands in for the time module inside main.py: time() is the simulated time and
+    sleep() moves it forward instantly. Sleeping past the end of the data ends the replay.
+    """
+
+    def __init__(self, start, end):
+        self.now = float(start)
+        self.end = end
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+        if self.now > self.end:
+            raise ReplayFinished()
+
+    def advance_to(self, ts):
+        self.now = max(self.now, float(ts))
+
+def tick_path(candles, granularity):
+    """
+    (times, prices) of the tick path through the candles: the same 4 prices per candle
+    as price_feed.candle_ticks, spread over the candle and ending with the close at its end.
+    """
+    candles = as_series(candles)
+    green = candles.close >= candles.open
+    prices = np.column_stack([
+        candles.open,
+        np.where(green, candles.low, candles.high),
+        np.where(green, candles.high, candles.low),
+        candles.close
+    ]).ravel()
+    times = (candles.start[:, None] + np.arange(1, 5) * granularity / 4).ravel()
+    return times, prices
+
+class ReplayExchange(MockExchange):
+    """
+    Paper exchange on the replay clock: the ticker is the tick path price at clock
+    time, and get_candles only knows the candles started by then. Like Coinbase,
+    it also returns the candle still forming, built from the ticks so far.
+    """
+
+    def __init__(self, product_id, candles, clock, granularity=300, balances=None):
+        super().__init__({product_id: candles}, balances=balances, clock=clock.time)
+        self.granularity = granularity
+        self.starts = as_series(candles).start
+        self.times, self.prices = tick_path(candles, granularity)
+
+    def price(self, product_id):
+        idx = int(np.searchsorted(self.times, self.clock(), side='right')) - 1
+        return float(self.prices[max(idx, 0)])
+
+    def _candles(self, product_id, start_ts, end_ts, granularity):
+        rows = super()._candles(product_id, start_ts, min(end_ts, int(self.clock())), granularity)
+        if rows and int(rows[0]['start']) + self.granularity > self.clock():
+            rows[0] = self._forming(int(rows[0]['start']), rows[0])
+        return rows
+
+    def _forming(self, start, row):
+        # The newest candle as it looks at clock time: open plus the ticks seen so far
+        k = int(np.searchsorted(self.starts, start))
+        seen = int(np.searchsorted(self.times[4 * k:4 * k + 4], self.clock(), side='right'))
+        prices = [float(row['open'])] + self.prices[4 * k:4 * k + seen].tolist()
+        return {**row, 'high': str(max(prices)), 'low': str(min(prices)), 'close': str(prices[-1]), 'volume': '0'}
+
+class ReplayTickFeed(PriceFeed):
+    """
+    Tick feed for manage_trade: plays the tick path from the clock time on,
+    moving the clock to every tick (no waiting) and triggering the exchange's stop orders.
+    """
+
+    def __init__(self, exchange, clock):
+        super().__init__()
+        self.exchange = exchange
+        self.clock = clock
+
+    def ticks(self, product_id):
+        times, prices = self.exchange.times, self.exchange.prices
+        start = int(np.searchsorted(times, self.clock.now, side='right'))
+        for ts, price in zip(times[start:].tolist(), prices[start:].tolist()):
+            self.clock.advance_to(ts)
+            self.exchange._trigger_stops(product_id, price)
+            yield price
+
+class FastSignals:
+    """
+    Stand-in for strategy.generate_trade_signal during a replay: the same answer
+    from a SignalEngine fed each candle of the file once, instead of re-scanning
+    the lookback window on every call.
+    """
+
+    def __init__(self, candles):
+        self.candles = as_series(candles)
+        self.engine = SignalEngine()
+        self.fed = 0
+
+    def signal(self, candles, current_idx, **kwargs):
+        upto = int(np.searchsorted(self.candles.start, candles.start[current_idx], side='right'))
+        result = None
+        c = self.candles
+        while self.fed < upto:
+            k = self.fed
+            result = self.engine.update_ohlc(float(c.open[k]), float(c.high[k]), float(c.low[k]), float(c.close[k]))
+            self.fed += 1
+        if result is None:
+            result = self.engine.signal()
+        return result
+
+def check_aligned(starts, granularity):
+    """The live loop wakes up on multiples of the granularity, like Coinbase candles start."""
+    misaligned = np.asarray(starts, dtype=np.int64) % granularity
+    if misaligned.any():
+        raise ValueError(f"candle starts must be multiples of {granularity}s "
+                         f"(first one is {int(misaligned[misaligned != 0][0])}s off)")
+
+def replay(candles, product_id, granularity=300, journal_file=None, paper=True, compound=True,
+           fast_signals=False, verbose=False):
+    """
+    Runs main.run_bot (and so fetch_candles, plan_trade, open_position, manage_trade
+    and close_trade) over the candles on a simulated clock with a local paper
+    exchange: no sleeps, no network. Candle starts must be aligned to the granularity.
+    compound=True adds every paper trade's PnL to main.BALANCE, as a live account would.
+    fast_signals: replace generate_trade_signal with an equivalent SignalEngine (faster).
+    Returns the journal file it wrote.
+    """
+    candles = as_series(candles)
+    check_aligned(candles.start, granularity)
+    asset = product_id.split('-')[0]
+    journal_file = journal_file or f"trade_journal_REPLAY_{asset}_{datetime.now().strftime('%Y_%m_%d_%H_%M')}.csv"
+    if os.path.exists(journal_file):
+        os.remove(journal_file)
+
+    clock = ReplayClock(candles.start[0], int(candles.start[-1]) + granularity)
+    exchange = ReplayExchange(product_id, candles, clock, granularity, balances={'USD': bot.BALANCE})
+    feed = ReplayTickFeed(exchange, clock)
+    store_dir = tempfile.TemporaryDirectory()  # Keeps the replayed candles out of the real candle store
+    close_trade = bot.close_trade
+
+    def compounding_close(trade, pid=product_id):
+        close_trade(trade, pid)
+        if bot.PAPER_MODE:
+            bot.BALANCE += round(trade['pnl'], 2)
+
+    patches = {
+        'time': clock,
+        'client': exchange,  # No rate limits or cache on simulated time
+        'notifier': NotificationService('', ''),
+        '_candle_buffers': {},
+        '_htf_views': {},
+        'CANDLE_STORE_DIR': store_dir.name,
+        'get_price_feed': lambda: feed,
+        'close_trade': compounding_close if compound else close_trade,
+        'PRODUCT_ID': product_id,
+        'PAPER_MODE': paper,
+        'JOURNAL_FILE': journal_file,
+        'TRADE_DB': None,
+    }
+    if fast_signals:
+        patches['generate_trade_signal'] = FastSignals(candles).signal
+    saved = {name: getattr(bot, name) for name in patches}
+    saved_balance = bot.BALANCE
+    try:
+        for name, value in patches.items():
+            setattr(bot, name, value)
+        # Skip the warm-up: start one candle before the first full lookback window
+        clock.advance_to(candles.start[min(bot.LOOKBACK_WINDOW, len(candles) - 1)] + 1)
+        output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        with output:
+            try:
+                bot.run_bot()
+            except ReplayFinished:
+                pass
+    finally:
+        for name, value in saved.items():
+            setattr(bot, name, value)
+        bot.BALANCE = saved_balance
+        store_dir.cleanup()
+    return journal_file
+
+# --- Comparison with run_backtest ---
+def _read_journal(filename):
+    with open(filename, newline='') as f:
+        return list(csv.DictReader(f))
+
+def compare_journals(replay_file, backtest_trades, granularity=300):
+    """
+    Pairs replay trades with backtest trades (journal.COLUMNS dicts) by signal candle and side.
+    The bot enters just after the signal candle closed; the backtest logs that candle's start.
+    Both are only comparable on candles aligned to the granularity (checked).
+    Returns (matched, only_replay, only_backtest); matched items are (replay_row, backtest_trade).
+    """
+    check_aligned([int(t['entry_unix']) for t in backtest_trades], granularity)
+    by_key = {(int(t['entry_unix']), t['side']): t for t in backtest_trades}
+    matched, only_replay = [], []
+    for row in _read_journal(replay_file):
+        entry = datetime.strptime(row['Entry_Date'], TIME_FORMAT).timestamp()
+        signal_candle = int(entry) // granularity * granularity - granularity
+        trade = by_key.pop((signal_candle, row['Side']), None)
+        if trade is None:
+            only_replay.append(row)
+        else:
+            matched.append((row, trade))
+    return matched, only_replay, list(by_key.values())
+
+def _exit_candle(row, granularity):
+    # Start of the candle whose tick closed the replay trade (None while still open)
+    if row['Exit_Date'] == 'OPEN':
+        return None
+    exit_ts = int(datetime.strptime(row['Exit_Date'], TIME_FORMAT).timestamp())
+    return (exit_ts - 1) // granularity * granularity
+
+def print_comparison(matched, only_replay, only_backtest, granularity=300):
+    same_exit = sum(1 for row, t in matched if _exit_candle(row, granularity) == int(t['exit_unix']))
+    replay_pnl = sum(float(row['P/L_USD']) for row, _ in matched)
+    backtest_pnl = sum(float(t['pnl']) for _, t in matched)
+    print("-" * 30)
+    print(f"Matched trades:      {len(matched)} ({same_exit} closed on the same candle)")
+    print(f"Only in replay:      {len(only_replay)}")
+    print(f"Only in backtest:    {len(only_backtest)}")
+    print(f"Matched PnL:         replay ${replay_pnl:.2f} | backtest ${backtest_pnl:.2f}")
+    print("-" * 30)
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a candle file through the live bot loop (main.run_bot) on a simulated clock")
+    parser.add_argument("--file", type=str, required=True, help="Candle CSV or .bin file")
+    parser.add_argument("--balance", type=float, default=1000, help="Starting balance (default: 1000)")
+    parser.add_argument("--live-orders", action="store_true",
+                        help="Run the real-money order path (market buy + stop) against the local paper exchange")
+    parser.add_argument("--fast-signals", action="store_true",
+                        help="Use the equivalent SignalEngine instead of calling strategy.generate_trade_signal every candle")
+    parser.add_argument("--compare", action="store_true", help="Also run run_backtest and compare the two journals")
+    parser.add_argument("--verbose", action="store_true", help="Show the bot's console output")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.file):
+        print(f"❌ Error: Could not find file '{args.file}'")
+        return
+    if args.file.endswith(EXTENSION):
+        candle_file = CandleFile(args.file)
+        pair, granularity, candles = candle_file.pair, candle_file.granularity, candle_file.series()
+    else:
+        pair = os.path.basename(args.file).replace(".csv", "").split('_')[0].upper()
+        granularity, candles = 300, load_candles(args.file)
+
+    print(f"🚀 Replaying {len(candles)} {pair} candles through the live bot loop...")
+    bot.BALANCE = args.balance
+    t0 = time.time()
+    try:
+        journal_file = replay(candles, pair, granularity, paper=not args.live_orders,
+                              fast_signals=args.fast_signals, verbose=args.verbose)
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        return
+    print(f"✅ Replay finished in {time.time() - t0:.1f}s")
+    print(f"📄 Trade journal saved to: {journal_file}")
+
+    if args.compare:
+        writer = JournalWriter(fmt='memory')
+        # The bot trades from its first full lookback window on
+        run_backtest(candles, pair, initial_balance=args.balance, warmup=bot.LOOKBACK_WINDOW - 1,
+                     journal=writer, htf_timeframes=bot.HTF_TIMEFRAMES, base=granularity)
+        print_comparison(*compare_journals(journal_file, writer.trades, granularity), granularity)
+
+if __name__ == "__main__":
+    main()
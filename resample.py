@@ -0,0 +1,125 @@
+from collections import deque
+import numpy as np
+from candles import CandleSeries, as_series, candle_field
+from structure import detect_swings
+from trendline import detect_trend
+
+# Higher timeframes built from the 5m stream: 15m, 1h, 4h
+HTF_TIMEFRAMES = (900, 3600, 14400)
+
+# Higher-timeframe bars the HTF trend looks at (same lookback as the 5m detectors)
+HTF_WINDOW = 100
+
+def timeframe_label(seconds):
+    """900 -> '15m', 3600 -> '1h', 14400 -> '4h'"""
+    if seconds % 3600 == 0:
+        return f"{seconds // 3600}h"
+    return f"{seconds // 60}m"
+
+def window_trend(bars):
+    """detect_swings + detect_trend over a window of (higher-timeframe) candles."""
+    swings = detect_swings(bars)
+    swing_lows = [s for s in swings if s['type'] == 'low']
+    swing_highs = [s for s in swings if s['type'] == 'high']
+    return detect_trend(swing_lows, swing_highs)
+
+class Resampler:
+    """
+    Incrementally aggregates base candles (e.g. 5m) into bars of `period` seconds.
+    A bar is emitted as soon as the base candle that ends its period arrives,
+    or, if that candle is missing, when the first candle of a later period does.
+    """
+
+    def __init__(self, period, base=300):
+        self.period = period
+        self.base = base
+        self.bar = None  # Bar still being built
+
+    def update(self, start, open_p, high_p, low_p, close_p, volume=0.0):
+        """Adds one closed base candle. Returns the list of bars it completed (usually empty)."""
+        done = []
+        bucket = start - start % self.period
+        if self.bar is not None and self.bar['start'] != bucket:
+            done.append(self.bar)
+            self.bar = None
+
+        if self.bar is None:
+            self.bar = {'start': bucket, 'open': open_p, 'high': high_p, 'low': low_p, 'close': close_p, 'volume': volume}
+        else:
+            bar = self.bar
+            bar['high'] = max(bar['high'], high_p)
+            bar['low'] = min(bar['low'], low_p)
+            bar['close'] = close_p
+            bar['volume'] += volume
+
+        if start + self.base >= bucket + self.period:
+            done.append(self.bar)
+            self.bar = None
+        return done
+
+def resample(candles, period, now_end=None):
+    """
+    Batch version of Resampler: the bars of `period` seconds that are complete
+    at now_end (the close time of the newest base candle). Returns a CandleSeries.
+    """
+    candles = as_series(candles)
+    if len(candles) == 0:
+        return CandleSeries([], [], [], [], [], [])
+    buckets = candles.start - candles.start % period
+    firsts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    lasts = np.r_[firsts[1:] - 1, len(candles) - 1]
+
+    bars = CandleSeries(
+        buckets[firsts],
+        candles.open[firsts],
+        np.maximum.reduceat(candles.high, firsts),
+        np.minimum.reduceat(candles.low, firsts),
+        candles.close[lasts],
+        np.add.reduceat(candles.volume, firsts)
+    )
+    if now_end is None:
+        return bars
+    return bars[:int(np.searchsorted(bars.start + period, now_end, side='right'))]
+
+def htf_trends(candles, current_idx, timeframes=HTF_TIMEFRAMES, window_size=HTF_WINDOW, base=300):
+    """
+    Trend of every higher timeframe as of candle current_idx, from the bars
+    complete at its close. Only the tail of history those bars need is resampled.
+    """
+    candles = as_series(candles)
+    now_end = int(candles.start[current_idx]) + base
+    trends = {}
+    for tf in timeframes:
+        cutoff = now_end - now_end % tf - (window_size + 2) * tf
+        lo = int(np.searchsorted(candles.start, cutoff))
+        bars = resample(candles[lo:current_idx + 1], tf, now_end)
+        trends[tf] = window_trend(bars[max(0, len(bars) - window_size - 1):])
+    return trends
+
+class MultiTimeframe:
+    """
+    Higher-timeframe view kept up to date from the base candle stream
+    (backtest loop or live bot), so 15m/1h/4h data never has to be fetched.
+    trends() matches htf_trends() on the same candles.
+    """
+
+    def __init__(self, timeframes=HTF_TIMEFRAMES, base=300, window_size=HTF_WINDOW):
+        self.frames = {tf: (Resampler(tf, base), deque(maxlen=window_size + 1)) for tf in timeframes}
+        self._trends = {tf: 'SIDEWAYS' for tf in timeframes}
+
+    def update(self, candle):
+        """Adds one closed base candle (dict, SDK candle or row of a CandleSeries)."""
+        return self.update_ohlc(*(candle_field(candle, f) for f in ('start', 'open', 'high', 'low', 'close', 'volume')))
+
+    def update_ohlc(self, start, open_p, high_p, low_p, close_p, volume=0.0):
+        start = int(start)
+        for tf, (resampler, bars) in self.frames.items():
+            done = resampler.update(start, open_p, high_p, low_p, close_p, volume)
+            if done:
+                bars.extend(done)
+                self._trends[tf] = window_trend(list(bars))
+        return self.trends()
+
+    def trends(self):
+        """{timeframe seconds: 'UPTREND' / 'DOWNTREND' / 'SIDEWAYS'}"""
+        return dict(self._trends)
@@ -9,15 +9,18 @@ def calculate_take_profit(entry_price, structural_sl, rr_ratio=2.0):
         
     return take_profit
 
-def calculate_position_size(balance, risk_percent, entry_price, structural_sl):
-    """Calculates position size based on dollar risk and structural stop loss."""
+def calculate_position_size(balance, risk_percent, entry_price, structural_sl, sl_buffer=0.0001):
+    """
+    Calculates position size based on dollar risk and structural stop loss.
+    sl_buffer: extra distance beyond the structural level, as a fraction of entry (0.0001 = 0.01%).
+    """
     risk_amount = balance * risk_percent / 100
     
     # The actual price difference that represents 1R of risk
     risk_in_price = abs(entry_price - structural_sl) 
     
     # Add a small buffer to the SL for execution tolerance (e.g., 0.01%)
-    buffer = entry_price * 0.0001 
+    buffer = entry_price * sl_buffer 
     if entry_price > structural_sl:
         stop_loss_final = structural_sl - buffer # Long: SL below OB low
     else:
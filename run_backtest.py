@@ -1,7 +1,14 @@
 ﻿import argparse
 import os
+from datetime import datetime
 import pandas as pd
 from backtest import run_backtest
+from candles import CandleSeries, COLUMN_MAPPING
+from candle_store import CandleStore
+from candle_file import CandleFile, EXTENSION
+from trade_db import TradeDB
+from intrabar import IntrabarResolver
+from signal_cache import SignalCache, load_signals
 
 def main():
     # 1. Setup Command Line Arguments
@@ -10,15 +17,60 @@ def main():
         "--file", 
         type=str, 
         default="XRP-USD_candles.csv", 
-        help="The CSV file to use for historical data"
+        help="The CSV (or converted .bin) file to use for historical data"
     )
+    parser.add_argument("--pair", type=str, help="Load from the local candle store instead of a CSV (e.g. ETH-USD)")
+    parser.add_argument("--start", type=str, help="Store start date (YYYY-MM-DD), used with --pair")
+    parser.add_argument("--end", type=str, help="Store end date (YYYY-MM-DD), used with --pair")
+    parser.add_argument("--granularity", type=int, default=300, help="Store candle size in seconds (default: 300)")
+    parser.add_argument(
+        "--journal-format", choices=["csv", "npz"], default="csv",
+        help="Trade journal output: csv (default) or npz (columnar NumPy arrays)"
+    )
+    parser.add_argument(
+        "--htf", type=str,
+        help="Higher-timeframe trend filter in seconds, resampled from the candles (e.g. 900,3600,14400)"
+    )
+    parser.add_argument(
+        "--drill-down", type=str, nargs="?", const="store", metavar="FILE",
+        help="Resolve bars that touch both SL and TP with 1-minute candles: from the local store "
+             "(download_data.py --granularity 60), or from FILE (.bin or CSV)"
+    )
+    parser.add_argument(
+        "--signal-cache", action="store_true",
+        help="Reuse the per-bar signals of an earlier run on the same data and settings (signal_cache.py)"
+    )
+    parser.add_argument("--db", type=str, help="Also record the run and its trades in this SQLite database (e.g. trades.db)")
     args = parser.parse_args()
+    htf = tuple(int(tf) for tf in args.htf.split(',')) if args.htf else None
+
+    if args.pair:
+        # Warm up straight from the local store filled by download_data.py (no API calls)
+        pair = args.pair.upper()
+        start_ts = int(datetime.strptime(args.start, "%Y-%m-%d").timestamp()) if args.start else None
+        end_ts = int(datetime.strptime(args.end, "%Y-%m-%d").timestamp()) if args.end else None
+        print(f"📂 Loading data for: {pair} from the local candle store...")
+        candles = CandleStore(pair, args.granularity).load(start_ts, end_ts)
+        if len(candles) == 0:
+            print(f"❌ Error: No stored candles for {pair}. Run download_data.py first.")
+            return
+        simulate(candles, pair, args.journal_format, args.db, htf_timeframes=htf, base=args.granularity,
+                 drill_down=args.drill_down, signal_cache=args.signal_cache)
+        return
 
     # 2. Check if file exists
     if not os.path.exists(args.file):
         print(f"❌ Error: Could not find file '{args.file}'")
         return
 
+    # Binary candle files are memory-mapped: already sorted, renamed and typed
+    if args.file.endswith(EXTENSION):
+        candle_file = CandleFile(args.file)
+        print(f"📂 Mapping {len(candle_file)} {candle_file.pair} candles from {args.file}...")
+        simulate(candle_file.series(), candle_file.pair, args.journal_format, args.db, args.file, htf,
+                 candle_file.granularity, args.drill_down, args.signal_cache)
+        return
+
     # --- 3. UNIVERSAL ASSET DETECTION ---
     # Example: "XRP-USD_candles.csv" -> "XRP-USD"
     # We strip the path and take the first part of the filename before the underscore
@@ -40,33 +92,54 @@ def main():
 
     # 5. Column Mapping & Optimization
     print("⚡ Converting data to optimized format...")
-    column_mapping = {
-        'timestamp': 'start', 'time': 'start',
-        'price_low': 'low', 'price_high': 'high',
-        'price_open': 'open', 'price_close': 'close',
-        'base_volume': 'volume'
-    }
-    df = df.rename(columns=column_mapping)
+    df = df.rename(columns=COLUMN_MAPPING)
     
-    # Check for required columns and filter
-    required_cols = ['start', 'low', 'high', 'open', 'close']
-    available_cols = [col for col in required_cols if col in df.columns]
-    candle_list = df[available_cols].to_dict('records')
+    # Columnar NumPy arrays instead of one dict per candle
+    candles = CandleSeries.from_dataframe(df)
+
+    simulate(candles, pair, args.journal_format, args.db, args.file, htf, drill_down=args.drill_down,
+             signal_cache=args.signal_cache)
 
+def simulate(candles, pair, journal_format='csv', db_path=None, data_file=None, htf_timeframes=None, base=300,
+             drill_down=None, signal_cache=False):
     # 6. Run the Universal Backtest
-    print(f"🚀 Starting simulation on {len(candle_list)} candles for {pair}...")
+    print(f"🚀 Starting simulation on {len(candles)} candles for {pair}...")
     
+    db = TradeDB(db_path) if db_path else None
+    intrabar = None
+    if drill_down:
+        # 1-minute candles are only read once a bar is ambiguous
+        intrabar = IntrabarResolver(CandleStore(pair, 60) if drill_down == "store" else drill_down, base)
+    signals = None
+    if signal_cache:
+        cache = SignalCache()
+        signals = load_signals(candles, data_file, cache=cache, htf_timeframes=htf_timeframes, base=base)
+        print(f"⚡ Signals {'loaded from' if cache.hits else 'computed and saved to'} {cache.cache_dir}")
+
     # We now pass the 'pair' so backtest.py can create the correct filename
     trades, final_report_name = run_backtest(
-        candle_list, 
+        candles, 
         product_id=pair, 
         initial_balance=1000, 
-        risk_percent=1.0
+        risk_percent=1.0,
+        journal_format=journal_format,
+        db=db,
+        data_file=data_file,
+        htf_timeframes=htf_timeframes,
+        base=base,
+        intrabar=intrabar,
+        signals=signals
     )
+    if db:
+        db.close()
 
     print("-" * 30)
     print(f"✅ Backtest complete for {pair}!")
     print(f"📄 Full trade log saved to: {final_report_name}")
+    if db_path:
+        print(f"🗄️ Trades recorded in: {db_path}")
+    if intrabar:
+        print(f"🔍 Drill-down: {intrabar.summary()}")
     print(f"💡 Run 'python performance_summary.py' to see the detailed report.")
     print("-" * 30)
 
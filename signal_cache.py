@@ -0,0 +1,248 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+import numpy as np
+from candle_file import CandleFile, load_candles, EXTENSION
+from candles import as_series
+from signal_engine import SignalEngine
+from strategy import WINDOW_SIZE, MIN_CONFIRMATIONS, STRATEGY_VERSION, apply_htf_filter
+from resample import MultiTimeframe
+from trade_db import file_hash
+
+# Precomputed signal arrays live next to the scripts
+CACHE_DIR = Path(__file__).resolve().parent / "signal_cache"
+
+# Least recently used files are deleted once the cache grows past this
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+
+# Strings of (signal, structural_price, counts) stored as small integers
+SIGNAL_CODES = {'HOLD': 0, 'BUY': 1, 'SELL': -1}
+TREND_CODES = {'SIDEWAYS': 0, 'UPTREND': 1, 'DOWNTREND': -1}
+FAKEOUT_CODES = {None: 0, 'BULL_FAKEOUT': 1, 'BEAR_FAKEOUT': -1}
+
+def _decode(codes):
+    return {v: k for k, v in codes.items()}
+
+SIGNAL_NAMES, TREND_NAMES, FAKEOUT_NAMES = _decode(SIGNAL_CODES), _decode(TREND_CODES), _decode(FAKEOUT_CODES)
+
+class SignalArrays:
+    """
+    The strategy's answer for every bar of a candle series, as columns:
+    signal, structural_price (NaN = None), bull/bear counts, trend, fakeout and,
+    with a higher-timeframe filter, one trend column per timeframe.
+    at(i) returns the same (signal, structural_price, counts) as the SignalEngine
+    in run_backtest, so a backtest can run from these without detecting anything.
+    """
+
+    def __init__(self, signal, structural_price, bull, bear, trend, fake, htf=None, htf_timeframes=()):
+        self.signal = signal
+        self.structural_price = structural_price
+        self.bull = bull
+        self.bear = bear
+        self.trend = trend
+        self.fake = fake
+        self.htf_timeframes = tuple(htf_timeframes or ())
+        self.htf = htf if htf is not None else np.zeros((len(signal), 0), dtype=np.int8)
+
+    def __len__(self):
+        return len(self.signal)
+
+    def at(self, i):
+        price = float(self.structural_price[i])
+        counts = {
+            'bull': int(self.bull[i]),
+            'bear': int(self.bear[i]),
+            'trend': TREND_NAMES[int(self.trend[i])],
+            'fake': FAKEOUT_NAMES[int(self.fake[i])]
+        }
+        if self.htf_timeframes:
+            counts['htf'] = {tf: TREND_NAMES[int(code)] for tf, code in zip(self.htf_timeframes, self.htf[i])}
+        return SIGNAL_NAMES[int(self.signal[i])], (None if np.isnan(price) else price), counts
+
+    def tradable(self):
+        """Indices of the bars run_backtest would enter on: BUY/SELL with a structural price."""
+        price = self.structural_price
+        return np.flatnonzero((self.signal != 0) & ~np.isnan(price) & (price != 0))
+
+    def save(self, path):
+        # Write then rename so a reader (another sweep worker) never sees a half-written file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, signal=self.signal, structural_price=self.structural_price, bull=self.bull,
+                     bear=self.bear, trend=self.trend, fake=self.fake, htf=self.htf,
+                     htf_timeframes=np.array(self.htf_timeframes, dtype=np.int64))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in data.files}
+        return cls(arrays['signal'], arrays['structural_price'], arrays['bull'], arrays['bear'],
+                   arrays['trend'], arrays['fake'], arrays['htf'], arrays['htf_timeframes'].tolist())
+
+def compute_signals(candles, window_size=WINDOW_SIZE, min_confirmations=MIN_CONFIRMATIONS,
+                    htf_timeframes=None, base=300):
+    """Feeds every candle through a SignalEngine (and MultiTimeframe) once and keeps each bar's answer."""
+    candles = as_series(candles)
+    n = len(candles)
+    signal = np.zeros(n, dtype=np.int8)
+    structural_price = np.full(n, np.nan)
+    bull = np.zeros(n, dtype=np.int8)
+    bear = np.zeros(n, dtype=np.int8)
+    trend = np.zeros(n, dtype=np.int8)
+    fake = np.zeros(n, dtype=np.int8)
+    htf_timeframes = tuple(htf_timeframes or ())
+    htf = np.zeros((n, len(htf_timeframes)), dtype=np.int8)
+
+    engine = SignalEngine(window_size, min_confirmations)
+    mtf = MultiTimeframe(htf_timeframes, base) if htf_timeframes else None
+    starts = candles.start.tolist()
+    ohlc = zip(candles.open.tolist(), candles.high.tolist(), candles.low.tolist(), candles.close.tolist())
+    for i, bar in enumerate(ohlc):
+        sig, price, counts = engine.update_ohlc(*bar)
+        if mtf is not None:
+            trends = mtf.update_ohlc(int(starts[i]), *bar)
+            sig, price, counts = apply_htf_filter(sig, price, counts, trends)
+            htf[i] = [TREND_CODES[trends[tf]] for tf in htf_timeframes]
+        signal[i] = SIGNAL_CODES[sig]
+        if price is not None:
+            structural_price[i] = price
+        bull[i] = counts['bull']
+        bear[i] = counts['bear']
+        trend[i] = TREND_CODES[counts['trend']]
+        fake[i] = FAKEOUT_CODES[counts['fake']]
+    return SignalArrays(signal, structural_price, bull, bear, trend, fake, htf, htf_timeframes)
+
+def candles_hash(candles):
+    """SHA-256 of the candle columns, for candles that don't come from a file (e.g. the candle store)."""
+    candles = as_series(candles)
+    digest = hashlib.sha256()
+    for column in (candles.start, candles.open, candles.high, candles.low, candles.close):
+        digest.update(np.ascontiguousarray(column, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+def cache_key(data_hash, window_size=WINDOW_SIZE, min_confirmations=MIN_CONFIRMATIONS,
+              htf_timeframes=None, base=300):
+    """Everything the signals depend on: the data, the strategy version and the detector parameters."""
+    params = {
+        'data': data_hash, 'version': STRATEGY_VERSION, 'window_size': window_size,
+        'min_confirmations': min_confirmations,
+        'htf_timeframes': list(htf_timeframes) if htf_timeframes else None, 'base': base
+    }
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:32]
+
+class SignalCache:
+    """
+    On-disk cache of SignalArrays, one .npz per key. A hit refreshes the file's
+    modification time, so eviction (oldest first, past max_bytes) drops the
+    least recently used entries. Several processes may share the directory.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return self.cache_dir / f"{key}.npz"
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            signals = SignalArrays.load(path)
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            # Missing, or left behind by an older format: recompute
+            self.misses += 1
+            return None
+        self.hits += 1
+        return signals
+
+    def put(self, key, signals):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        signals.save(self._path(key))
+        self.evict()
+
+    def evict(self):
+        """Deletes least recently used files until the cache fits in max_bytes. Returns how many were deleted."""
+        entries = []
+        for path in self.cache_dir.glob("*.npz"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries[:-1]:  # Never the newest one
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def clear(self):
+        for path in self.cache_dir.glob("*.npz"):
+            path.unlink()
+
+def load_signals(candles, data_file=None, data_hash=None, cache=None, window_size=WINDOW_SIZE,
+                 min_confirmations=MIN_CONFIRMATIONS, htf_timeframes=None, base=300):
+    """
+    SignalArrays for the candles: from the cache when the same data (data_file's
+    content hash, or data_hash, or else the candles themselves) was already
+    processed with these parameters, otherwise computed and stored.
+    """
+    cache = cache if cache is not None else SignalCache()
+    if data_hash is None:
+        data_hash = file_hash(data_file) if data_file else candles_hash(candles)
+    key = cache_key(data_hash, window_size, min_confirmations, htf_timeframes, base)
+    signals = cache.get(key)
+    if signals is None or len(signals) != len(candles):
+        signals = compute_signals(candles, window_size, min_confirmations, htf_timeframes, base)
+        cache.put(key, signals)
+    return signals
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute and cache the per-bar strategy signals of a candle file")
+    parser.add_argument("--file", type=str, help="Candle CSV or .bin file")
+    parser.add_argument("--window-size", type=int, default=WINDOW_SIZE, help=f"Detector lookback (default: {WINDOW_SIZE})")
+    parser.add_argument("--min-confirmations", type=int, default=MIN_CONFIRMATIONS,
+                        help=f"Signals needed out of 4 (default: {MIN_CONFIRMATIONS})")
+    parser.add_argument("--htf", type=str, help="Higher-timeframe trend filter in seconds (e.g. 900,3600,14400)")
+    parser.add_argument("--clear", action="store_true", help="Delete every cached signal file")
+    args = parser.parse_args()
+
+    cache = SignalCache()
+    if args.clear:
+        cache.clear()
+        print(f"🧹 Cleared {cache.cache_dir}")
+        return
+    if not args.file or not os.path.exists(args.file):
+        print(f"❌ Error: Could not find file '{args.file}'")
+        return
+
+    if args.file.endswith(EXTENSION):
+        candle_file = CandleFile(args.file)
+        candles, base = candle_file.series(), candle_file.granularity
+    else:
+        candles, base = load_candles(args.file), 300
+    htf = tuple(int(tf) for tf in args.htf.split(',')) if args.htf else None
+
+    t0 = time.time()
+    signals = load_signals(candles, args.file, cache=cache, window_size=args.window_size,
+                           min_confirmations=args.min_confirmations, htf_timeframes=htf, base=base)
+    source = "cache" if cache.hits else "computed"
+    print(f"✅ {len(signals)} bars, {len(signals.tradable())} tradable signals ({source}, {time.time() - t0:.2f}s)")
+    print(f"📂 Cache: {cache.cache_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import argparse
+from collections import deque
+from candles import CandleSeries, candle_field
+from strategy import generate_trade_signal, combine_signals, WINDOW_SIZE, MIN_CONFIRMATIONS
+from trendline import detect_trend
+from fakeout import classify_fakeout
+
+class SignalEngine:
+    """
+    Incremental version of strategy.generate_trade_signal.
+    Feed it one closed candle at a time with update(); it keeps swings, active
+    order blocks / FVGs and their mitigation state instead of re-scanning the
+    whole lookback window on every bar.
+
+    After N updates it returns exactly what generate_trade_signal(candles, N-1) returns.
+    """
+
+    def __init__(self, window_size=WINDOW_SIZE, min_confirmations=MIN_CONFIRMATIONS):
+        self.window_size = window_size
+        self.min_confirmations = min_confirmations
+        self.index = -1  # Global index of the latest candle
+
+        # Last three candles (oldest first): (open, high, low, close)
+        self._recent = deque(maxlen=3)
+
+        # 'index' is the GLOBAL candle index here, not the window-relative one
+        self.swings = deque()
+        self.swing_lows = deque()
+        self.swing_highs = deque()
+        self.order_blocks = []  # Unmitigated OBs, oldest first
+        self.fvgs = []          # Unmitigated FVGs, oldest first
+
+    def update(self, candle):
+        """Adds one closed candle (dict or SDK candle) and returns (signal, structural_price, counts)."""
+        return self.update_ohlc(
+            candle_field(candle, 'open'), candle_field(candle, 'high'),
+            candle_field(candle, 'low'), candle_field(candle, 'close')
+        )
+
+    def update_ohlc(self, open_p, high_p, low_p, close_p):
+        """Same as update() but takes the raw prices (used by the backtest hot loop)."""
+        self.index += 1
+        i = self.index
+        self._recent.append((open_p, high_p, low_p, close_p))
+
+        # --- 1. MITIGATION (the new candle can only mitigate older zones) ---
+        if self.order_blocks:
+            self.order_blocks = [
+                ob for ob in self.order_blocks
+                if not ((ob['type'] == 'bullish' and low_p <= ob['high']) or
+                        (ob['type'] == 'bearish' and high_p >= ob['low']))
+            ]
+        if self.fvgs:
+            self.fvgs = [
+                fvg for fvg in self.fvgs
+                if not ((fvg['type'] == 'bullish' and low_p <= fvg['low']) or
+                        (fvg['type'] == 'bearish' and high_p >= fvg['high']))
+            ]
+
+        # --- 2. NEW STRUCTURE ---
+        if len(self._recent) >= 2:
+            prev_o, prev_h, prev_l, prev_c = self._recent[-2]
+
+            # Order block formed by the previous + current candle
+            if close_p > open_p and prev_c < prev_o and close_p > prev_h:
+                self.order_blocks.append({'type': 'bullish', 'low': prev_l, 'high': prev_h, 'index': i})
+            elif close_p < open_p and prev_c > prev_o and close_p < prev_l:
+                self.order_blocks.append({'type': 'bearish', 'low': prev_l, 'high': prev_h, 'index': i})
+
+        if len(self._recent) == 3:
+            first_h, first_l = self._recent[0][1], self._recent[0][2]
+            mid_h, mid_l, mid_c = self._recent[1][1], self._recent[1][2], self._recent[1][3]
+
+            # Fair value gap between candle i-2 and candle i
+            if low_p > first_h:
+                self.fvgs.append({'type': 'bullish', 'low': first_h, 'high': low_p, 'index': i})
+            elif high_p < first_l:
+                self.fvgs.append({'type': 'bearish', 'low': high_p, 'high': first_l, 'index': i})
+
+            # The middle candle is now confirmed (or not) as a swing point
+            swing = None
+            if mid_l < first_l and mid_l < low_p:
+                swing = {'type': 'low', 'index': i - 1, 'price': mid_l, 'close': mid_c}
+                self.swing_lows.append(swing)
+            elif mid_h > first_h and mid_h > high_p:
+                swing = {'type': 'high', 'index': i - 1, 'price': mid_h, 'close': mid_c}
+                self.swing_highs.append(swing)
+            if swing:
+                self.swings.append(swing)
+
+        # --- 3. EXPIRE ANYTHING THAT LEFT THE LOOKBACK WINDOW ---
+        self._expire(max(0, i - self.window_size))
+
+        return self.signal()
+
+    def _expire(self, window_start):
+        # Swings and OBs need one candle before them inside the window, FVGs need two
+        for swings in (self.swings, self.swing_lows, self.swing_highs):
+            while swings and swings[0]['index'] <= window_start:
+                swings.popleft()
+        if self.order_blocks and self.order_blocks[0]['index'] <= window_start:
+            self.order_blocks = [ob for ob in self.order_blocks if ob['index'] > window_start]
+        if self.fvgs and self.fvgs[0]['index'] <= window_start + 1:
+            self.fvgs = [fvg for fvg in self.fvgs if fvg['index'] > window_start + 1]
+
+    def signal(self):
+        """Returns (signal, structural_price, counts) for the latest candle."""
+        trend = detect_trend(self.swing_lows, self.swing_highs)
+
+        fakeout = None
+        if len(self.swings) >= 2:
+            last = self.swings[-1]
+            fakeout = classify_fakeout(last, self.swings[-2], last['close'])
+
+        last_ob = self.order_blocks[-1] if self.order_blocks else None
+        last_fvg = self.fvgs[-1] if self.fvgs else None
+        return combine_signals(last_ob, last_fvg, trend, fakeout, self.min_confirmations)
+
+def verify_against_strategy(candles, window_size=WINDOW_SIZE):
+    """Checks the engine bar-by-bar against generate_trade_signal. Returns the number of mismatches."""
+    engine = SignalEngine(window_size)
+    mismatches = 0
+    for i in range(len(candles)):
+        c = candles[i]
+        incremental = engine.update_ohlc(c['open'], c['high'], c['low'], c['close'])
+        expected = generate_trade_signal(candles, i, window_size)
+        if incremental != expected:
+            mismatches += 1
+            print(f"❌ Mismatch at bar {i}: engine={incremental} strategy={expected}")
+    return mismatches
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check SignalEngine against generate_trade_signal")
+    parser.add_argument("--file", type=str, default="ETH-USD_candles.csv", help="Candle CSV to replay")
+    args = parser.parse_args()
+
+    candles = CandleSeries.from_csv(args.file)
+    errors = verify_against_strategy(candles)
+    if errors:
+        print(f"❌ {errors} of {len(candles)} bars differ.")
+        raise SystemExit(1)
+    print(f"✅ SignalEngine matches generate_trade_signal on all {len(candles)} bars of {args.file}.")
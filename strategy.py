@@ -2,10 +2,25 @@ from ob_fvg import detect_order_blocks, detect_fvg
 from trendline import detect_trend
 from fakeout import detect_fakeout
 from structure import detect_swings 
+from candles import as_series
+from resample import htf_trends
 
-def generate_trade_signal(candles, current_idx):
+# Default strategy parameters (the sweep tool overrides these)
+WINDOW_SIZE = 100
+MIN_CONFIRMATIONS = 3  # Out of 4: OB, FVG, trend, fakeout
+
+# Bump whenever a detector or the scoring changes: cached signals (signal_cache.py) of older versions are ignored
+STRATEGY_VERSION = 1
+
+def generate_trade_signal(candles, current_idx, window_size=WINDOW_SIZE, min_confirmations=MIN_CONFIRMATIONS,
+                          htf_timeframes=None, base=300):
+    """
+    htf_timeframes: optional higher timeframes in seconds (e.g. resample.HTF_TIMEFRAMES).
+    They are built from these candles (base = candle size) and veto signals against
+    their trend; counts['htf'] then holds each timeframe's trend.
+    """
     # Standard lookback window to keep logic consistent and fast
-    window_size = 100
+    candles = as_series(candles)
     start_lookback = max(0, current_idx - window_size)
     visible_candles = candles[start_lookback : current_idx + 1] 
 
@@ -21,25 +36,45 @@ def generate_trade_signal(candles, current_idx):
     trend = detect_trend(swing_lows, swing_highs)
     fakeout = detect_fakeout(visible_candles, swings)
 
+    last_ob = ob_list[-1] if ob_list else None
+    last_fvg = fvg_list[-1] if fvg_list else None
+    result = combine_signals(last_ob, last_fvg, trend, fakeout, min_confirmations)
+    if htf_timeframes:
+        result = apply_htf_filter(*result, htf_trends(candles, current_idx, htf_timeframes, base=base))
+    return result
+
+def apply_htf_filter(signal, structural_price, counts, trends):
+    """
+    Higher-timeframe confirmation: a BUY is dropped while any higher timeframe
+    is in a DOWNTREND, a SELL while any is in an UPTREND.
+    """
+    counts['htf'] = trends
+    opposing = {'BUY': 'DOWNTREND', 'SELL': 'UPTREND'}.get(signal)
+    if opposing and opposing in trends.values():
+        return 'HOLD', None, counts
+    return signal, structural_price, counts
+
+def combine_signals(last_ob, last_fvg, trend, fakeout, min_confirmations=MIN_CONFIRMATIONS):
+    """Scores the latest OB/FVG, trend and fakeout into a BUY/SELL/HOLD decision."""
     structural_price = None
     bullish_signals = 0
     bearish_signals = 0
 
     # --- Bullish Confirmation Logic ---
-    if ob_list and ob_list[-1]['type']=='bullish': 
+    if last_ob and last_ob['type']=='bullish': 
         bullish_signals += 1
-        structural_price = ob_list[-1]['low']
+        structural_price = last_ob['low']
         
-    if fvg_list and fvg_list[-1]['type']=='bullish': bullish_signals += 1
+    if last_fvg and last_fvg['type']=='bullish': bullish_signals += 1
     if trend == 'UPTREND': bullish_signals += 1
     if fakeout == 'BULL_FAKEOUT': bullish_signals += 1
 
     # --- Bearish Confirmation Logic ---
-    if ob_list and ob_list[-1]['type']=='bearish': 
+    if last_ob and last_ob['type']=='bearish': 
         bearish_signals += 1
-        structural_price = ob_list[-1]['high']
+        structural_price = last_ob['high']
         
-    if fvg_list and fvg_list[-1]['type']=='bearish': bearish_signals += 1
+    if last_fvg and last_fvg['type']=='bearish': bearish_signals += 1
     if trend == 'DOWNTREND': bearish_signals += 1
     if fakeout == 'BEAR_FAKEOUT': bearish_signals += 1
 
@@ -52,9 +87,9 @@ def generate_trade_signal(candles, current_idx):
     }
 
     # Logic: Return Signal, SL Price, and the Confirmation Counts
-    if bullish_signals >= 3:
+    if bullish_signals >= min_confirmations:
         return 'BUY', structural_price, counts
-    elif bearish_signals >= 3:
+    elif bearish_signals >= min_confirmations:
         return 'SELL', structural_price, counts
         
     return 'HOLD', None, counts
\ No newline at end of file
@@ -1,11 +1,16 @@
+from candles import as_series
+
 def detect_swings(candles):
     # This remains the simple N-bar swing detection
+    candles = as_series(candles)
+    lows = candles.low.tolist()
+    highs = candles.high.tolist()
     swings = []
-    for i in range(1, len(candles)-1):
-        if candles[i]['low'] < candles[i-1]['low'] and candles[i]['low'] < candles[i+1]['low']:
-            swings.append({'type':'low','index':i,'price':candles[i]['low']})
-        elif candles[i]['high'] > candles[i-1]['high'] and candles[i]['high'] > candles[i+1]['high']:
-            swings.append({'type':'high','index':i,'price':candles[i]['high']})
+    for i in range(1, len(lows)-1):
+        if lows[i] < lows[i-1] and lows[i] < lows[i+1]:
+            swings.append({'type':'low','index':i,'price':lows[i]})
+        elif highs[i] > highs[i-1] and highs[i] > highs[i+1]:
+            swings.append({'type':'high','index':i,'price':highs[i]})
     return swings
 
 def detect_bos(swings):
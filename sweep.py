@@ -0,0 +1,188 @@
+import argparse
+import csv
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from candle_file import CandleFile, load_candles, EXTENSION
+from backtest import run_backtest
+from journal import JournalWriter
+from signal_cache import load_signals, candles_hash
+from strategy import WINDOW_SIZE, MIN_CONFIRMATIONS
+from trade_db import file_hash
+
+# Tunable run_backtest() arguments and how to parse them from the command line
+SWEEP_PARAMS = {
+    'window_size': int,        # Lookback window of the detectors (strategy.py)
+    'min_confirmations': int,  # Signals needed out of 4 (OB, FVG, trend, fakeout)
+    'rr_ratio': float,         # TP2 risk/reward (risk.calculate_take_profit)
+    'sl_buffer': float,        # SL buffer as a fraction of entry (risk.calculate_position_size)
+    'warmup': int,             # First bar the backtest trades on
+    'risk_percent': float      # % of balance risked per trade
+}
+
+RESULT_COLUMNS = ['trades', 'win_rate', 'total_pnl', 'profit_factor', 'max_drawdown_pct', 'final_balance']
+
+# Candle data for the worker processes. Sent once per worker by the pool
+# initializer and only read afterwards, instead of once per task. A .bin file
+# is passed by path: every worker maps the same file, so the OS shares the pages.
+_CANDLES = None
+_PAIR = None
+_DATA_HASH = None  # Set when signals come from the signal cache (signal_cache.py)
+_SIGNALS = {}      # (window_size, min_confirmations) -> SignalArrays, per worker
+
+# run_backtest() arguments the signals depend on; the others only change sizing and exits
+DETECTOR_PARAMS = ('window_size', 'min_confirmations')
+
+def _init_worker(candles, pair, data_hash=None):
+    global _CANDLES, _PAIR, _DATA_HASH
+    _CANDLES = load_candles(candles) if isinstance(candles, str) else candles
+    _PAIR = pair
+    _DATA_HASH = data_hash
+
+def _signals(params):
+    window_size = params.get('window_size', WINDOW_SIZE)
+    min_confirmations = params.get('min_confirmations', MIN_CONFIRMATIONS)
+    key = (window_size, min_confirmations)
+    if key not in _SIGNALS:
+        _SIGNALS[key] = load_signals(_CANDLES, data_hash=_DATA_HASH, window_size=window_size,
+                                     min_confirmations=min_confirmations)
+    return _SIGNALS[key]
+
+def _precompute(params):
+    return len(_signals(params).tradable())
+
+def summarize_trades(trades, initial_balance):
+    """Compact stats for one backtest: PnL, profit factor, max drawdown and trade count."""
+    pnls = [t['PnL'] for t in trades]
+    gross_profit = sum(p for p in pnls if p > 0)
+    gross_loss = abs(sum(p for p in pnls if p < 0))
+
+    equity = peak = initial_balance
+    max_drawdown = 0.0
+    for p in pnls:
+        equity += p
+        peak = max(peak, equity)
+        max_drawdown = min(max_drawdown, (equity - peak) / peak)
+
+    return {
+        'trades': len(pnls),
+        'win_rate': round(100 * sum(1 for p in pnls if p > 0) / len(pnls), 2) if pnls else 0.0,
+        'total_pnl': round(sum(pnls), 2),
+        'profit_factor': round(gross_profit / gross_loss, 3) if gross_loss else float('inf'),
+        'max_drawdown_pct': round(max_drawdown * 100, 2),
+        'final_balance': round(equity, 2)
+    }
+
+def _run_combination(params, initial_balance, journal_dir=None):
+    signals = _signals(params) if _DATA_HASH else None
+    if journal_dir is None:
+        trades, _ = run_backtest(_CANDLES, _PAIR, initial_balance=initial_balance, write_journal=False,
+                                 signals=signals, **params)
+    else:
+        # One npz journal per combination, for performance_summary.py --batch
+        name = "_".join([_PAIR] + [f"{k}-{v}" for k, v in params.items()])
+        with JournalWriter(os.path.join(journal_dir, f"{name}.npz"), fmt='npz') as journal:
+            trades, _ = run_backtest(_CANDLES, _PAIR, initial_balance=initial_balance, journal=journal,
+                                     signals=signals, **params)
+    return {**params, **summarize_trades(trades, initial_balance)}
+
+def build_grid(grid_args):
+    """Turns ['rr_ratio=1.5,2,3', ...] into a list of parameter dicts (the cartesian product)."""
+    axes = {}
+    for arg in grid_args:
+        name, _, values = arg.partition('=')
+        name = name.strip()
+        if name not in SWEEP_PARAMS:
+            raise ValueError(f"Unknown parameter '{name}'. Choose from: {', '.join(SWEEP_PARAMS)}")
+        axes[name] = [SWEEP_PARAMS[name](v) for v in values.split(',') if v.strip()]
+
+    names = list(axes)
+    return [dict(zip(names, combo)) for combo in itertools.product(*(axes[n] for n in names))]
+
+def run_sweep(candles, pair, grid, initial_balance=1000, workers=None, journal_dir=None, signal_cache=False):
+    """
+    Backtests every parameter combination on a process pool and returns one result row each.
+    journal_dir: also save each combination's trades there as an npz journal.
+    signal_cache: detect signals once per window_size/min_confirmations (or load them
+    from signal_cache.py's cache), so combinations that only change risk or exits skip detection.
+    """
+    results = []
+    if journal_dir:
+        os.makedirs(journal_dir, exist_ok=True)
+    data_hash = None
+    if signal_cache:
+        data_hash = file_hash(candles) if isinstance(candles, str) else candles_hash(candles)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(candles, pair, data_hash)) as pool:
+        if data_hash:
+            # Fill the cache first, one detector combination per task, so workers don't compute the same one
+            detectors = {tuple(params.get(k) for k in DETECTOR_PARAMS): {k: params[k] for k in DETECTOR_PARAMS if k in params}
+                         for params in grid}
+            list(pool.map(_precompute, detectors.values()))
+        futures = [pool.submit(_run_combination, params, initial_balance, journal_dir) for params in grid]
+        for done, future in enumerate(as_completed(futures), start=1):
+            results.append(future.result())
+            print(f"   [{done}/{len(grid)}] done", end="\r")
+    print()
+
+    results.sort(key=lambda r: r['total_pnl'], reverse=True)
+    return results
+
+def write_results(results, filename):
+    columns = list(results[0].keys()) if results else RESULT_COLUMNS
+    with open(filename, mode='w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(results)
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel parameter sweep for the SMC strategy")
+    parser.add_argument("--file", type=str, required=True, help="Candle CSV (or .bin) to backtest on")
+    parser.add_argument(
+        "--grid", type=str, action="append", required=True,
+        help=f"name=v1,v2,... (repeatable). Parameters: {', '.join(SWEEP_PARAMS)}"
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--balance", type=float, default=1000, help="Initial balance per run")
+    parser.add_argument("--out", type=str, default=None, help="Results CSV (default: sweep_<COIN>_<timestamp>.csv)")
+    parser.add_argument("--journals", type=str, default=None, help="Directory to save one npz trade journal per combination")
+    parser.add_argument("--signal-cache", action="store_true",
+                        help="Detect signals once per window_size/min_confirmations and keep them on disk (signal_cache.py)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.file):
+        print(f"❌ Error: Could not find file '{args.file}'")
+        return
+
+    try:
+        grid = build_grid(args.grid)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.file.endswith(EXTENSION):
+        pair = CandleFile(args.file).pair
+        candles = args.file
+    else:
+        pair = os.path.basename(args.file).replace(".csv", "").split('_')[0].upper()
+        candles = load_candles(args.file)
+    out_file = args.out or f"sweep_{pair.split('-')[0]}_{datetime.now().strftime('%Y_%m_%d_%H_%M')}.csv"
+
+    print(f"🚀 Sweeping {len(grid)} combinations on {pair} ({args.file})...")
+    t0 = time.time()
+    results = run_sweep(candles, pair, grid, args.balance, args.workers, args.journals, args.signal_cache)
+    write_results(results, out_file)
+
+    print(f"✅ Sweep finished in {time.time() - t0:.1f}s")
+    print("-" * 30)
+    for row in results[:10]:
+        params = ", ".join(f"{k}={row[k]}" for k in SWEEP_PARAMS if k in row)
+        print(f"PnL ${row['total_pnl']:>9.2f} | PF {row['profit_factor']:>6} | DD {row['max_drawdown_pct']:>6}% | "
+              f"{row['trades']:>4} trades | {params}")
+    print("-" * 30)
+    print(f"📄 Full results saved to: {out_file}")
+    if args.journals:
+        print(f"💡 Compare the runs with: python performance_summary.py --batch '{args.journals}/*.npz'")
+
+if __name__ == "__main__":
+    main()
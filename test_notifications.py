@@ -0,0 +1,97 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from notifications import NotificationService, HIGH, LOW
+
+# Run with: python -m pytest -q
+# A local stand-in of the Telegram Bot API: records every sendMessage body and
+# answers with the queued status codes (then 200), optionally after a delay.
+def stand_in(statuses=(), delay=0.0):
+    received = []
+    statuses = list(statuses)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            received.append(body['text'])
+            time.sleep(delay)
+            status = statuses.pop(0) if statuses else 200
+            reply = {'ok': status == 200}
+            if status == 429:
+                reply['parameters'] = {'retry_after': 0}
+            data = json.dumps(reply).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, received
+
+def service(server, **kwargs):
+    options = {'batch_window': 0.05, 'min_interval': 0.0, 'timeout': 5}
+    options.update(kwargs)
+    return NotificationService('TOKEN', '42', base_url=f"http://127.0.0.1:{server.server_port}", **options)
+
+def test_notify_does_not_block_on_a_slow_api():
+    server, received = stand_in(delay=0.5)
+    notifier = service(server)
+    try:
+        t0 = time.time()
+        for i in range(20):
+            assert notifier.notify(f"message {i}")
+        assert time.time() - t0 < 0.1
+        assert notifier.flush(timeout=5)
+        assert len(received) == 1 and "message 19" in received[0]
+    finally:
+        notifier.close()
+        server.shutdown()
+
+def test_same_key_messages_coalesce():
+    server, received = stand_in()
+    notifier = service(server, batch_window=0.3)
+    try:
+        for i in range(5):
+            notifier.notify(f"heartbeat {i}", LOW, key='heartbeat')
+        assert notifier.flush(timeout=5)
+        assert received == ["heartbeat 4"]
+        assert notifier.stats['coalesced'] == 4
+    finally:
+        notifier.close()
+        server.shutdown()
+
+def test_full_queue_drops_low_but_not_high():
+    server, received = stand_in()
+    notifier = service(server, batch_window=0.3, queue_size=2)
+    try:
+        assert notifier.notify("low 1", LOW)
+        assert notifier.notify("low 2", LOW)
+        assert notifier.notify("high 1", HIGH)  # Evicts a LOW
+        assert notifier.notify("high 2", HIGH)  # Evicts the other LOW
+        assert not notifier.notify("low 3", LOW)
+        assert notifier.flush(timeout=5)
+        assert len(received) == 1
+        assert "high 1" in received[0] and "high 2" in received[0]
+        assert "low" not in received[0]
+        assert notifier.stats['dropped'] == 3
+    finally:
+        notifier.close()
+        server.shutdown()
+
+def test_429_is_retried():
+    server, received = stand_in(statuses=[429])
+    notifier = service(server)
+    try:
+        notifier.notify("order filled", HIGH)
+        assert notifier.flush(timeout=5)
+        assert received == ["order filled", "order filled"]
+        assert notifier.stats['sent'] == 1 and notifier.stats['failed'] == 0
+    finally:
+        notifier.close()
+        server.shutdown()
@@ -0,0 +1,13 @@
+from pathlib import Path
+from benchmark import synthetic_candles
+from candles import CandleSeries, as_series
+from signal_engine import verify_against_strategy
+
+# Run with: python -m pytest -q
+DATA_FILE = Path(__file__).resolve().parent / "ETH-USD_candles.csv"
+
+def test_engine_matches_strategy_on_bundled_csv():
+    assert verify_against_strategy(CandleSeries.from_csv(DATA_FILE)) == 0
+
+def test_engine_matches_strategy_on_synthetic_candles():
+    assert verify_against_strategy(as_series(synthetic_candles(2000))) == 0
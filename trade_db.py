@@ -0,0 +1,165 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+# Single local database for backtest and live trades
+DEFAULT_DB = "trades.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created REAL NOT NULL,
+    kind TEXT NOT NULL,
+    pairs TEXT NOT NULL,
+    params TEXT,
+    data_file TEXT,
+    data_hash TEXT
+);
+CREATE TABLE IF NOT EXISTS trades (
+    trade_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    pair TEXT NOT NULL,
+    side TEXT NOT NULL,
+    entry_unix REAL NOT NULL,
+    exit_unix REAL,
+    entry_price REAL NOT NULL,
+    exit_price REAL,
+    pnl REAL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_created ON runs(created);
+CREATE INDEX IF NOT EXISTS idx_trades_run ON trades(run_id, entry_unix);
+CREATE INDEX IF NOT EXISTS idx_trades_pair ON trades(pair, entry_unix);
+CREATE INDEX IF NOT EXISTS idx_trades_side ON trades(side, entry_unix);
+CREATE INDEX IF NOT EXISTS idx_trades_entry ON trades(entry_unix);
+"""
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-256 of a data file, so runs on the same candles can be matched later."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class TradeDB:
+    """
+    SQLite trade database. Every backtest or live session is a run (kind,
+    pairs, parameters, data-file hash) and its trades point back to it.
+    Trades without an exit_unix are still open. Safe to share between threads.
+    """
+
+    def __init__(self, path=DEFAULT_DB):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+    # --- Recording ---
+    def start_run(self, kind, pairs, params=None, data_file=None):
+        """Registers a run ('backtest', 'paper' or 'live') and returns its run_id."""
+        if isinstance(pairs, str):
+            pairs = [pairs]
+        data_hash = file_hash(data_file) if data_file else None
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "INSERT INTO runs (created, kind, pairs, params, data_file, data_hash) VALUES (?, ?, ?, ?, ?, ?)",
+                (time.time(), kind, ",".join(pairs), json.dumps(params or {}, sort_keys=True), data_file, data_hash)
+            )
+        return cur.lastrowid
+
+    def add_trades(self, run_id, trades):
+        """Inserts journal-style trade dicts (see journal.log_trade) in one transaction."""
+        rows = []
+        for t in trades:
+            closed = 'exit_unix' in t
+            rows.append((
+                run_id,
+                t.get('pair', t.get('product', 'ETH-USD')),
+                t['side'],
+                t.get('entry_unix', time.time()),
+                t['exit_unix'] if closed else None,
+                t['entry_price'],
+                t.get('exit_price', 0) if closed else None,
+                t.get('pnl', 0) if closed else None
+            ))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO trades (run_id, pair, side, entry_unix, exit_unix, entry_price, exit_price, pnl) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+
+    def close_trade(self, run_id, pair, exit_price, pnl, exit_unix=None):
+        """Closes the newest open trade of a pair in a run. Returns False if none is open."""
+        with self._lock, self._conn:
+            cur = self._conn.execute(
+                "UPDATE trades SET exit_unix = ?, exit_price = ?, pnl = ? WHERE trade_id = ("
+                "SELECT trade_id FROM trades WHERE run_id = ? AND pair = ? AND exit_unix IS NULL "
+                "ORDER BY entry_unix DESC LIMIT 1)",
+                (exit_unix or time.time(), exit_price, pnl, run_id, pair)
+            )
+        return cur.rowcount > 0
+
+    # --- Queries ---
+    def find_runs(self, pair=None, since=None, kind=None):
+        """
+        Runs with their trade count, win count and total PnL, oldest first.
+        pair: 'ETH' matches every ETH-* pair, 'ETH-USD' only that pair.
+        since: Unix time; only runs started after it.
+        """
+        where, args = [], []
+        if pair:
+            pattern = f"%,{pair.upper()},%" if '-' in pair else f"%,{pair.upper()}-%"
+            where.append("',' || r.pairs || ',' LIKE ?")
+            args.append(pattern)
+        if since is not None:
+            where.append("r.created >= ?")
+            args.append(since)
+        if kind:
+            where.append("r.kind = ?")
+            args.append(kind)
+
+        query = (
+            "SELECT r.*, COUNT(t.pnl) AS trades, COALESCE(SUM(t.pnl > 0), 0) AS wins, "
+            "COALESCE(SUM(t.pnl), 0) AS total_pnl "
+            "FROM runs r LEFT JOIN trades t ON t.run_id = r.run_id"
+            + (" WHERE " + " AND ".join(where) if where else "")
+            + " GROUP BY r.run_id ORDER BY r.created"
+        )
+        with self._lock:
+            rows = self._conn.execute(query, args).fetchall()
+        return [self._run_dict(row) for row in rows]
+
+    def get_run(self, run_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return self._run_dict(row) if row else None
+
+    def run_trades(self, run_id, closed_only=True):
+        """Trades of one run in entry order, as dicts."""
+        query = "SELECT * FROM trades WHERE run_id = ?"
+        if closed_only:
+            query += " AND exit_unix IS NOT NULL"
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY entry_unix", (run_id,)).fetchall()
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    def _run_dict(row):
+        run = dict(row)
+        run['params'] = json.loads(run['params']) if run['params'] else {}
+        return run
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -9,6 +9,23 @@ def place_market_order_buy(client, product_id, amount_usd):
         print(f"Error placing buy order: {e}")
         return None
 
+def get_filled_size(client, order_id, attempts=10, delay=0.5):
+    """Polls the order until it is filled and returns the filled base size, or None."""
+    for attempt in range(attempts):
+        try:
+            order = client.get_order(order_id)['order']
+            if order['status'] == 'FILLED':
+                return float(order['filled_size'])
+            if order['status'] in ('CANCELLED', 'EXPIRED', 'FAILED'):
+                print(f"Order {order_id} ended {order['status']}")
+                return None
+        except Exception as e:
+            print(f"Error fetching order {order_id}: {e}")
+        if attempt < attempts - 1:
+            time.sleep(delay)
+    print(f"Order {order_id} not filled after {attempts} checks")
+    return None
+
 def place_initial_stop_loss(client, product_id, qty, sl_price):
     """Places a Stop-Limit Sell for the full position."""
     try:
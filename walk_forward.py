@@ -0,0 +1,177 @@
+import argparse
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from candle_file import CandleFile, load_candles, EXTENSION
+from backtest import run_backtest
+from journal import JournalWriter
+from strategy import WINDOW_SIZE
+from sweep import SWEEP_PARAMS, build_grid, summarize_trades
+
+# 5-minute candles: 30 days of training, then 7 days out-of-sample
+TRAIN_BARS = 30 * 288
+TEST_BARS = 7 * 288
+
+# Metrics a fold can be optimized for (columns of sweep.summarize_trades)
+OBJECTIVES = ['total_pnl', 'profit_factor', 'win_rate', 'final_balance']
+
+# Candle data for the worker processes, sent once per worker (see sweep.py)
+_CANDLES = None
+_PAIR = None
+
+def _init_worker(candles, pair):
+    global _CANDLES, _PAIR
+    _CANDLES = load_candles(candles) if isinstance(candles, str) else candles
+    _PAIR = pair
+
+def make_folds(n_candles, train_bars=TRAIN_BARS, test_bars=TEST_BARS, step=None):
+    """
+    Rolling (train_start, test_start, test_end) index triples; each test segment follows its train segment.
+    step must be at least test_bars: overlapping test segments would put the same
+    bars' trades into the stitched out-of-sample curve more than once.
+    """
+    step = step or test_bars
+    if step < test_bars:
+        raise ValueError(f"Step ({step}) is smaller than the test segment ({test_bars}): test segments would overlap")
+    folds = []
+    start = 0
+    while start + train_bars + test_bars <= n_candles:
+        folds.append((start, start + train_bars, start + train_bars + test_bars))
+        start += step
+    return folds
+
+def _run_fold(fold, grid, initial_balance, objective, min_trades):
+    """Optimizes on the train segment, then backtests the winner on the test segment."""
+    train_start, test_start, test_end = fold
+
+    # --- 1. IN-SAMPLE: every combination on the train segment ---
+    train = _CANDLES[train_start:test_start]
+    scores = []
+    for params in grid:
+        trades, _ = run_backtest(train, _PAIR, initial_balance=initial_balance, write_journal=False, **params)
+        scores.append((params, summarize_trades(trades, initial_balance)))
+
+    eligible = [s for s in scores if s[1]['trades'] >= min_trades] or scores
+    best_params, best_stats = max(eligible, key=lambda s: (s[1][objective], s[1]['total_pnl']))
+
+    # --- 2. OUT-OF-SAMPLE: the chosen parameters on unseen candles ---
+    # The detectors need a full window of history, so the test run starts that
+    # many bars early and only trades from test_start on. A trade still open at
+    # test_end is closed there, like at the end of a normal backtest.
+    lookback = max(best_params.get('window_size', WINDOW_SIZE), 1)
+    first = max(0, test_start - lookback)
+    test_params = {k: v for k, v in best_params.items() if k != 'warmup'}
+    journal = JournalWriter(fmt='memory')
+    trades, _ = run_backtest(_CANDLES[first:test_end], _PAIR, initial_balance=initial_balance,
+                             warmup=test_start - first, journal=journal, **test_params)
+
+    return {
+        'fold': fold,
+        'params': best_params,
+        'train': best_stats,
+        'test': summarize_trades(trades, initial_balance),
+        # Per-trade return on the balance before the trade, and the exit time
+        'returns': [t['PnL'] / (t['Balance'] - t['PnL']) for t in trades],
+        'exits': [int(t['exit_unix']) for t in journal.trades]
+    }
+
+def walk_forward(candles, pair, grid, initial_balance=1000, train_bars=TRAIN_BARS, test_bars=TEST_BARS,
+                 step=None, objective='total_pnl', min_trades=5, workers=None):
+    """
+    Runs every fold on a process pool and stitches the out-of-sample trades
+    into one equity curve compounded from initial_balance.
+    Returns (fold_results, curve) with curve rows of (exit_unix, fold, return, equity).
+    """
+    n = len(CandleFile(candles) if isinstance(candles, str) else candles)
+    folds = make_folds(n, train_bars, test_bars, step)
+    if not folds:
+        raise ValueError(f"Not enough candles ({n}) for one fold of {train_bars} + {test_bars}")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(candles, pair)) as pool:
+        futures = [pool.submit(_run_fold, fold, grid, initial_balance, objective, min_trades) for fold in folds]
+        results = []
+        for done, future in enumerate(futures, start=1):
+            results.append(future.result())
+            print(f"   [{done}/{len(folds)}] folds done", end="\r")
+    print()
+
+    curve = []
+    equity = initial_balance
+    for fold_no, res in enumerate(results, start=1):
+        for ret, exit_unix in zip(res['returns'], res['exits']):
+            equity *= 1 + ret
+            curve.append((exit_unix, fold_no, ret, equity))
+    return results, curve
+
+def write_curve(curve, filename):
+    with open(filename, mode='w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Exit_Date', 'Fold', 'Return_Pct', 'Equity'])
+        for exit_unix, fold_no, ret, equity in curve:
+            writer.writerow([datetime.fromtimestamp(exit_unix).strftime('%Y-%m-%d %H:%M:%S'),
+                             fold_no, round(ret * 100, 4), round(equity, 2)])
+
+def main():
+    parser = argparse.ArgumentParser(description="Walk-forward optimization of the SMC strategy")
+    parser.add_argument("--file", type=str, required=True, help="Candle CSV (or .bin) to walk through")
+    parser.add_argument(
+        "--grid", type=str, action="append", required=True,
+        help=f"name=v1,v2,... (repeatable). Parameters: {', '.join(SWEEP_PARAMS)}"
+    )
+    parser.add_argument("--train", type=int, default=TRAIN_BARS, help=f"Train candles per fold (default: {TRAIN_BARS})")
+    parser.add_argument("--test", type=int, default=TEST_BARS, help=f"Test candles per fold (default: {TEST_BARS})")
+    parser.add_argument("--step", type=int, default=None, help="Candles between fold starts, at least --test (default: --test)")
+    parser.add_argument("--objective", choices=OBJECTIVES, default="total_pnl", help="In-sample metric to maximize")
+    parser.add_argument("--min-trades", type=int, default=5, help="Ignore combinations with fewer train trades")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--balance", type=float, default=1000, help="Initial balance")
+    parser.add_argument("--out", type=str, default=None, help="Equity curve CSV (default: walk_forward_<COIN>_<timestamp>.csv)")
+    args = parser.parse_args()
+    if args.step is not None and args.step < args.test:
+        parser.error(f"--step ({args.step}) must be at least --test ({args.test}) so test segments don't overlap")
+
+    if not os.path.exists(args.file):
+        print(f"❌ Error: Could not find file '{args.file}'")
+        return
+
+    try:
+        grid = build_grid(args.grid)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.file.endswith(EXTENSION):
+        pair = CandleFile(args.file).pair
+        candles = args.file
+    else:
+        pair = os.path.basename(args.file).replace(".csv", "").split('_')[0].upper()
+        candles = load_candles(args.file)
+    out_file = args.out or f"walk_forward_{pair.split('-')[0]}_{datetime.now().strftime('%Y_%m_%d_%H_%M')}.csv"
+
+    print(f"🚀 Walk-forward on {pair}: {len(grid)} combinations per fold, train {args.train} / test {args.test} candles...")
+    t0 = time.time()
+    try:
+        results, curve = walk_forward(candles, pair, grid, args.balance, args.train, args.test,
+                                      args.step, args.objective, args.min_trades, args.workers)
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        return
+    write_curve(curve, out_file)
+
+    print(f"✅ {len(results)} folds finished in {time.time() - t0:.1f}s")
+    print("-" * 30)
+    for fold_no, res in enumerate(results, start=1):
+        params = ", ".join(f"{k}={v}" for k, v in res['params'].items())
+        print(f"Fold {fold_no:>3} | train PnL ${res['train']['total_pnl']:>9.2f} | "
+              f"test PnL ${res['test']['total_pnl']:>9.2f} ({res['test']['trades']:>3} trades) | {params}")
+    print("-" * 30)
+
+    equities = [args.balance] + [row[3] for row in curve]
+    oos = summarize_trades([{'PnL': b - a} for a, b in zip(equities, equities[1:])], args.balance)
+    print(f"Out-of-sample: {oos['trades']} trades | Win Rate {oos['win_rate']}% | PF {oos['profit_factor']} | "
+          f"DD {oos['max_drawdown_pct']}% | Final Equity ${oos['final_balance']:.2f}")
+    print(f"📄 Stitched equity curve saved to: {out_file}")
+
+if __name__ == "__main__":
+    main()